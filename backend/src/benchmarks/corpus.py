@@ -0,0 +1,37 @@
+"""
+Synthetic legal corpus shared by the benchmarks.
+Deterministic for a given seed so timings are comparable between runs.
+"""
+import random
+from typing import List
+
+PARTIES = ["TechCorp Inc.", "AI_Startup LLC", "Omni Realty Group", "Millennium Tower LP", "Vance Refrigeration"]
+CLAUSES = [
+    "The Purchase Price shall be ${amount} payable in cash at Closing, subject to adjustment under Article {article}.",
+    "{party} represents and warrants that it holds all right, title and interest in U.S. Patent No. {patent}.",
+    "The monthly base rent shall be ${amount}, due on the first day of each calendar month without demand.",
+    "Each Key Employee listed in Schedule {article} shall receive a retention bonus of ${amount} upon the Effective Date.",
+    "This Agreement shall be governed by the laws of the State of Delaware, including the DGCL.",
+    "Either party may terminate this Agreement upon {days} days written notice if the other party materially breaches Section {section}.",
+    "All Confidential Information disclosed by {party} shall remain privileged and subject to discovery protections.",
+    "Indemnification obligations under Article {article} shall survive Closing for a period of {days} months.",
+]
+
+
+def synthetic_chunks(count: int, seed: int = 42, chunk_chars: int = 500) -> List[str]:
+    """Returns `count` chunks of roughly `chunk_chars` characters of legal-sounding text."""
+    rng = random.Random(seed)
+    chunks = []
+    for _ in range(count):
+        sentences = []
+        while sum(len(s) + 1 for s in sentences) < chunk_chars:
+            sentences.append(rng.choice(CLAUSES).format(
+                party=rng.choice(PARTIES),
+                amount=f"{rng.randint(1, 50_000_000):,}",
+                article=rng.choice(["I", "II", "IV", "VI", "IX"]),
+                patent=f"{rng.randint(7_000_000, 11_999_999):,}",
+                days=rng.choice([10, 30, 60, 90]),
+                section=f"{rng.randint(1, 12)}.{rng.randint(1, 9)}",
+            ))
+        chunks.append(" ".join(sentences)[:chunk_chars])
+    return chunks
@@ -0,0 +1,65 @@
+"""
+Benchmark: ONNX Runtime (fp32 / int8) vs the fp32 FlagEmbedding reference.
+Reports cosine drift against the reference vectors and encode throughput for each backend.
+Run this from the backend/src directory:
+    python -m benchmarks.embedding_parity --onnx-path /models/bge-m3-onnx [--samples 64]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+src_path = Path(__file__).parent.parent
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from benchmarks.corpus import synthetic_chunks
+from rag.config import EMBEDDING_MODEL_NAME, EMBEDDING_DIM
+from rag.embedding_backends import create_embedding_backend, parity_report
+
+
+def throughput(backend, texts, batch_size):
+    start = time.perf_counter()
+    backend.encode(texts, batch_size=batch_size, return_dense=True)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--onnx-path", required=True, help="Directory with model.onnx + tokenizer files")
+    parser.add_argument("--samples", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=12)
+    args = parser.parse_args()
+
+    texts = synthetic_chunks(args.samples, seed=7)
+
+    print("\n" + "=" * 80)
+    print(f"🚀 EMBEDDING BACKEND PARITY ({len(texts)} chunks)")
+    print("=" * 80)
+
+    reference = create_embedding_backend("flag", EMBEDDING_MODEL_NAME, EMBEDDING_DIM)
+    candidates = {
+        "onnx-fp32": create_embedding_backend("onnx", EMBEDDING_MODEL_NAME, EMBEDDING_DIM, onnx_path=args.onnx_path),
+        "onnx-int8": create_embedding_backend(
+            "onnx", EMBEDDING_MODEL_NAME, EMBEDDING_DIM, onnx_path=args.onnx_path, onnx_quantize=True
+        ),
+    }
+
+    reference_rate = throughput(reference, texts, args.batch_size)
+    print(f"{'backend':<12} {'mean cos':>9} {'min cos':>9} {'p95 drift':>10} {'chunks/sec':>11} {'speedup':>8}")
+    print(f"{'flag-fp32':<12} {1.0:>9.4f} {1.0:>9.4f} {0.0:>10.5f} {reference_rate:>11.1f} {1.0:>7.2f}x")
+
+    for name, backend in candidates.items():
+        report = parity_report(backend, reference, texts)
+        rate = throughput(backend, texts, args.batch_size)
+        print(
+            f"{name:<12} {report['mean_cosine']:>9.4f} {report['min_cosine']:>9.4f} "
+            f"{report['p95_drift']:>10.5f} {rate:>11.1f} {rate / reference_rate:>7.2f}x"
+        )
+
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
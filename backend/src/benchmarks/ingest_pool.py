@@ -0,0 +1,65 @@
+"""
+Benchmark: ingestion throughput of the embedding process pool.
+Reports chunks/sec as the number of workers scales from 1 to N.
+Run this from the backend/src directory: python -m benchmarks.ingest_pool [--chunks 384] [--max-workers 8]
+"""
+import os
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+src_path = Path(__file__).parent.parent
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from benchmarks.corpus import synthetic_chunks
+from rag.ingest_pool import EmbeddingProcessPool
+
+
+def worker_counts(max_workers: int):
+    """1, 2, 4, ... up to max_workers (always including max_workers itself)."""
+    count = 1
+    while count < max_workers:
+        yield count
+        count *= 2
+    yield max_workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=384)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--torch-threads", type=int, default=0, help="Per worker (0 = cpu_count // workers)")
+    parser.add_argument("--batch-size", type=int, default=12)
+    args = parser.parse_args()
+
+    chunks = synthetic_chunks(args.chunks)
+
+    print("\n" + "=" * 80)
+    print(f"🚀 INGESTION POOL BENCHMARK ({len(chunks)} chunks, {os.cpu_count()} CPUs)")
+    print("=" * 80)
+    print(f"{'workers':>8} {'threads/worker':>15} {'seconds':>10} {'chunks/sec':>12} {'speedup':>9}")
+
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        pool = EmbeddingProcessPool(workers, args.torch_threads, batch_size=args.batch_size)
+        try:
+            # Model loading is a one-off cost; keep it out of the measurement
+            pool.warmup()
+            start = time.perf_counter()
+            pool.encode(chunks)
+            elapsed = time.perf_counter() - start
+        finally:
+            pool.shutdown()
+
+        rate = len(chunks) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {pool.torch_threads:>15} {elapsed:>10.2f} {rate:>12.1f} {rate / baseline:>8.2f}x")
+
+    print("=" * 80 + "\n")
+
+
+if __name__ == "__main__":
+    main()
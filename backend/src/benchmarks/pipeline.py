@@ -0,0 +1,102 @@
+"""
+Benchmark: ingest -> retrieve on an embedded Qdrant (no external services).
+Uploads a synthetic corpus through vectorize_and_upload, then times retrieve_documents
+per query (p50 / p95 / p99). Deterministic corpus and queries, so runs are comparable.
+Run this from the backend/src directory:
+    python -m benchmarks.pipeline [--qdrant-mode memory|local] [--documents 200] [--queries 200]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+# Add src to path for imports
+src_path = Path(__file__).parent.parent
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from benchmarks.corpus import synthetic_chunks
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(args):
+    # Imported after the environment is set: rag.config reads it at import time
+    from models.auth import SystemRole
+    from rag.config import get_qdrant_client, get_embedding_model, COLLECTION_NAME, QDRANT_MODE, EMBEDDING_BACKEND
+    from rag.collection import ensure_collection
+    from rag.vectorizer import vectorize_and_upload
+    from rag.retrieval import retrieve_documents
+
+    client = get_qdrant_client()
+    if await client.collection_exists(COLLECTION_NAME):
+        await client.delete_collection(COLLECTION_NAME)
+    await ensure_collection(client)
+    await asyncio.to_thread(get_embedding_model)  # Model loading is a one-off cost
+
+    sensitivities = ["public", "internal", "privileged", "discovery"]
+    chunks = synthetic_chunks(args.documents * args.chunks_per_document, seed=args.seed)
+
+    print("\n" + "=" * 80)
+    print(f"🚀 PIPELINE BENCHMARK (qdrant={QDRANT_MODE}, embeddings={EMBEDDING_BACKEND}, "
+          f"{args.documents} docs x ~{args.chunks_per_document} chunks)")
+    print("=" * 80)
+
+    start = time.perf_counter()
+    for d in range(args.documents):
+        text = " ".join(chunks[d * args.chunks_per_document:(d + 1) * args.chunks_per_document])
+        await vectorize_and_upload(text, {
+            "mongo_document_id": f"doc-{d:05d}",
+            "filename": f"document_{d:05d}.txt",
+            "matter_id": f"matter-{d % 10}",
+            "sensitivity": sensitivities[d % len(sensitivities)],
+        })
+    ingest_seconds = time.perf_counter() - start
+    points = (await client.count(COLLECTION_NAME, exact=True)).count
+    print(f"Ingest:    {points} points in {ingest_seconds:.2f}s ({points / ingest_seconds:.1f} chunks/sec)")
+
+    # Queries: the first sentence of unseen chunks, so every query misses the embedding cache
+    queries = [c.split(".")[0] for c in synthetic_chunks(args.queries, seed=args.seed + 1)]
+    roles = [SystemRole.PARTNER, SystemRole.STAFF, SystemRole.CLIENT]
+    print(f"{'role':<10} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'mean ms':>9}")
+    for role in roles:
+        latencies = []
+        for query in queries:
+            t = time.perf_counter()
+            await retrieve_documents(f"{query} ({role.value})", role, top_k=5)
+            latencies.append((time.perf_counter() - t) * 1000)
+        print(f"{role.value:<10} {len(latencies):>8} {percentile(latencies, 0.5):>9.2f} "
+              f"{percentile(latencies, 0.95):>9.2f} {percentile(latencies, 0.99):>9.2f} "
+              f"{statistics.fmean(latencies):>9.2f}")
+    print("=" * 80 + "\n")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--qdrant-mode", choices=["memory", "local"], default="memory")
+    parser.add_argument("--qdrant-path", default="./qdrant_bench", help="Store for --qdrant-mode local")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--chunks-per-document", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.environ["QDRANT_MODE"] = args.qdrant_mode
+    os.environ["QDRANT_PATH"] = args.qdrant_path
+    # Keep the run self-contained: no lexical index file, no cross-run caches
+    os.environ.pop("LEXICAL_INDEX_PATH", None)
+    os.environ["CHUNK_STORE_PATH"] = ":memory:"
+    os.environ.setdefault("CHUNK_STORE_ENCRYPTED", "false")
+    os.environ.setdefault("INGEST_WORKERS", "1")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
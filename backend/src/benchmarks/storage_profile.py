@@ -0,0 +1,128 @@
+"""
+Benchmark: vector storage profiles (memory / scalar int8 / binary) on a synthetic corpus.
+Reports resident vector memory, recall@5 against exact full-precision search, and p50/p99
+query latency for each profile. Quantization is a Qdrant server feature: run against a real
+server (QDRANT_MODE=remote); the embedded store ignores it and always reports recall 1.0.
+Run this from the backend/src directory:
+    python -m benchmarks.storage_profile [--chunks 20000] [--queries 200] [--oversampling 2.0]
+"""
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+src_path = Path(__file__).parent.parent
+if str(src_path) not in sys.path:
+    sys.path.insert(0, str(src_path))
+
+from qdrant_client import models
+
+from benchmarks.corpus import synthetic_chunks
+from rag.config import get_qdrant_client, get_embedding_model, EMBEDDING_DIM, QDRANT_MODE
+from rag.collection import ensure_collection, search_params, STORAGE_PROFILES
+
+TOP_K = 5
+UPSERT_BATCH = 256
+
+
+def vector_memory_mb(profile: str, count: int, dim: int):
+    """(RAM, disk) megabytes taken by the dense vectors alone, HNSW links excluded."""
+    full = count * dim * 4
+    if profile == "scalar":
+        return count * dim / 2**20, full / 2**20
+    if profile == "binary":
+        return count * dim / 8 / 2**20, full / 2**20
+    return full / 2**20, 0.0
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def wait_until_indexed(client, name, timeout_seconds=600):
+    deadline = time.monotonic() + timeout_seconds
+    while time.monotonic() < deadline:
+        info = await client.get_collection(name)
+        if info.status == models.CollectionStatus.GREEN:
+            return
+        await asyncio.sleep(1.0)
+
+
+async def search(client, name, vector, params):
+    response = await client.query_points(
+        collection_name=name, query=vector, using="dense_vector", limit=TOP_K,
+        search_params=params, with_payload=False
+    )
+    return [point.id for point in response.points]
+
+
+async def run(args):
+    client = get_qdrant_client()
+    if QDRANT_MODE != "remote":
+        print(f"⚠️ QDRANT_MODE={QDRANT_MODE}: the embedded store does not quantize; numbers are not representative.")
+
+    model = await asyncio.to_thread(get_embedding_model)
+    chunks = synthetic_chunks(args.chunks, seed=args.seed)
+    queries = [c.split(".")[0] for c in synthetic_chunks(args.queries, seed=args.seed + 1)]
+    vectors = model.encode(chunks, batch_size=32, return_dense=True)["dense_vecs"]
+    query_vectors = [v.tolist() for v in model.encode(queries, batch_size=32, return_dense=True)["dense_vecs"]]
+
+    print("\n" + "=" * 80)
+    print(f"🚀 STORAGE PROFILE BENCHMARK ({len(chunks)} chunks x {EMBEDDING_DIM} dims, {len(queries)} queries)")
+    print("=" * 80)
+
+    truth = None
+    rows = []
+    for profile in args.profiles:
+        name = f"bench_storage_{profile}"
+        if await client.collection_exists(name):
+            await client.delete_collection(name)
+        await ensure_collection(client, name, storage_profile=profile, hnsw_m=16)
+        for start in range(0, len(chunks), UPSERT_BATCH):
+            await client.upsert(name, points=[
+                models.PointStruct(id=i, vector={"dense_vector": vectors[i].tolist()})
+                for i in range(start, min(start + UPSERT_BATCH, len(chunks)))
+            ])
+        await wait_until_indexed(client, name)
+
+        if truth is None:
+            exact = models.SearchParams(exact=True)
+            truth = [set(await search(client, name, v, exact)) for v in query_vectors]
+
+        params = search_params(profile, oversampling=args.oversampling)
+        latencies, hits = [], 0
+        for vector, expected in zip(query_vectors, truth):
+            t = time.perf_counter()
+            found = await search(client, name, vector, params)
+            latencies.append((time.perf_counter() - t) * 1000)
+            hits += len(expected.intersection(found))
+
+        ram_mb, disk_mb = vector_memory_mb(profile, len(chunks), EMBEDDING_DIM)
+        rows.append((profile, ram_mb, disk_mb, hits / (TOP_K * len(query_vectors)),
+                     percentile(latencies, 0.5), percentile(latencies, 0.99)))
+        if not args.keep:
+            await client.delete_collection(name)
+
+    print(f"{'profile':<8} {'RAM MB':>9} {'disk MB':>9} {'recall@5':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for profile, ram_mb, disk_mb, recall, p50, p99 in rows:
+        print(f"{profile:<8} {ram_mb:>9.1f} {disk_mb:>9.1f} {recall:>9.3f} {p50:>8.2f} {p99:>8.2f}")
+    print("=" * 80 + "\n")
+    await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--profiles", nargs="+", choices=STORAGE_PROFILES, default=list(STORAGE_PROFILES))
+    parser.add_argument("--oversampling", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
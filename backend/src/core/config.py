@@ -4,10 +4,14 @@ from dotenv import load_dotenv
 load_dotenv()  # Load environment variables from .env file
 
 MONGO_URI = os.getenv("MONGO_URI")
+QDRANT_MODE = os.getenv("QDRANT_MODE", "remote").lower()  # remote | memory | local
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 GROQ_API_KEY = os.getenv("LLM_API_KEY")
 
-if not MONGO_URI or not QDRANT_URL or not QDRANT_API_KEY:
+if not MONGO_URI:
+    raise ValueError("One or more required environment variables are missing.")
+# Embedded Qdrant (memory / local) needs no URL or key
+if QDRANT_MODE == "remote" and (not QDRANT_URL or not QDRANT_API_KEY):
     raise ValueError("One or more required environment variables are missing.")
 
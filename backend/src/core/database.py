@@ -1,19 +1,19 @@
 # Mongo & Qdrant factories
-from xmlrpc import client
 from motor.motor_asyncio import AsyncIOMotorClient
 from beanie import init_beanie  
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient
 import os
-import ssl
-from .config import MONGO_URI, QDRANT_URL, QDRANT_API_KEY
+from .config import MONGO_URI
 import certifi
 # Import the models to register in the module
 from models.message import Conversation
 from models.matters import Matter
 from models.auth import User
 from models.documents import DocumentFile
+from models.chat import ChatSession, ChatMessage
+from rag.collection import ensure_serving_collection
 
-async def init_db():
+async def init_db(qdrant_client: AsyncQdrantClient):
     # Initialize MongoDB Client
     mongo_client = AsyncIOMotorClient(
         MONGO_URI,
@@ -28,58 +28,17 @@ async def init_db():
             User, 
             Matter, 
             DocumentFile, 
-            Conversation
+            Conversation,
+            ChatSession,
+            ChatMessage
         ]
     )
     
     print("✅ Database initialized! MongoDB and Beanie are connected.")
   
-    # Initialize Qdrant Client
-    qdrant_client = QdrantClient(
-        url=QDRANT_URL, 
-        api_key=QDRANT_API_KEY
-    )
-    
-    collection_name = "legal_documents"
-
-    # --- EDITED SECTION: SAFE INITIALIZATION ---
-    
-    # Check if the collection exists
-    if qdrant_client.collection_exists(collection_name):
-        # If it exists, do NOTHING. Just print success.
-        print(f"✅ Qdrant collection '{collection_name}' already exists. Skipping creation.")
-        
-    else:
-        # Only create if it does NOT exist
-        print(f"⚠️ Collection '{collection_name}' not found. Creating Cloud collection...")
-        
-        qdrant_client.create_collection(
-           collection_name=collection_name,
-           vectors_config={
-               "dense_vector": models.VectorParams(
-                   size=1024,  
-                   distance=models.Distance.COSINE
-               )
-           },
-        )
-        
-        # Create payload indexes for filtering
-        qdrant_client.create_payload_index(
-            collection_name=collection_name,
-            field_name="mongo_document_id",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        qdrant_client.create_payload_index(
-            collection_name=collection_name,
-            field_name="sensitivity",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        qdrant_client.create_payload_index(
-            collection_name=collection_name,
-            field_name="matter_id",
-            field_schema=models.PayloadSchemaType.KEYWORD
-        )
-        
-        print("✅ Qdrant collection created and indexes set!")
+    # Qdrant: the application's shared async client is passed in by the lifespan
+    # (remote, or embedded in-memory / on-disk depending on QDRANT_MODE)
+    # COLLECTION_NAME is an alias onto a versioned collection (blue/green re-indexing)
+    await ensure_serving_collection(qdrant_client)
     
-    return mongo_client, qdrant_client
\ No newline at end of file
+    return mongo_client
\ No newline at end of file
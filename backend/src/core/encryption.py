@@ -34,7 +34,12 @@ class AES256Service:
         """
         if not plaintext:
             return b""
-            
+        return self.encrypt_bytes(plaintext.encode('utf-8'))
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """
+        Same packed format as encrypt_text, for binary payloads (e.g. a serialized index).
+        """
         # 1. Generate a unique Nonce (12 bytes is standard for GCM)
         nonce = os.urandom(12)
         
@@ -47,7 +52,7 @@ class AES256Service:
         encryptor = cipher.encryptor()
         
         # 3. Encrypt
-        ciphertext = encryptor.update(plaintext.encode('utf-8')) + encryptor.finalize()
+        ciphertext = encryptor.update(data) + encryptor.finalize()
         
         # 4. Pack the result: Nonce + Ciphertext + Tag
         # We need all three to decrypt, so we store them together.
@@ -61,7 +66,12 @@ class AES256Service:
         """
         if not encrypted_blob:
             return ""
+        return self.decrypt_bytes(encrypted_blob).decode('utf-8')
 
+    def decrypt_bytes(self, encrypted_blob: bytes) -> bytes:
+        """
+        Inverse of encrypt_bytes. Raises ValueError if the key is wrong or the data was tampered with.
+        """
         try:
             # 1. Unpack the blob
             # First 12 bytes = Nonce
@@ -80,7 +90,7 @@ class AES256Service:
             decryptor = cipher.decryptor()
 
             # 3. Decrypt
-            return (decryptor.update(ciphertext) + decryptor.finalize()).decode('utf-8')
+            return decryptor.update(ciphertext) + decryptor.finalize()
             
         except Exception as e:
             # This fails if the key is wrong OR if the data was tampered with (Tag mismatch)
@@ -1,10 +1,19 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
-from backend.src.routers import chat
 from core.database import init_db
-from routers import auth_router, documents_router 
+from rag.config import (
+    warmup_engine,
+    close_llm_clients,
+    create_qdrant_client,
+    set_qdrant_client,
+    close_qdrant_client,
+)
+from rag.lexical_index import lexical_index
+from rag.chunk_store import chunk_store
+from routers import auth_router, documents_router, chat, health
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -14,14 +23,28 @@ async def lifespan(app: FastAPI):
     and AFTER the app stops (to close connections).
     """
     
-    # 1. Initialize MongoDB & Beanie
-    # This connects to Mongo and sets up your User/Document/Matter models
-    mongo_client, qdrant_client = await init_db()
+    # 1. Initialize MongoDB & Beanie + the ONE async Qdrant client
+    # This connects to Mongo and sets up your User/Document/Matter models;
+    # retrieval, ingestion and the upload verifier all share the Qdrant connection pool.
+    qdrant_client = create_qdrant_client()
+    set_qdrant_client(qdrant_client)
+    app.state.qdrant_client = qdrant_client
+    mongo_client = await init_db(qdrant_client)
+    app.state.mongo_client = mongo_client
+
+    # 2. Warm up the AI Engine in the background
+    # The port binds immediately; /health/ready turns green once the model is hot.
+    app.state.warmup_task = asyncio.create_task(warmup_engine())
     
     # Yield control -> The Application runs now
     yield
     
-    # 2. Cleanup (When you press Ctrl+C)
+    # 3. Cleanup (When you press Ctrl+C)
+    app.state.warmup_task.cancel()
+    lexical_index.persist(force=True)
+    chunk_store.close()
+    await close_llm_clients()
+    await close_qdrant_client()
     mongo_client.close()
     print("✅ Database connections closed. Application shutdown complete.")
 
@@ -45,6 +68,7 @@ app.add_middleware(
 app.include_router(auth_router.router)       # /auth/login
 app.include_router(documents_router.router)  # /documents/upload
 app.include_router(chat.router)        # /search/query
+app.include_router(health.router)      # /health/live, /health/ready
 
 @app.get("/")
 async def root():
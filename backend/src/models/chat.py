@@ -19,6 +19,11 @@ class ChatSession(Document):
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
+    # Rolling memory: LLM summary of every message up to `summarized_until` (see services/chat_memory.py)
+    summary: Optional[str] = None
+    summarized_until: Optional[datetime] = None
+    summarized_messages: int = 0
+
     class Settings:
         name = "chat_sessions"
         indexes = [
@@ -33,6 +38,9 @@ class ChatMessage(Document):
     
     # 2. Embedding the Citations directly in the message
     citations: List[Citation] = [] 
+
+    # True when generation was interrupted (client disconnect, LLM error): content is incomplete
+    partial: bool = False
     
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -25,4 +25,9 @@ class Matter(Document):
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
     class Settings:
-        name = "matters"
\ No newline at end of file
+        name = "matters"
+        # Matter scoping looks matters up by the DBRef ids of their client / team
+        indexes = [
+            "client.$id",
+            "assigned_team.$id"
+        ]
\ No newline at end of file
@@ -2,9 +2,11 @@
 RAG module - exports all RAG functionality.
 """
 from rag.vectorizer import vectorize, vectorize_and_upload, VectorPayload, VectorMetadata
-from rag.retrieval import retrieve_documents, get_allowed_sensitivities
-from rag.generator import generate_answer
-from rag.router import check_if_search_needed, rewrite_query
+from rag.retrieval import retrieve_documents, lexical_search, encode_query, query_similarity, get_allowed_sensitivities
+from rag.generator import generate_answer, generate_answer_stream, GENERATION_ERROR_PREFIX, GenerationError
+from rag.router import check_if_search_needed, rewrite_query, route_query, route_and_rewrite, plan_query
+from rag.answer_cache import answer_cache, permission_scope, cited_document_ids
+from rag.speculation import speculative_retriever
 
 # Backward compatibility alias
 retrieve_safe_documents = retrieve_documents
@@ -14,10 +16,23 @@ __all__ = [
     "vectorize_and_upload",
     "retrieve_documents",
     "retrieve_safe_documents",  # Backward compatibility
+    "lexical_search",
+    "encode_query",
+    "query_similarity",
     "get_allowed_sensitivities",
     "generate_answer",
+    "generate_answer_stream",
+    "GENERATION_ERROR_PREFIX",
+    "GenerationError",
     "check_if_search_needed",
     "rewrite_query",
+    "route_query",
+    "route_and_rewrite",
+    "plan_query",
+    "answer_cache",
+    "permission_scope",
+    "cited_document_ids",
+    "speculative_retriever",
     "VectorPayload",
     "VectorMetadata",
 ]
@@ -0,0 +1,226 @@
+"""
+Semantic answer cache for RAG system.
+Serves a previous final answer when a new question is semantically the same (cosine above a
+threshold) AND was asked under exactly the same permission scope. Entries remember the
+documents and matters they cited, and are dropped when any of them changes.
+
+A first turn (no history) is looked up before routing and retrieval. A later turn is only
+looked up once it has been rewritten to a standalone question and retrieval has run, and
+the entry must have been answered from the same set of documents.
+"""
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import numpy as np
+
+from rag.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+from rag.metrics import register_metrics
+
+# A cached search turn skips the router, the rewrite and the generation calls
+LLM_CALLS_PER_SEARCH_TURN = 3
+# A hit validated against a fresh retrieval only skips the generation call
+LLM_CALLS_PER_GENERATION = 1
+
+
+@dataclass
+class CachedAnswer:
+    query: str
+    vector: np.ndarray
+    scope: FrozenSet[str]
+    answer: str
+    sources: List[Dict]
+    document_ids: FrozenSet[str]
+    matter_ids: FrozenSet[str]
+    llm_calls: int = LLM_CALLS_PER_SEARCH_TURN
+    created_at: float = field(default_factory=time.monotonic)
+
+
+def permission_scope(
+    allowed_sensitivities: Iterable[str],
+    matter_ids: Optional[Iterable[str]] = None,
+) -> FrozenSet[str]:
+    """The cache partition key: answers never cross a permission (or matter) boundary."""
+    scope = set(allowed_sensitivities)
+    if matter_ids is not None:
+        scope.add("matters:")  # Distinguishes "no matters" from "matter scoping off"
+        scope.update(f"matter:{matter_id}" for matter_id in matter_ids)
+    return frozenset(scope)
+
+
+def cited_document_ids(sources: Iterable[Dict]) -> FrozenSet[str]:
+    return frozenset(str(source.get("mongo_document_id")) for source in sources)
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / max(float(np.linalg.norm(vector)), 1e-12)
+
+
+class SemanticAnswerCache:
+    """
+    Entries are partitioned by permission scope; within a scope a lookup is one
+    matrix-vector product over the stacked (normalized) query vectors.
+    """
+
+    def __init__(self, enabled: bool, threshold: float, max_entries: int, ttl_seconds: float):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._scopes: Dict[FrozenSet[str], List[CachedAnswer]] = {}
+        self._matrices: Dict[FrozenSet[str], np.ndarray] = {}
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0, "saved_llm_calls": 0}
+
+    def _rebuild(self, scope: FrozenSet[str]) -> None:
+        entries = self._scopes.get(scope)
+        if entries:
+            self._matrices[scope] = np.stack([entry.vector for entry in entries])
+        else:
+            self._scopes.pop(scope, None)
+            self._matrices.pop(scope, None)
+
+    def _expire(self, scope: FrozenSet[str]) -> None:
+        now = time.monotonic()
+        entries = self._scopes.get(scope, [])
+        alive = [entry for entry in entries if now - entry.created_at <= self.ttl_seconds]
+        if len(alive) != len(entries):
+            self._count -= len(entries) - len(alive)
+            self._scopes[scope] = alive
+            self._rebuild(scope)
+
+    def lookup(
+        self,
+        query_vector,
+        scope: FrozenSet[str],
+        document_ids: Optional[FrozenSet[str]] = None,
+    ) -> Optional[CachedAnswer]:
+        """
+        Best entry of `scope` above the threshold. With `document_ids` (the documents a fresh
+        retrieval returned for this turn), only an entry cited from exactly those documents hits.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._expire(scope)
+            matrix = self._matrices.get(scope)
+            if matrix is None:
+                self._stats["misses"] += 1
+                return None
+
+            similarities = matrix @ _normalize(query_vector)
+            entries = self._scopes[scope]
+            if document_ids is not None:
+                similarities = np.where(
+                    [entry.document_ids == document_ids for entry in entries], similarities, -np.inf
+                )
+            best = int(np.argmax(similarities))
+            entry = entries[best]
+
+            # Defense in depth: every cited chunk must be visible in this scope
+            if similarities[best] < self.threshold or any(
+                source.get("sensitivity") not in scope for source in entry.sources
+            ):
+                self._stats["misses"] += 1
+                return None
+
+            self._stats["hits"] += 1
+            self._stats["saved_llm_calls"] += entry.llm_calls if document_ids is None else LLM_CALLS_PER_GENERATION
+            return entry
+
+    def store(self, query: str, query_vector, scope: FrozenSet[str], answer: str, sources: List[Dict]) -> None:
+        if not self.enabled or not sources:
+            return
+        entry = CachedAnswer(
+            query=query,
+            vector=_normalize(query_vector),
+            scope=scope,
+            answer=answer,
+            sources=sources,
+            document_ids=cited_document_ids(sources),
+            matter_ids=frozenset(str(s.get("matter_id")) for s in sources),
+        )
+        with self._lock:
+            entries = self._scopes.setdefault(scope, [])
+            # Same question answered from the same documents: keep only the newest answer
+            for i, existing in enumerate(entries):
+                if existing.document_ids == entry.document_ids and float(existing.vector @ entry.vector) >= self.threshold:
+                    entries.pop(i)
+                    self._count -= 1
+                    break
+            entries.append(entry)
+            self._count += 1
+            self._stats["stores"] += 1
+
+            if self._count > self.max_entries:
+                self._evict_oldest()
+            self._rebuild(scope)
+
+    def _evict_oldest(self) -> None:
+        scope, index = min(
+            ((scope, i) for scope, entries in self._scopes.items() for i in range(len(entries))),
+            key=lambda item: self._scopes[item[0]][item[1]].created_at,
+        )
+        self._scopes[scope].pop(index)
+        self._count -= 1
+        self._rebuild(scope)
+
+    def _invalidate(self, predicate) -> int:
+        removed = 0
+        with self._lock:
+            for scope in list(self._scopes):
+                entries = self._scopes[scope]
+                kept = [entry for entry in entries if not predicate(entry)]
+                if len(kept) != len(entries):
+                    removed += len(entries) - len(kept)
+                    self._scopes[scope] = kept
+                    self._rebuild(scope)
+            self._count -= removed
+            self._stats["invalidated"] += removed
+        return removed
+
+    def invalidate_document(self, mongo_document_id: str) -> int:
+        return self._invalidate(lambda entry: str(mongo_document_id) in entry.document_ids)
+
+    def invalidate_matter(self, matter_id: str) -> int:
+        """A new or re-uploaded document can change any answer drawn from its matter."""
+        return self._invalidate(lambda entry: str(matter_id) in entry.matter_ids)
+
+    def clear(self) -> int:
+        """Drops every entry (e.g. after the collection behind COLLECTION_NAME was swapped)."""
+        with self._lock:
+            removed = self._count
+            self._scopes.clear()
+            self._matrices.clear()
+            self._count = 0
+            self._stats["invalidated"] += removed
+        return removed
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": self._count,
+                "scopes": len(self._scopes),
+                "enabled": self.enabled,
+            }
+
+
+# Global Singleton
+answer_cache = SemanticAnswerCache(
+    enabled=ANSWER_CACHE_ENABLED,
+    threshold=ANSWER_CACHE_THRESHOLD,
+    max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+)
+register_metrics("answer_cache", answer_cache.stats)
@@ -0,0 +1,237 @@
+"""
+Chunk store for RAG system.
+Qdrant points only carry filter keys and ids; the chunk text (and filename) lives here,
+in a local SQLite table keyed by (mongo_document_id, chunk_index), encrypted at rest with
+the vault key. Lookups are batched (one query per search) behind an in-memory LRU of hot chunks.
+
+Rows are namespaced by collection so a blue/green re-index can build the next version's
+chunks next to the live ones and promote them at swap time (see services/reindex.py).
+The store also holds the serving generation, a counter bumped on every swap/rollback that
+other worker processes poll to drop their in-process state (see rag/generation.py).
+"""
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from rag.config import (
+    COLLECTION_NAME,
+    CHUNK_STORE_PATH,
+    CHUNK_STORE_ENCRYPTED,
+    CHUNK_STORE_CACHE_ENTRIES,
+)
+from rag.metrics import register_metrics
+
+ChunkKey = Tuple[str, int]
+
+# SQLite caps bound parameters per statement (999 on older builds); 2 per key + namespace
+_LOOKUP_BATCH = 400
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    namespace TEXT NOT NULL,
+    mongo_document_id TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    text BLOB NOT NULL,
+    PRIMARY KEY (namespace, mongo_document_id, chunk_index)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta VALUES ('generation', 0);
+"""
+
+
+class ChunkStore:
+    """
+    One SQLite connection shared across threads behind a lock; the hot cache holds
+    decrypted chunks of the live namespace only.
+    """
+
+    def __init__(self, path: str, encrypted: bool, cache_entries: int):
+        self.path = path
+        self.encrypted = encrypted
+        self.cache_entries = cache_entries
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cipher = None
+        self._lock = threading.RLock()
+        self._cache: "OrderedDict[ChunkKey, Dict]" = OrderedDict()
+        self._seen_generation: Optional[int] = None
+        self._stats = {"lookups": 0, "keys": 0, "cache_hits": 0, "missing": 0, "writes": 0, "total_lookup_ms": 0.0}
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+            print(f"📚 Chunk store ready at {self.path}")
+        return self._conn
+
+    def _get_cipher(self):
+        if self._cipher is None:
+            from core.encryption import AES256Service
+            self._cipher = AES256Service()
+        return self._cipher
+
+    def _seal(self, text: str) -> bytes:
+        return self._get_cipher().encrypt_text(text) if self.encrypted else text.encode("utf-8")
+
+    def _open(self, blob: bytes) -> str:
+        return self._get_cipher().decrypt_text(blob) if self.encrypted else bytes(blob).decode("utf-8")
+
+    # --- WRITES ---
+    def put_document(self, metadata: Dict, chunks: List[str], namespace: str = COLLECTION_NAME) -> None:
+        """Stores a document's chunks (chunk_index = position), replacing any previous version."""
+        mongo_document_id = str(metadata.get("mongo_document_id", ""))
+        filename = str(metadata.get("filename", ""))
+        rows = [(namespace, mongo_document_id, i, filename, self._seal(text)) for i, text in enumerate(chunks)]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                conn.execute(
+                    "DELETE FROM chunks WHERE namespace = ? AND mongo_document_id = ?", (namespace, mongo_document_id)
+                )
+                conn.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?)", rows)
+            if namespace == COLLECTION_NAME:
+                for key in [key for key in self._cache if key[0] == mongo_document_id]:
+                    del self._cache[key]
+            self._stats["writes"] += len(rows)
+
+    def delete_document(self, mongo_document_id: str, namespace: str = COLLECTION_NAME) -> None:
+        with self._lock:
+            self._connection().execute(
+                "DELETE FROM chunks WHERE namespace = ? AND mongo_document_id = ?", (namespace, str(mongo_document_id))
+            )
+            if namespace == COLLECTION_NAME:
+                for key in [key for key in self._cache if key[0] == str(mongo_document_id)]:
+                    del self._cache[key]
+
+    # --- READS ---
+    def get_many(self, keys: Iterable[ChunkKey]) -> Dict[ChunkKey, Dict]:
+        """
+        {(mongo_document_id, chunk_index): {"filename", "text_snippet"}} for the live collection.
+        Keys not in the store are simply absent from the result.
+        """
+        start = time.perf_counter()
+        wanted = list(dict.fromkeys((str(doc_id), int(index)) for doc_id, index in keys))
+        found: Dict[ChunkKey, Dict] = {}
+        with self._lock:
+            misses = []
+            for key in wanted:
+                chunk = self._cache.get(key)
+                if chunk is None:
+                    misses.append(key)
+                else:
+                    self._cache.move_to_end(key)
+                    found[key] = chunk
+            self._stats["cache_hits"] += len(wanted) - len(misses)
+
+            conn = self._connection() if misses else None
+            for i in range(0, len(misses), _LOOKUP_BATCH):
+                batch = misses[i:i + _LOOKUP_BATCH]
+                placeholders = ",".join("(?, ?)" for _ in batch)
+                rows = conn.execute(
+                    "SELECT mongo_document_id, chunk_index, filename, text FROM chunks "
+                    f"WHERE namespace = ? AND (mongo_document_id, chunk_index) IN (VALUES {placeholders})",
+                    [COLLECTION_NAME] + [value for key in batch for value in key],
+                ).fetchall()
+                for doc_id, index, filename, blob in rows:
+                    chunk = {"filename": filename, "text_snippet": self._open(blob)}
+                    found[(doc_id, index)] = chunk
+                    self._cache[(doc_id, index)] = chunk
+            while len(self._cache) > self.cache_entries:
+                self._cache.popitem(last=False)
+
+            self._stats["lookups"] += 1
+            self._stats["keys"] += len(wanted)
+            self._stats["missing"] += len(wanted) - len(found)
+            self._stats["total_lookup_ms"] += (time.perf_counter() - start) * 1000
+        return found
+
+    # --- VERSIONS ---
+    def promote(self, namespace: str, retire_as: Optional[str]) -> None:
+        """
+        Makes `namespace` the live chunk set. The current live rows are kept under
+        `retire_as` (the collection they belonged to) for rollback, or dropped if None.
+        """
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                if retire_as:
+                    conn.execute("DELETE FROM chunks WHERE namespace = ?", (retire_as,))
+                    conn.execute("UPDATE chunks SET namespace = ? WHERE namespace = ?", (retire_as, COLLECTION_NAME))
+                else:
+                    conn.execute("DELETE FROM chunks WHERE namespace = ?", (COLLECTION_NAME,))
+                conn.execute("UPDATE chunks SET namespace = ? WHERE namespace = ?", (COLLECTION_NAME, namespace))
+            self._cache.clear()
+        self.bump_generation()
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._connection().execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+
+    def bump_generation(self) -> int:
+        """Tells every process sharing this store that what COLLECTION_NAME serves has changed."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+                self._seen_generation = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+            return self._seen_generation
+
+    def generation_changed(self) -> bool:
+        """
+        True (once) when another process bumped the generation since this one last looked.
+        The hot cache is dropped: its chunks may belong to the retired version.
+        """
+        with self._lock:
+            current = self.generation()
+            if self._seen_generation is None:
+                self._seen_generation = current
+                return False
+            if current == self._seen_generation:
+                return False
+            self._seen_generation = current
+            self._cache.clear()
+            return True
+
+    def drop_namespace(self, namespace: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            if namespace == COLLECTION_NAME:
+                self._cache.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+            self._cache.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self._stats["lookups"]
+            return {
+                **self._stats,
+                "avg_lookup_ms": round(self._stats["total_lookup_ms"] / lookups, 3) if lookups else 0.0,
+                "cache_hit_rate": round(self._stats["cache_hits"] / self._stats["keys"], 4) if self._stats["keys"] else 0.0,
+                "cached_chunks": len(self._cache),
+                "encrypted": self.encrypted,
+            }
+
+
+# Global Singleton
+chunk_store = ChunkStore(
+    path=CHUNK_STORE_PATH,
+    encrypted=CHUNK_STORE_ENCRYPTED,
+    cache_entries=CHUNK_STORE_CACHE_ENTRIES,
+)
+register_metrics("chunk_store", chunk_store.stats)
@@ -0,0 +1,246 @@
+"""
+Collection schema for RAG system.
+The single definition of the Qdrant collection (named dense + sparse vectors, payload indexes),
+applied identically to remote Qdrant and to the embedded in-memory / on-disk store.
+The collection is partitioned by matter: matter_id is a tenant index and HNSW links are built
+per matter, so a matter-scoped search only walks that matter's graph.
+Dense vectors follow the deployment's storage profile (QDRANT_STORAGE_PROFILE).
+COLLECTION_NAME is an alias onto a versioned collection ("legal_documents_v20260101120000"),
+so a re-index can build the next version and swap it in atomically (see services/reindex.py).
+"""
+import asyncio
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from qdrant_client import AsyncQdrantClient, models
+
+from rag.config import (
+    COLLECTION_NAME,
+    EMBEDDING_DIM,
+    QDRANT_HNSW_M,
+    QDRANT_TENANT_PAYLOAD_M,
+    QDRANT_STORAGE_PROFILE,
+    QDRANT_QUANTIZATION_OVERSAMPLING,
+    QDRANT_QUANTIZATION_RESCORE,
+)
+
+STORAGE_PROFILES = ("memory", "scalar", "binary")
+
+# Keyword indexes backing the security and document filters
+PAYLOAD_INDEXES = ["mongo_document_id", "sensitivity"]
+
+# The tenant key: Qdrant co-locates each matter's points and builds a graph per matter
+TENANT_FIELD = "matter_id"
+
+
+def quantization_config(profile: str) -> Optional[models.QuantizationConfig]:
+    """The in-RAM quantized copy for a storage profile (None = full-precision vectors in RAM)."""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{profile}' (expected one of {', '.join(STORAGE_PROFILES)})")
+    if profile == "scalar":
+        return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+            type=models.ScalarType.INT8, quantile=0.99, always_ram=True
+        ))
+    if profile == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
+def search_params(
+    profile: str = QDRANT_STORAGE_PROFILE,
+    oversampling: float = QDRANT_QUANTIZATION_OVERSAMPLING,
+) -> Optional[models.SearchParams]:
+    """Query-time params for dense search: oversample on the quantized copy, rescore with the originals."""
+    if profile == "memory":
+        return None
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=QDRANT_QUANTIZATION_RESCORE,
+        oversampling=oversampling,
+    ))
+
+
+def current_profile(info) -> str:
+    quantization = info.config.quantization_config
+    if isinstance(quantization, models.BinaryQuantization):
+        return "binary"
+    if isinstance(quantization, models.ScalarQuantization):
+        return "scalar"
+    return "memory"
+
+
+async def apply_storage_profile(
+    qdrant_client: AsyncQdrantClient, collection_name: str, profile: str, info=None
+) -> bool:
+    """Moves an existing collection to `profile` (re-quantizes in the background). True if it changed."""
+    info = info or await qdrant_client.get_collection(collection_name)
+    if current_profile(info) == profile:
+        return False
+    print(f"🔧 Collection '{collection_name}': storage profile {current_profile(info)} -> {profile}")
+    await qdrant_client.update_collection(
+        collection_name=collection_name,
+        vectors_config={"dense_vector": models.VectorParamsDiff(on_disk=profile != "memory")},
+        quantization_config=quantization_config(profile) or models.Disabled.DISABLED,
+    )
+    return True
+
+
+async def ensure_collection(
+    qdrant_client: AsyncQdrantClient,
+    collection_name: str = COLLECTION_NAME,
+    storage_profile: str = QDRANT_STORAGE_PROFILE,
+    hnsw_m: int = QDRANT_HNSW_M,
+) -> bool:
+    """
+    Creates the collection and its payload indexes if missing. Returns True if it was created.
+    An existing collection keeps its schema (only checked for the sparse vector and tenant index)
+    but is moved to the configured storage profile.
+    """
+    quantization = quantization_config(storage_profile)
+    if await qdrant_client.collection_exists(collection_name):
+        # If it exists, do NOTHING. Just print success.
+        print(f"✅ Qdrant collection '{collection_name}' already exists. Skipping creation.")
+
+        # Collections created before hybrid search have no sparse vector; it cannot be added in place
+        info = await qdrant_client.get_collection(collection_name)
+        if "sparse_vector" not in (info.config.params.sparse_vectors or {}):
+            print(f"⚠️ Collection '{collection_name}' has no 'sparse_vector'. "
+                  "Re-create it (and re-upload) or set HYBRID_SEARCH_ENABLED=false.")
+        # (Embedded Qdrant keeps no payload indexes at all: nothing to check there)
+        payload_schema = info.payload_schema or {}
+        tenant_index = payload_schema.get(TENANT_FIELD)
+        if payload_schema and (tenant_index is None or not getattr(tenant_index.params, "is_tenant", False)):
+            print(f"⚠️ Collection '{collection_name}' is not partitioned by '{TENANT_FIELD}'. "
+                  "Matter-scoped search works but walks the firm-wide graph; re-create it to partition.")
+        if payload_schema:  # Quantization is a server feature too
+            await apply_storage_profile(qdrant_client, collection_name, storage_profile, info)
+        return False
+
+    print(f"⚠️ Collection '{collection_name}' not found. Creating it...")
+    await qdrant_client.create_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "dense_vector": models.VectorParams(
+                size=EMBEDDING_DIM,
+                distance=models.Distance.COSINE,
+                # Quantized profiles keep only the small copy in RAM; originals are memory-mapped
+                on_disk=storage_profile != "memory"
+            )
+        },
+        quantization_config=quantization,
+        # BGE-M3 lexical weights for hybrid (keyword + vector) search
+        sparse_vectors_config={
+            "sparse_vector": models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=False)
+            )
+        },
+        # m=0 skips the firm-wide graph; payload_m builds one graph per matter instead
+        hnsw_config=models.HnswConfigDiff(m=hnsw_m, payload_m=QDRANT_TENANT_PAYLOAD_M),
+    )
+
+    # Create payload indexes for filtering
+    for field_name in PAYLOAD_INDEXES:
+        await qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=field_name,
+            field_schema=models.PayloadSchemaType.KEYWORD
+        )
+    await qdrant_client.create_payload_index(
+        collection_name=collection_name,
+        field_name=TENANT_FIELD,
+        field_schema=models.KeywordIndexParams(type=models.KeywordIndexType.KEYWORD, is_tenant=True)
+    )
+
+    print(f"✅ Qdrant collection created and indexes set! (storage profile: {storage_profile})")
+    return True
+
+
+# --- VERSIONED COLLECTIONS BEHIND THE ALIAS ---
+
+def versioned_collection_name(alias: str = COLLECTION_NAME) -> str:
+    return f"{alias}_v{datetime.now(timezone.utc):%Y%m%d%H%M%S}"
+
+
+async def resolve_alias(qdrant_client: AsyncQdrantClient, alias: str = COLLECTION_NAME) -> Optional[str]:
+    """The collection `alias` currently points to (None if it is not an alias)."""
+    for description in (await qdrant_client.get_aliases()).aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+async def list_versions(qdrant_client: AsyncQdrantClient, alias: str = COLLECTION_NAME) -> List[str]:
+    """Versioned collections of `alias`, oldest first."""
+    names = [c.name for c in (await qdrant_client.get_collections()).collections]
+    return sorted(name for name in names if name.startswith(f"{alias}_v"))
+
+
+async def swap_alias(
+    qdrant_client: AsyncQdrantClient, collection_name: str, alias: str = COLLECTION_NAME
+) -> Optional[str]:
+    """
+    Atomically points `alias` at `collection_name` (delete + create in one request).
+    Returns the collection it pointed to before.
+    """
+    previous = await resolve_alias(qdrant_client, alias)
+    operations = []
+    if previous is not None:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    operations.append(models.CreateAliasOperation(
+        create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)
+    ))
+    await qdrant_client.update_collection_aliases(change_aliases_operations=operations)
+    print(f"🔀 Alias '{alias}': {previous or '-'} -> {collection_name}")
+    return previous
+
+
+async def replace_collection_with_alias(
+    qdrant_client: AsyncQdrantClient, collection_name: str, alias: str = COLLECTION_NAME, attempts: int = 3
+) -> None:
+    """
+    One-off migration of a pre-alias deployment: drops the concrete collection named `alias`
+    and immediately points the alias at `collection_name`.
+
+    Qdrant will not let an alias shadow an existing collection, so this cannot be one atomic
+    step: between the two requests searches fail, and the dropped collection has no rollback.
+    Alias creation is retried; if it still fails, ensure_serving_collection re-points the alias
+    at the newest version on the next startup.
+    """
+    await qdrant_client.delete_collection(alias)
+    for attempt in range(1, attempts + 1):
+        try:
+            await swap_alias(qdrant_client, collection_name, alias)
+            return
+        except Exception as e:
+            if attempt == attempts:
+                raise RuntimeError(
+                    f"Dropped legacy collection '{alias}' but could not point the alias at "
+                    f"'{collection_name}' ({e}). Restart the app to re-point it."
+                ) from e
+            print(f"⚠️ Alias creation failed ({e}), retrying...")
+            await asyncio.sleep(0.2 * attempt)
+
+
+async def ensure_serving_collection(qdrant_client: AsyncQdrantClient, alias: str = COLLECTION_NAME) -> str:
+    """
+    Makes sure COLLECTION_NAME resolves to a collection and returns that collection's name.
+    Fresh installs get a first versioned collection behind the alias; a pre-alias deployment
+    keeps its concrete collection until the first re-index migrates it.
+    """
+    target = await resolve_alias(qdrant_client, alias)
+    if target is not None:
+        await ensure_collection(qdrant_client, target)
+        return target
+    if await qdrant_client.collection_exists(alias):
+        await ensure_collection(qdrant_client, alias)
+        return alias
+    versions = await list_versions(qdrant_client, alias)
+    if versions:
+        # An interrupted legacy migration (or a lost alias): serve the newest version
+        print(f"⚠️ Alias '{alias}' missing; re-pointing it at '{versions[-1]}'.")
+        await ensure_collection(qdrant_client, versions[-1])
+        await swap_alias(qdrant_client, versions[-1], alias)
+        return versions[-1]
+    target = versioned_collection_name(alias)
+    await ensure_collection(qdrant_client, target)
+    await swap_alias(qdrant_client, target, alias)
+    return target
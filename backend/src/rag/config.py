@@ -1,36 +1,409 @@
 """
 Shared configuration and client initialization for RAG system.
-All clients are initialized once as singletons to avoid reloading.
+All clients are created lazily, once, as thread-safe singletons so that importing
+`rag` stays cheap. The API warms the embedding model in the background from the
+`main.py` lifespan (see warmup_engine), and /health/ready reports when it is hot.
 """
 import os
+import time
+import asyncio
+import threading
+from typing import Any, Dict
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient
-from FlagEmbedding import BGEM3FlagModel
-from groq import Groq
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 # --- CENTRALIZED CONFIGURATION ---
 load_dotenv()
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+
+# Where the vectors live: "remote" (QDRANT_URL + QDRANT_API_KEY), or embedded with no external
+# service: "memory" (lost on restart) or "local" (on disk at QDRANT_PATH). Embedded modes are
+# single-process: run one uvicorn worker.
+QDRANT_MODE = os.getenv("QDRANT_MODE", "remote").lower()
+QDRANT_PATH = os.getenv("QDRANT_PATH") or "./qdrant_data"
+
+# Matter scoping: users only search the matters they are client of / assigned to.
+# The collection is partitioned by matter_id (tenant payload index + per-matter HNSW graphs).
+MATTER_SCOPING_ENABLED = os.getenv("MATTER_SCOPING_ENABLED", "true").lower() == "true"
+MATTER_ACCESS_TTL_SECONDS = float(os.getenv("MATTER_ACCESS_TTL_SECONDS", "60"))
+QDRANT_TENANT_PAYLOAD_M = int(os.getenv("QDRANT_TENANT_PAYLOAD_M", "16"))  # per-matter graph degree
+# Global graph degree; 0 = per-matter graphs only (every search is matter-scoped)
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "0" if MATTER_SCOPING_ENABLED else "16"))
+
+# Vector storage profile (see rag/collection.py):
+#   memory - float32 vectors in RAM (4KB per 1024-dim chunk)
+#   scalar - int8 quantized copy in RAM (4x smaller), originals memory-mapped on disk
+#   binary - 1-bit quantized copy in RAM (32x smaller), originals memory-mapped on disk
+QDRANT_STORAGE_PROFILE = os.getenv("QDRANT_STORAGE_PROFILE", "memory").lower()
+# Quantized search fetches limit * oversampling candidates, then rescores them with the originals
+QDRANT_QUANTIZATION_OVERSAMPLING = float(os.getenv(
+    "QDRANT_QUANTIZATION_OVERSAMPLING", "3.0" if QDRANT_STORAGE_PROFILE == "binary" else "2.0"
+))
+QDRANT_QUANTIZATION_RESCORE = os.getenv("QDRANT_QUANTIZATION_RESCORE", "true").lower() == "true"
+
+# One application-scoped async Qdrant client (see get_qdrant_client)
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() == "true"
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))  # client-side seconds per request
+QDRANT_SEARCH_TIMEOUT = int(os.getenv("QDRANT_SEARCH_TIMEOUT", "5"))  # server-side seconds per query
+QDRANT_MAX_CONNECTIONS = int(os.getenv("QDRANT_MAX_CONNECTIONS", "32"))
+QDRANT_MAX_KEEPALIVE = int(os.getenv("QDRANT_MAX_KEEPALIVE", "16"))
 GROQ_API_KEY = os.getenv("LLM_API_KEY")
+LLM_BASE_URL = os.getenv("LLM_BASE_URL") or None
 COLLECTION_NAME = "legal_documents"
 
-# Initialize Clients ONCE (Global Singleton Pattern)
-print("⏳ Initializing Global AI Engine...")
+# LLM (Groq, OpenAI-compatible)
+LLM_MODEL = os.getenv("LLM_MODEL", "llama-3.1-8b-instant")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+
+# LLM dispatcher (see rag/llm_dispatcher.py): concurrency, rate limits and retries for every LLM call
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))  # 0 = unlimited
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # 0 = unlimited
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "20"))
+# "sequential": route, then rewrite | "concurrent": both at once | "fused": one structured call
+ROUTER_MODE = os.getenv("ROUTER_MODE", "sequential").lower()
+
+EMBEDDING_MODEL_NAME = os.getenv("EMBEDDING_MODEL_NAME", "BAAI/bge-m3")
+EMBEDDING_DIM = 1024
+
+# Embedding backend (see rag/embedding_backends.py): "flag" | "onnx" | "hashing"
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "flag").lower()
+EMBEDDING_ONNX_PATH = os.getenv("EMBEDDING_ONNX_PATH")
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() in ("1", "true", "int8")
+
+# Identifies the vector space: caches keyed on it never mix vectors from different backends
+EMBEDDING_MODEL_ID = f"{EMBEDDING_BACKEND}:{EMBEDDING_MODEL_NAME}" + (
+    ":int8" if EMBEDDING_BACKEND == "onnx" and EMBEDDING_ONNX_QUANTIZE else ""
+)
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+# Hybrid search: dense + BGE-M3 sparse lexical weights, fused with RRF in one Qdrant query
+HYBRID_SEARCH_ENABLED = os.getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"
+HYBRID_PREFETCH_LIMIT = int(os.getenv("HYBRID_PREFETCH_LIMIT", "20"))
+
+# In-process BM25 lexical index (see rag/lexical_index.py)
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH")  # unset = memory only
+LEXICAL_INDEX_SAVE_INTERVAL_SECONDS = float(os.getenv("LEXICAL_INDEX_SAVE_INTERVAL_SECONDS", "30"))
+LEXICAL_INDEX_ENCRYPTED = os.getenv("LEXICAL_INDEX_ENCRYPTED", "true").lower() == "true"  # vault key at rest
+LEXICAL_FUSION_ENABLED = os.getenv("LEXICAL_FUSION_ENABLED", "false").lower() == "true"
+
+# Local chunk store: points carry ids only, text is looked up here (see rag/chunk_store.py)
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH") or "./chunk_store.db"  # ":memory:" for tests/benchmarks
+CHUNK_STORE_ENCRYPTED = os.getenv("CHUNK_STORE_ENCRYPTED", "true").lower() == "true"  # vault key at rest
+CHUNK_STORE_CACHE_ENTRIES = int(os.getenv("CHUNK_STORE_CACHE_ENTRIES", "5000"))  # hot decrypted chunks
+
+# ColBERT late-interaction rerank (see rag/reranker.py)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))  # over-fetch before reranking
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "3"))  # chunks kept for the LLM after reranking
+RERANK_BUDGET_MS = float(os.getenv("RERANK_BUDGET_MS", "250"))
+RERANK_MAX_INFLIGHT = int(os.getenv("RERANK_MAX_INFLIGHT", "4"))  # bypass when more are queued
+RERANK_CACHE_MAX_MB = float(os.getenv("RERANK_CACHE_MAX_MB", "256"))
+
+# Post-retrieval selection: adaptive cutoff + MMR diversification (see rag/selection.py)
+# Off by default: it pulls every candidate's full-precision dense vector, which the
+# scalar/binary storage profiles keep on disk, so enable it only on the "memory" profile
+SELECTION_ENABLED = os.getenv("SELECTION_ENABLED", "false").lower() == "true"
+SELECTION_CANDIDATES = int(os.getenv("SELECTION_CANDIDATES", "20"))  # over-fetch before selecting
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 = pure relevance, 0.0 = pure diversity
+SELECTION_SCORE_GAP = float(os.getenv("SELECTION_SCORE_GAP", "0.15"))  # relevance drop that ends the list
+SELECTION_MIN_RELEVANCE = float(os.getenv("SELECTION_MIN_RELEVANCE", "0"))  # 0 = no absolute floor
+SELECTION_DUPLICATE_SIMILARITY = float(os.getenv("SELECTION_DUPLICATE_SIMILARITY", "0.95"))  # cosine; 1 = off
+
+# Semantic answer cache for /chat (see rag/answer_cache.py)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # cosine similarity
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Local pre-router (see rag/prerouter.py): the LLM router only sees the uncertain band
+PREROUTER_ENABLED = os.getenv("PREROUTER_ENABLED", "true").lower() == "true"
+PREROUTER_LOW = float(os.getenv("PREROUTER_LOW", "0.15"))  # p(search) below -> NO
+PREROUTER_HIGH = float(os.getenv("PREROUTER_HIGH", "0.85"))  # p(search) above -> YES
+
+# Speculative retrieval of the raw query while routing/rewriting (see rag/speculation.py)
+SPECULATIVE_RETRIEVAL_ENABLED = os.getenv("SPECULATIVE_RETRIEVAL_ENABLED", "true").lower() == "true"
+SPECULATION_SIMILARITY = float(os.getenv("SPECULATION_SIMILARITY", "0.92"))  # keep if rewrite is this close
+
+# Multi-query expansion: reformulations searched in one batched Qdrant request (see rag/router.py)
+QUERY_EXPANSION_ENABLED = os.getenv("QUERY_EXPANSION_ENABLED", "false").lower() == "true"
+QUERY_EXPANSION_VARIANTS = int(os.getenv("QUERY_EXPANSION_VARIANTS", "3"))  # on top of the standalone query
+
+# Prompt context assembly (see rag/context_packer.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # tokens of retrieved context per prompt
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "cl100k_base")  # tiktoken encoding
+
+# Conversation memory (see services/chat_memory.py)
+HISTORY_RECENT_MESSAGES = int(os.getenv("HISTORY_RECENT_MESSAGES", "6"))  # verbatim tail of the session
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))  # summary + recent turns
+HISTORY_SUMMARY_EVERY = int(os.getenv("HISTORY_SUMMARY_EVERY", "4"))  # older messages before a refresh
+HISTORY_SUMMARY_MAX_TOKENS = int(os.getenv("HISTORY_SUMMARY_MAX_TOKENS", "300"))
+
+# Coalesce identical in-flight router/rewrite/retrieval/generation calls (see rag/singleflight.py)
+SINGLEFLIGHT_ENABLED = os.getenv("SINGLEFLIGHT_ENABLED", "true").lower() == "true"
+
+# Blue/green re-indexing (see services/reindex.py)
+REINDEX_MAX_CHUNKS_PER_SECOND = float(os.getenv("REINDEX_MAX_CHUNKS_PER_SECOND", "50"))  # 0 = unthrottled
+REINDEX_KEEP_VERSIONS = int(os.getenv("REINDEX_KEEP_VERSIONS", "2"))  # live + one rollback
+# How often other workers poll for a swap (see rag/generation.py)
+GENERATION_CHECK_INTERVAL_SECONDS = float(os.getenv("GENERATION_CHECK_INTERVAL_SECONDS", "1"))
+
+# Query-time micro-batching (see rag/embedding_service.py)
+EMBED_BATCH_MAX_SIZE = int(os.getenv("EMBED_BATCH_MAX_SIZE", "32"))
+EMBED_BATCH_MAX_WAIT_MS = float(os.getenv("EMBED_BATCH_MAX_WAIT_MS", "5"))
+
+# Query embedding cache (see rag/query_cache.py)
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2048"))
+QUERY_CACHE_MAX_MB = float(os.getenv("QUERY_CACHE_MAX_MB", "32"))
+QUERY_CACHE_TTL_SECONDS = float(os.getenv("QUERY_CACHE_TTL_SECONDS", "3600"))
+
+# Ingestion process pool (see rag/ingest_pool.py). 1 = encode in-process.
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_TORCH_THREADS = int(os.getenv("INGEST_TORCH_THREADS", "0"))  # 0 = cpu_count // workers
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "12"))
+
+# --- LAZY SINGLETONS ---
+# One lock per client so a slow model load never blocks Qdrant/Groq access.
+_qdrant_lock = threading.Lock()
+_model_lock = threading.Lock()
+_groq_lock = threading.Lock()
+_splitter_lock = threading.Lock()
+
+_qdrant_client = None
+_embedding_model = None
+_groq_client = None
+_async_llm_client = None
+_text_splitter = None
+
+# Model lifecycle: "cold" -> "loading" -> "ready" | "failed"
+_model_state: Dict[str, Any] = {"status": "cold", "error": None, "load_seconds": None, "warmup_errors": {}}
+
+
+def create_qdrant_client():
+    """
+    Builds an async Qdrant client with a bounded keep-alive HTTP pool (or gRPC),
+    or an embedded store when QDRANT_MODE is "memory" / "local".
+    The app creates exactly one in its lifespan; see set_qdrant_client().
+    """
+    import httpx
+    from qdrant_client import AsyncQdrantClient
+    if QDRANT_MODE == "memory":
+        return AsyncQdrantClient(location=":memory:")
+    if QDRANT_MODE == "local":
+        return AsyncQdrantClient(path=QDRANT_PATH)
+    if QDRANT_MODE != "remote":
+        raise ValueError(f"Unknown QDRANT_MODE '{QDRANT_MODE}' (expected remote, memory or local)")
+    return AsyncQdrantClient(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        prefer_grpc=QDRANT_PREFER_GRPC,
+        grpc_port=QDRANT_GRPC_PORT,
+        timeout=QDRANT_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=QDRANT_MAX_CONNECTIONS,
+            max_keepalive_connections=QDRANT_MAX_KEEPALIVE,
+        ),
+    )
+
+
+def set_qdrant_client(client) -> None:
+    """Registers the application-scoped client (called from the lifespan)."""
+    global _qdrant_client
+    with _qdrant_lock:
+        _qdrant_client = client
+
+
+def get_qdrant_client():
+    """
+    A. The Brain (Qdrant). The shared AsyncQdrantClient: the one the lifespan registered,
+    or, outside the app (scripts, benchmarks), one created on first use.
+    """
+    global _qdrant_client
+    if _qdrant_client is None:
+        with _qdrant_lock:
+            if _qdrant_client is None:
+                _qdrant_client = create_qdrant_client()
+    return _qdrant_client
+
+
+async def close_qdrant_client() -> None:
+    """Releases the pooled Qdrant connections on shutdown."""
+    global _qdrant_client
+    if _qdrant_client is not None:
+        await _qdrant_client.close()
+        _qdrant_client = None
+
+
+def load_embedding_model():
+    """
+    Builds a NEW model instance. Use get_embedding_model() for the shared one;
+    this is for processes that need their own copy (ingestion workers).
+    """
+    # Deferred: pulls in numpy and, depending on the backend, torch or onnxruntime
+    from rag.embedding_backends import create_embedding_backend
+    return create_embedding_backend(
+        EMBEDDING_BACKEND,
+        model_name=EMBEDDING_MODEL_NAME,
+        dim=EMBEDDING_DIM,
+        onnx_path=EMBEDDING_ONNX_PATH,
+        onnx_quantize=EMBEDDING_ONNX_QUANTIZE,
+    )
+
+
+def get_embedding_model():
+    """
+    B. The Translator (BGE-M3 behind the configured EMBEDDING_BACKEND).
+    Loaded once; concurrent callers wait on the lock instead of loading 2GB twice.
+    """
+    global _embedding_model
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                _model_state.update(status="loading", error=None)
+                print(f"⏳ Loading embedding model '{EMBEDDING_MODEL_ID}'...")
+                start = time.perf_counter()
+                try:
+                    model = load_embedding_model()
+                except Exception as e:
+                    _model_state.update(status="failed", error=str(e))
+                    raise
+                _model_state.update(
+                    status="ready",
+                    load_seconds=round(time.perf_counter() - start, 2)
+                )
+                _embedding_model = model
+                print(f"✅ Embedding model ready ({_model_state['load_seconds']}s).")
+    return _embedding_model
+
+
+def get_groq_client():
+    """C. The Generator (LLM)."""
+    global _groq_client
+    if _groq_client is None:
+        with _groq_lock:
+            if _groq_client is None:
+                from groq import Groq
+                _groq_client = Groq(api_key=GROQ_API_KEY, base_url=LLM_BASE_URL)
+    return _groq_client
+
+
+def get_async_llm_client():
+    """
+    C'. The Generator, non-blocking.
+    One pooled keep-alive HTTP client with explicit connect/read timeouts, shared by
+    routing, rewriting and generation so no LLM call ever freezes the event loop.
+    """
+    global _async_llm_client
+    if _async_llm_client is None:
+        with _groq_lock:
+            if _async_llm_client is None:
+                import httpx
+                from groq import AsyncGroq
+                _async_llm_client = AsyncGroq(
+                    api_key=GROQ_API_KEY,
+                    base_url=LLM_BASE_URL,
+                    max_retries=0,  # Retries are owned by rag/llm_dispatcher.py
+                    http_client=httpx.AsyncClient(
+                        timeout=httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT),
+                        limits=httpx.Limits(
+                            max_connections=LLM_MAX_CONNECTIONS,
+                            max_keepalive_connections=LLM_MAX_KEEPALIVE,
+                            keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+                        ),
+                    ),
+                )
+    return _async_llm_client
+
+
+async def close_llm_clients() -> None:
+    """Releases pooled LLM connections on shutdown."""
+    global _async_llm_client
+    if _async_llm_client is not None:
+        await _async_llm_client.close()
+        _async_llm_client = None
+
+
+def get_text_splitter():
+    """D. The Text Splitter."""
+    global _text_splitter
+    if _text_splitter is None:
+        with _splitter_lock:
+            if _text_splitter is None:
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+                _text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+                )
+    return _text_splitter
+
+
+def is_model_ready() -> bool:
+    return _model_state["status"] == "ready"
+
+
+def get_model_status() -> Dict[str, Any]:
+    """Snapshot of the embedding model lifecycle for readiness probes."""
+    return {**_model_state, "warmup_errors": dict(_model_state["warmup_errors"])}
+
+
+async def _warm_optional(step: str, fn, *args) -> None:
+    """Runs a warmup step that must not keep the engine cold; a failure is recorded and skipped."""
+    try:
+        await asyncio.to_thread(fn, *args)
+    except Exception as e:
+        _model_state["warmup_errors"][step] = str(e)
+        print(f"⚠️ Warmup step '{step}' failed (continuing): {e}")
+
+
+async def warmup_engine() -> None:
+    """
+    Loads the heavy parts of the engine off the event loop.
+    Started as a background task from the lifespan so the API can bind its port immediately.
+    The embedding model goes first: readiness depends on it alone, so an optional step
+    (lexical index, tokenizer, pre-router) failing never leaves the engine cold.
+    """
+    print("⏳ Warming up AI Engine in the background...")
+    try:
+        await asyncio.to_thread(get_embedding_model)
+    except Exception as e:
+        # The failure is recorded in _model_state; /health/ready will report it.
+        print(f"❌ AI Engine warmup failed: {e}")
+        return
+
+    from rag.lexical_index import load_lexical_index
+    from rag.context_packer import count_tokens
+    from rag.prerouter import prerouter
+    await _warm_optional("text_splitter", get_text_splitter)
+    await _warm_optional("lexical_index", load_lexical_index)
+    await _warm_optional("tokenizer", count_tokens, "warmup")  # Fetches/loads the BPE file
+    await _warm_optional("prerouter", prerouter.train)
 
-# A. The Brain (Qdrant)
-qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    if _model_state["warmup_errors"]:
+        print(f"✅ AI Engine Ready (degraded: {', '.join(_model_state['warmup_errors'])}).")
+    else:
+        print("✅ AI Engine Ready.")
 
-# B. The Translator (BGE-M3 Model)
-# We load this once to avoid reloading 2GB weights on every request
-embedding_model = BGEM3FlagModel('BAAI/bge-m3', use_fp16=False)
 
-# C. The Generator (LLM)
-groq_client = Groq(api_key=GROQ_API_KEY)
+# Backward compatibility: `from rag.config import embedding_model` etc. still works,
+# but only resolves (and loads) the client when the attribute is actually accessed.
+_LAZY_ATTRIBUTES = {
+    "qdrant_client": get_qdrant_client,
+    "embedding_model": get_embedding_model,
+    "groq_client": get_groq_client,
+    "text_splitter": get_text_splitter,
+}
 
-# D. The Text Splitter
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
 
-print("✅ AI Engine Ready.")
+def __getattr__(name: str):
+    factory = _LAZY_ATTRIBUTES.get(name)
+    if factory is None:
+        raise AttributeError(f"module 'rag.config' has no attribute '{name}'")
+    return factory()
@@ -0,0 +1,142 @@
+"""
+Context packer module for RAG system.
+Turns retrieved chunks into prompt context: merges adjacent chunks of the same document,
+strips the splitter's duplicated overlap and packs spans by score into a token budget.
+"""
+import threading
+from typing import Dict, List, Optional
+
+from rag.config import CHUNK_OVERLAP, CONTEXT_TOKEN_BUDGET, CONTEXT_TOKENIZER
+from rag.metrics import register_metrics
+
+# Overlaps shorter than this are treated as coincidence, not splitter overlap
+MIN_OVERLAP_CHARS = 8
+
+# Per-span header overhead ("SOURCE: ... (Sensitivity: ...)\nCONTENT: " + separator)
+SPAN_HEADER_TOKENS = 24
+
+_tokenizer_lock = threading.Lock()
+_tokenizer = None
+_tokenizer_failed = False
+
+
+def _get_tokenizer():
+    """tiktoken encoding, loaded once. None when unavailable (e.g. no network to fetch the BPE file)."""
+    global _tokenizer, _tokenizer_failed
+    if _tokenizer is None and not _tokenizer_failed:
+        with _tokenizer_lock:
+            if _tokenizer is None and not _tokenizer_failed:
+                try:
+                    import tiktoken
+                    _tokenizer = tiktoken.get_encoding(CONTEXT_TOKENIZER)
+                except Exception as e:
+                    _tokenizer_failed = True
+                    print(f"⚠️ Tokenizer '{CONTEXT_TOKENIZER}' unavailable ({e}); estimating 4 chars/token.")
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return text[: max_tokens * 4]
+    return tokenizer.decode(tokenizer.encode(text, disallowed_special=())[:max_tokens])
+
+
+def overlap_length(previous: str, following: str, max_overlap: int = CHUNK_OVERLAP) -> int:
+    """Length of the longest suffix of `previous` that is also a prefix of `following`."""
+    limit = min(len(previous), len(following), max_overlap)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if previous.endswith(following[:size]):
+            return size
+    return 0
+
+
+class ContextPacker:
+
+    def __init__(self, token_budget: int):
+        self.token_budget = token_budget
+        self._stats = {
+            "packs": 0,
+            "chunks_in": 0,
+            "spans_out": 0,
+            "chunks_merged": 0,
+            "overlap_chars_stripped": 0,
+            "tokens_packed": 0,
+            "spans_dropped": 0,
+        }
+
+    def merge_adjacent(self, chunks: List[Dict]) -> List[Dict]:
+        """
+        Merges runs of consecutive chunk_index hits from the same document into one span.
+        A span keeps the best score of its chunks and lists them in `chunk_indices`.
+        """
+        by_document: Dict[str, List[Dict]] = {}
+        for chunk in chunks:
+            by_document.setdefault(str(chunk.get("mongo_document_id")), []).append(chunk)
+
+        spans = []
+        for doc_chunks in by_document.values():
+            doc_chunks.sort(key=lambda c: c.get("chunk_index", 0))
+            current: Optional[Dict] = None
+            for chunk in doc_chunks:
+                index = chunk.get("chunk_index", 0)
+                text = chunk.get("text_snippet", "")
+                if current is not None and index == current["chunk_indices"][-1] + 1:
+                    overlap = overlap_length(current["text_snippet"], text)
+                    self._stats["overlap_chars_stripped"] += overlap
+                    self._stats["chunks_merged"] += 1
+                    current["text_snippet"] += text[overlap:]
+                    current["chunk_indices"].append(index)
+                    current["score"] = max(current["score"], chunk.get("score", 0.0))
+                    continue
+                if current is not None and index == current["chunk_indices"][-1]:
+                    continue  # Same chunk twice (e.g. from two fused result lists)
+                current = {**chunk, "chunk_indices": [index], "score": chunk.get("score", 0.0)}
+                spans.append(current)
+        return spans
+
+    def pack(self, chunks: List[Dict], token_budget: Optional[int] = None) -> List[Dict]:
+        """
+        Merged spans in score order, greedily packed into the token budget.
+        The best span is truncated rather than dropped if it alone exceeds the budget.
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        spans = sorted(self.merge_adjacent(chunks), key=lambda s: s["score"], reverse=True)
+
+        packed, used = [], 0
+        for span in spans:
+            cost = count_tokens(span["text_snippet"]) + SPAN_HEADER_TOKENS
+            if used + cost <= budget:
+                packed.append(span)
+                used += cost
+            elif not packed and budget > SPAN_HEADER_TOKENS:
+                span["text_snippet"] = truncate_to_tokens(span["text_snippet"], budget - SPAN_HEADER_TOKENS)
+                packed.append(span)
+                used = budget
+            else:
+                self._stats["spans_dropped"] += 1
+
+        self._stats["packs"] += 1
+        self._stats["chunks_in"] += len(chunks)
+        self._stats["spans_out"] += len(packed)
+        self._stats["tokens_packed"] += used
+        return packed
+
+    def stats(self) -> Dict:
+        return {
+            **self._stats,
+            "token_budget": self.token_budget,
+            "tokenizer": CONTEXT_TOKENIZER if _get_tokenizer() is not None else "estimate",
+        }
+
+
+# Global Singleton
+context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+register_metrics("context_packer", context_packer.stats)
@@ -0,0 +1,272 @@
+"""
+Embedding backends for RAG system.
+Every backend exposes the BGEM3FlagModel.encode() contract (dense_vecs / lexical_weights /
+colbert_vecs), so the rest of the pipeline does not care which one is configured:
+
+- "flag":    FlagEmbedding BGE-M3 on PyTorch (fp32). The reference implementation.
+- "onnx":    The same weights on ONNX Runtime, optionally dynamically quantized to int8.
+- "hashing": Deterministic feature hashing. No weights, no downloads; for tests and benchmarks.
+"""
+import re
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+Sentences = Union[str, List[str]]
+
+
+class EmbeddingBackend:
+    """
+    Base class. Subclasses implement _encode_batch() for a list of sentences;
+    encode() handles the single-string convenience form like BGEM3FlagModel does.
+    """
+    name = "base"
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def encode(
+        self,
+        sentences: Sentences,
+        batch_size: int = 12,
+        max_length: int = 512,
+        return_dense: bool = True,
+        return_sparse: bool = False,
+        return_colbert_vecs: bool = False,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        output: Dict[str, Any] = {"dense_vecs": None, "lexical_weights": None, "colbert_vecs": None}
+        dense, sparse, colbert = [], [], []
+        for start in range(0, len(texts), max(1, batch_size)):
+            batch = self._encode_batch(
+                texts[start:start + batch_size], max_length,
+                return_dense, return_sparse, return_colbert_vecs
+            )
+            dense.extend(batch.get("dense_vecs") or [])
+            sparse.extend(batch.get("lexical_weights") or [])
+            colbert.extend(batch.get("colbert_vecs") or [])
+
+        if return_dense:
+            output["dense_vecs"] = np.asarray(dense, dtype=np.float32).reshape(len(texts), self.dim)
+        if return_sparse:
+            output["lexical_weights"] = sparse
+        if return_colbert_vecs:
+            output["colbert_vecs"] = colbert
+
+        if single:
+            output = {
+                key: (value[0] if value is not None else None)
+                for key, value in output.items()
+            }
+        return output
+
+    def _encode_batch(self, texts, max_length, return_dense, return_sparse, return_colbert_vecs) -> Dict[str, list]:
+        raise NotImplementedError
+
+
+class FlagEmbeddingBackend(EmbeddingBackend):
+    """The original BGEM3FlagModel, fp32 PyTorch."""
+    name = "flag"
+
+    def __init__(self, model_name: str, dim: int):
+        super().__init__(dim)
+        # Deferred: pulls in torch/transformers
+        from FlagEmbedding import BGEM3FlagModel
+        self.model = BGEM3FlagModel(model_name, use_fp16=False)
+
+    def encode(self, sentences: Sentences, **kwargs) -> Dict[str, Any]:
+        return self.model.encode(sentences, **kwargs)
+
+
+def _l2_normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    BGE-M3 on ONNX Runtime (CPU).
+
+    `model_dir` must contain an ONNX export of the XLM-R encoder (e.g. from
+    `optimum-cli export onnx --model BAAI/bge-m3 --task feature-extraction <dir>`)
+    plus the tokenizer files. If the BGE-M3 heads `sparse_linear.pt` / `colbert_linear.pt`
+    are present too, lexical weights and ColBERT vectors are computed exactly as FlagEmbedding does.
+    """
+    name = "onnx"
+
+    def __init__(self, model_dir: str, dim: int, quantize: bool = False, intra_op_threads: int = 0):
+        super().__init__(dim)
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        directory = Path(model_dir)
+        model_path = directory / "model.onnx"
+        if quantize:
+            model_path = self._quantized(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(str(directory))
+        self.special_ids = set(self.tokenizer.all_special_ids)
+        self.sparse_head = self._load_head(directory / "sparse_linear.pt")
+        self.colbert_head = self._load_head(directory / "colbert_linear.pt")
+        self.quantized = quantize
+
+    @staticmethod
+    def _quantized(model_path: Path) -> Path:
+        """Dynamic int8 weight quantization, done once and cached next to the fp32 model."""
+        target = model_path.with_name("model.int8.onnx")
+        if not target.exists():
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            print(f"⏳ Quantizing {model_path.name} to int8 (one-off)...")
+            quantize_dynamic(str(model_path), str(target), weight_type=QuantType.QInt8)
+        return target
+
+    @staticmethod
+    def _load_head(path: Path) -> Optional[Dict[str, np.ndarray]]:
+        if not path.exists():
+            return None
+        import torch
+        state = torch.load(str(path), map_location="cpu")
+        return {"weight": state["weight"].numpy(), "bias": state["bias"].numpy()}
+
+    def _encode_batch(self, texts, max_length, return_dense, return_sparse, return_colbert_vecs):
+        tokens = self.tokenizer(
+            texts, padding=True, truncation=True, max_length=max_length, return_tensors="np"
+        )
+        feed = {name: tokens[name].astype(np.int64) for name in self.input_names if name in tokens}
+        hidden = self.session.run(None, feed)[0]  # (batch, seq, hidden)
+        mask = tokens["attention_mask"]
+
+        result: Dict[str, list] = {}
+        if return_dense:
+            # BGE-M3 dense = normalized [CLS]
+            result["dense_vecs"] = list(_l2_normalize(hidden[:, 0]))
+
+        if return_sparse:
+            if self.sparse_head is None:
+                raise RuntimeError("sparse_linear.pt not found next to the ONNX model")
+            weights = np.maximum(hidden @ self.sparse_head["weight"].T + self.sparse_head["bias"], 0)[..., 0]
+            lexical = []
+            for ids, row in zip(tokens["input_ids"], weights):
+                entry: Dict[str, float] = {}
+                for token_id, weight in zip(ids.tolist(), row.tolist()):
+                    if token_id in self.special_ids or weight <= 0:
+                        continue
+                    key = str(token_id)
+                    entry[key] = max(entry.get(key, 0.0), weight)
+                lexical.append(entry)
+            result["lexical_weights"] = lexical
+
+        if return_colbert_vecs:
+            if self.colbert_head is None:
+                raise RuntimeError("colbert_linear.pt not found next to the ONNX model")
+            vectors = hidden[:, 1:] @ self.colbert_head["weight"].T + self.colbert_head["bias"]
+            result["colbert_vecs"] = [
+                _l2_normalize(vecs[: int(m[1:].sum())]) for vecs, m in zip(vectors, mask)
+            ]
+        return result
+
+
+_TOKEN_PATTERN = re.compile(r"\$?\d+(?:[.,]\d+)*%?|\w+", re.UNICODE)
+HASHING_VOCAB_SIZE = 250002  # same id space as the XLM-R tokenizer
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """
+    Deterministic signed feature hashing of words and character trigrams.
+    Not semantically meaningful, but stable across runs and machines, so tests and
+    benchmarks can exercise the whole pipeline (dense + sparse + colbert) without weights.
+    """
+    name = "hashing"
+
+    def __init__(self, dim: int):
+        super().__init__(dim)
+
+    @staticmethod
+    def _hash(feature: str) -> int:
+        return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+    def _tokens(self, text: str, max_length: int) -> List[str]:
+        return [t.lower() for t in _TOKEN_PATTERN.findall(text)][:max_length]
+
+    def _features(self, token: str) -> List[str]:
+        padded = f"#{token}#"
+        return [f"w:{token}"] + [f"c:{padded[i:i + 3]}" for i in range(max(1, len(padded) - 2))]
+
+    def _project(self, features: List[str]) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            h = self._hash(feature)
+            vector[h % self.dim] += 1.0 if (h >> 63) & 1 else -1.0
+        return vector
+
+    def _encode_batch(self, texts, max_length, return_dense, return_sparse, return_colbert_vecs):
+        result: Dict[str, list] = {"dense_vecs": [], "lexical_weights": [], "colbert_vecs": []}
+        for text in texts:
+            tokens = self._tokens(text, max_length) or [""]
+            per_token = [self._project(self._features(token)) for token in tokens]
+
+            if return_dense:
+                result["dense_vecs"].append(_l2_normalize(np.sum(per_token, axis=0)))
+            if return_sparse:
+                counts: Dict[str, int] = {}
+                for token in tokens:
+                    if token:
+                        key = str(self._hash(f"w:{token}") % HASHING_VOCAB_SIZE)
+                        counts[key] = counts.get(key, 0) + 1
+                result["lexical_weights"].append(
+                    {key: round(float(np.log1p(count)) / 2.0, 4) for key, count in counts.items()}
+                )
+            if return_colbert_vecs:
+                result["colbert_vecs"].append(_l2_normalize(np.stack(per_token)))
+        return result
+
+
+def create_embedding_backend(
+    backend: str,
+    model_name: str,
+    dim: int,
+    onnx_path: Optional[str] = None,
+    onnx_quantize: bool = False,
+) -> EmbeddingBackend:
+    """Factory used by rag.config.load_embedding_model()."""
+    backend = backend.lower()
+    if backend == "flag":
+        return FlagEmbeddingBackend(model_name, dim)
+    if backend == "onnx":
+        if not onnx_path:
+            raise ValueError("EMBEDDING_BACKEND=onnx requires EMBEDDING_ONNX_PATH")
+        return OnnxEmbeddingBackend(onnx_path, dim, quantize=onnx_quantize)
+    if backend == "hashing":
+        return HashingEmbeddingBackend(dim)
+    raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}' (expected flag, onnx or hashing)")
+
+
+def parity_report(candidate: EmbeddingBackend, reference: EmbeddingBackend, texts: List[str]) -> Dict[str, float]:
+    """
+    Cosine drift of `candidate` dense vectors against `reference` (normally fp32 FlagEmbedding).
+    Drift = 1 - cosine; a healthy int8 model stays well under 0.01 on average.
+    """
+    a = _l2_normalize(candidate.encode(texts, return_dense=True)["dense_vecs"])
+    b = _l2_normalize(reference.encode(texts, return_dense=True)["dense_vecs"])
+    cosine = np.sum(a * b, axis=1)
+    drift = 1.0 - cosine
+    return {
+        "samples": len(texts),
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "mean_drift": float(drift.mean()),
+        "p95_drift": float(np.percentile(drift, 95)),
+        "max_drift": float(drift.max()),
+    }
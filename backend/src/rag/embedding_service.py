@@ -0,0 +1,155 @@
+"""
+Embedding service for query-time encoding.
+Collects concurrent encode requests for a few milliseconds (or until the batch is full),
+runs ONE batched model call off the event loop, and resolves each caller's future.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from rag.config import (
+    get_embedding_model,
+    EMBED_BATCH_MAX_SIZE,
+    EMBED_BATCH_MAX_WAIT_MS,
+    HYBRID_SEARCH_ENABLED,
+)
+from rag.metrics import register_metrics
+
+QUERY_MAX_LENGTH = 512
+
+
+class EmbeddingBatcher:
+    """
+    Micro-batching front end for the embedding model.
+
+    A single worker thread owns the model: while one batch is being encoded,
+    new requests queue up and form the next batch, so throughput grows with load
+    and the event loop is never blocked by a forward pass.
+    """
+
+    def __init__(self, max_batch_size: int = EMBED_BATCH_MAX_SIZE, max_wait_ms: float = EMBED_BATCH_MAX_WAIT_MS):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stats = {"requests": 0, "batches": 0, "largest_batch": 0, "errors": 0}
+
+    def _ensure_worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        # (Re)start the worker if this is the first call or the loop changed (tests, reloads)
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            old_queue, old_loop = self._queue, self._loop
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+            if old_queue is not None:
+                self._hand_over(old_queue, old_loop)
+
+    def _hand_over(self, old_queue: asyncio.Queue, old_loop: asyncio.AbstractEventLoop) -> None:
+        """
+        Requests still queued for the previous worker: moved to the new queue when it runs
+        on the same loop, failed otherwise (their futures belong to the old loop).
+        """
+        moved = failed = 0
+        while not old_queue.empty():
+            text, future = old_queue.get_nowait()
+            if future.done():
+                continue
+            if old_loop is self._loop:
+                self._queue.put_nowait((text, future))
+                moved += 1
+            elif not old_loop.is_closed():
+                old_loop.call_soon_threadsafe(_fail_request, future)
+                failed += 1
+            # A closed loop has nobody left to await the future
+        if moved or failed:
+            print(f"⚠️ Embedding worker restarted: {moved} queued requests moved, {failed} failed")
+
+    async def encode(self, text: str) -> Dict[str, Any]:
+        """Encodes one query. Returns {"dense": List[float], "sparse": Dict[str, float] (hybrid only)}."""
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._stats["requests"] += 1
+        await self._queue.put((text, future))
+        return await future
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        # Whatever else is already waiting rides along for free
+        while len(batch) < self.max_batch_size and not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            # Callers that gave up (cancelled) are dropped before paying for the encode
+            batch = [(text, future) for text, future in batch if not future.done()]
+            if not batch:
+                continue
+
+            self._stats["batches"] += 1
+            self._stats["largest_batch"] = max(self._stats["largest_batch"], len(batch))
+            texts = [text for text, _ in batch]
+
+            try:
+                results = await self._loop.run_in_executor(self._executor, self._encode_batch, texts)
+            except Exception as e:
+                self._stats["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    @staticmethod
+    def _encode_batch(texts: List[str]) -> List[Dict[str, Any]]:
+        # Sparse lexical weights come out of the same forward pass, so they are almost free
+        output = get_embedding_model().encode(
+            texts, batch_size=len(texts), max_length=QUERY_MAX_LENGTH,
+            return_dense=True, return_sparse=HYBRID_SEARCH_ENABLED
+        )
+        results = [{"dense": vector.tolist()} for vector in output["dense_vecs"]]
+        if HYBRID_SEARCH_ENABLED:
+            for result, weights in zip(results, output["lexical_weights"]):
+                result["sparse"] = {token: float(weight) for token, weight in weights.items()}
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self._stats["batches"]
+        return {
+            **self._stats,
+            "avg_batch_size": round(self._stats["requests"] / batches, 2) if batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+        }
+
+
+def _fail_request(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_exception(RuntimeError("Embedding worker restarted on another event loop"))
+
+
+# Global Singleton (one model, one worker thread)
+embedding_service = EmbeddingBatcher()
+register_metrics("embedding_batcher", embedding_service.stats)
+
+
+async def embed_query(text: str) -> Dict[str, Any]:
+    """Shortcut used by the retrieval layer."""
+    return await embedding_service.encode(text)
@@ -0,0 +1,31 @@
+"""
+Rank fusion helpers for RAG system.
+Merges ranked result lists (Qdrant, lexical index, query variants) by reciprocal rank.
+"""
+from typing import Dict, List, Tuple
+
+# Standard RRF damping constant (Cormack et al.); the same default Qdrant uses
+RRF_K = 60
+
+
+def chunk_key(result: Dict) -> Tuple[str, int]:
+    """A chunk is identified by its document and position, whichever engine returned it."""
+    return (result.get("mongo_document_id", "unknown"), result.get("chunk_index", 0))
+
+
+def rrf_fuse(result_lists: List[List[Dict]], top_k: int, k: int = RRF_K) -> List[Dict]:
+    """
+    Reciprocal-rank fusion: score(chunk) = sum(1 / (k + rank)) over every list it appears in.
+    The first occurrence of a chunk provides its payload; "score" is replaced by the fused score.
+    """
+    fused: Dict[Tuple[str, int], float] = {}
+    payloads: Dict[Tuple[str, int], Dict] = {}
+
+    for results in result_lists:
+        for rank, result in enumerate(results, start=1):
+            key = chunk_key(result)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (k + rank)
+            payloads.setdefault(key, result)
+
+    ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]
+    return [{**payloads[key], "score": score} for key, score in ranked]
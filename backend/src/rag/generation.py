@@ -0,0 +1,105 @@
+"""
+Serving generation for RAG system.
+A re-index swap or rollback, or a document upload, changes what COLLECTION_NAME serves. The
+worker that made the change updates its own in-process state directly; every other uvicorn
+worker notices the bumped generation in the shared chunk store (at most once per
+GENERATION_CHECK_INTERVAL_SECONDS) and reloads the lexical index from LEXICAL_INDEX_PATH and
+drops its caches before serving the next request.
+
+Uploads go through publish_change(), which serializes writers across processes with a lock file
+next to the chunk store, so each one starts from the latest saved lexical index.
+
+This needs a file-backed CHUNK_STORE_PATH (":memory:" is private to one process) and, for
+lexical fusion, a LEXICAL_INDEX_PATH. Without them, run a single worker.
+"""
+import os
+import time
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock, run a single worker
+    fcntl = None
+
+from rag.config import LEXICAL_INDEX_PATH, CHUNK_STORE_PATH, GENERATION_CHECK_INTERVAL_SECONDS
+from rag.answer_cache import answer_cache
+from rag.chunk_store import chunk_store
+from rag.lexical_index import lexical_index
+from rag.metrics import register_metrics
+from rag.reranker import reranker
+
+_state = {"last_check": 0.0, "reloads": 0, "published": 0}
+# Serializes catching up and publishing within this process (the lock file does it across processes)
+_local_lock = threading.Lock()
+
+
+@contextmanager
+def _shared_lock():
+    if fcntl is None or CHUNK_STORE_PATH == ":memory:":
+        yield
+        return
+    with open(f"{CHUNK_STORE_PATH}.lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _reload_shared_state() -> None:
+    print("🔁 Serving collection changed in another worker; reloading lexical index, dropping caches.")
+    if LEXICAL_INDEX_PATH and os.path.exists(LEXICAL_INDEX_PATH):
+        lexical_index.load(LEXICAL_INDEX_PATH)
+    answer_cache.clear()
+    reranker.cache.clear()
+    _state["reloads"] += 1
+
+
+def _catch_up() -> bool:
+    with _local_lock:
+        if not chunk_store.generation_changed():
+            return False
+        _reload_shared_state()
+        return True
+
+
+async def sync_serving_generation() -> bool:
+    """
+    Called before serving from cached state. Returns True when this worker had to catch up
+    with a change made by another process.
+    """
+    now = time.monotonic()
+    if now - _state["last_check"] < GENERATION_CHECK_INTERVAL_SECONDS:
+        return False
+    _state["last_check"] = now
+    return await asyncio.to_thread(_catch_up)
+
+
+def publish_change(apply: Callable[[], None]) -> None:
+    """
+    Applies `apply` (a change to the live lexical index) and publishes it to the other workers:
+    catch up with the last published change, apply, save the index, bump the generation.
+    Blocking: call it from a worker thread.
+    """
+    with _local_lock, _shared_lock():
+        if chunk_store.generation_changed():
+            _reload_shared_state()
+        apply()
+        if LEXICAL_INDEX_PATH:
+            lexical_index.save(LEXICAL_INDEX_PATH)
+        chunk_store.bump_generation()
+        _state["published"] += 1
+
+
+def generation_stats() -> Dict:
+    return {
+        "reloads": _state["reloads"],
+        "published": _state["published"],
+        "interval_seconds": GENERATION_CHECK_INTERVAL_SECONDS,
+    }
+
+
+register_metrics("serving_generation", generation_stats)
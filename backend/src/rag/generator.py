@@ -2,20 +2,34 @@
 Generator module for RAG system.
 Handles answer generation using LLM based on retrieved documents and history.
 """
-from typing import List, Dict
-from rag.config import groq_client
+from typing import AsyncIterator, List, Dict
+from rag.config import LLM_MODEL
+from rag.llm_dispatcher import llm_dispatcher, Priority
+from rag.context_packer import context_packer
+from rag.fusion import chunk_key
+from rag.singleflight import single_flight
 
-async def generate_answer(query: str, history: str, context_chunks: List[Dict]) -> str:
+# Shown to the user in place of an answer when generation fails
+GENERATION_ERROR_PREFIX = "Error generating answer"
+
+
+class GenerationError(Exception):
+    """The LLM call failed. Raised instead of being mixed into the answer text."""
+
+
+def build_messages(query: str, history: str, context_chunks: List[Dict]) -> List[Dict]:
     """
-    Generates an answer using Groq (Llama 3) based on retrieved docs AND history.
+    Builds the system + user messages shared by the blocking and streaming generators.
     """
-    
+
     # 1. Prepare Context String
-    if context_chunks:
+    # Adjacent chunks merged, overlaps stripped, best spans packed into the token budget
+    spans = context_packer.pack(context_chunks) if context_chunks else []
+    if spans:
         context_str = "\n---\n".join([
             f"SOURCE: {d['filename']} (Sensitivity: {d['sensitivity']})\n"
             f"CONTENT: {d['text_snippet']}"
-            for d in context_chunks
+            for d in spans
         ])
     else:
         context_str = "No external documents retrieved. Answer based on conversation history only."
@@ -38,15 +52,50 @@ async def generate_answer(query: str, history: str, context_chunks: List[Dict])
         f"USER QUESTION: {query}"
     )
 
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+
+@single_flight(
+    "generate_answer",
+    key=lambda query, history, context_chunks: (query, history, tuple(chunk_key(c) for c in context_chunks))
+)
+async def generate_answer(query: str, history: str, context_chunks: List[Dict]) -> str:
+    """
+    Generates an answer using Groq (Llama 3) based on retrieved docs AND history.
+    Raises GenerationError if the LLM call fails.
+    """
     try:
-        response = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_message}
-            ],
-            model="llama-3.1-8b-instant",
+        response = await llm_dispatcher.create(
+            Priority.GENERATION,
+            messages=build_messages(query, history, context_chunks),
+            model=LLM_MODEL,
             temperature=0.3 # Slightly higher creativity for conversation flow
         )
         return response.choices[0].message.content
     except Exception as e:
-        return f"Error generating answer: {e}"
+        raise GenerationError(str(e)) from e
+
+
+async def generate_answer_stream(query: str, history: str, context_chunks: List[Dict]) -> AsyncIterator[str]:
+    """
+    Same as generate_answer, but yields the answer token by token as the LLM produces it.
+    Raises GenerationError on failure, possibly after some tokens were already yielded.
+    """
+    try:
+        async with llm_dispatcher.stream(
+            Priority.GENERATION,
+            messages=build_messages(query, history, context_chunks),
+            model=LLM_MODEL,
+            temperature=0.3
+        ) as stream:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+    except Exception as e:
+        raise GenerationError(str(e)) from e
@@ -0,0 +1,142 @@
+"""
+Ingestion process pool for RAG system.
+Shards document chunks across worker processes, each holding its own copy of the
+embedding model, and reassembles the vectors in chunk_index order.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from rag.config import INGEST_WORKERS, INGEST_TORCH_THREADS, INGEST_BATCH_SIZE
+from rag.metrics import register_metrics
+
+# Chunks per task: small enough to balance load, large enough to batch well
+SHARD_BATCHES = 4
+# Seconds a warmup ping waits for the other workers (model download included)
+WARMUP_TIMEOUT = 600
+
+# --- WORKER SIDE ---
+_worker_model = None
+
+
+def _init_worker(torch_threads: int) -> None:
+    """Runs once per worker process: pin thread count, then load the model."""
+    global _worker_model
+    # Must be set before torch is imported or its thread pools are already sized
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    from rag.config import load_embedding_model
+    _worker_model = load_embedding_model()
+
+
+def _encode_shard(shard: List[Tuple[int, str]], batch_size: int, return_sparse: bool) -> List[Tuple[int, Any, Any]]:
+    indexes = [index for index, _ in shard]
+    texts = [text for _, text in shard]
+    output = _worker_model.encode(
+        texts, batch_size=batch_size, max_length=512, return_dense=True, return_sparse=return_sparse
+    )
+    lexical = output["lexical_weights"] if return_sparse else [None] * len(texts)
+    return list(zip(indexes, output["dense_vecs"], lexical))
+
+
+def _ping(barrier) -> int:
+    # Holds this worker until every worker has one ping, so no worker can answer two
+    barrier.wait()
+    return os.getpid()
+
+
+# --- PARENT SIDE ---
+class EmbeddingProcessPool:
+    """
+    Process pool of embedding workers.
+    Workers are spawned lazily on first use and stay warm for the life of the process.
+    """
+
+    def __init__(self, workers: int, torch_threads: int = 0, batch_size: int = INGEST_BATCH_SIZE):
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.batch_size = batch_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._stats = {"documents": 0, "chunks": 0, "shards": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    # spawn, not fork: forking a process that has touched torch deadlocks
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.torch_threads,),
+                    )
+        return self._executor
+
+    def warmup(self) -> None:
+        """
+        Starts every worker (and loads its model) ahead of the first real document.
+        One ping per worker behind a barrier: the pool has to spawn all of them, and the
+        initializer (model load) has run in each before this returns.
+        """
+        executor = self._get_executor()
+        with multiprocessing.get_context("spawn").Manager() as manager:
+            barrier = manager.Barrier(self.workers, timeout=WARMUP_TIMEOUT)
+            pids = {future.result() for future in [executor.submit(_ping, barrier) for _ in range(self.workers)]}
+        if len(pids) != self.workers:
+            raise RuntimeError(f"Ingest pool warmup reached {len(pids)} of {self.workers} workers")
+        print(f"🔥 Ingest pool warm: {len(pids)} workers")
+
+    def encode(self, chunks: List[str], return_sparse: bool = False) -> Dict[str, List[Any]]:
+        """
+        Returns {"dense_vecs", "lexical_weights"} with one entry per chunk, in the same
+        order as `chunks`. Blocking: call it from a worker thread, not the event loop.
+        """
+        if not chunks:
+            return {"dense_vecs": [], "lexical_weights": []}
+
+        shard_size = self.batch_size * SHARD_BATCHES
+        indexed = list(enumerate(chunks))
+        shards = [indexed[i:i + shard_size] for i in range(0, len(indexed), shard_size)]
+
+        executor = self._get_executor()
+        futures = [executor.submit(_encode_shard, shard, self.batch_size, return_sparse) for shard in shards]
+
+        vectors: List[Any] = [None] * len(chunks)
+        lexical: List[Any] = [None] * len(chunks)
+        for future in futures:
+            for index, vector, weights in future.result():
+                vectors[index] = vector
+                lexical[index] = weights
+
+        self._stats["documents"] += 1
+        self._stats["chunks"] += len(chunks)
+        self._stats["shards"] += len(shards)
+        return {"dense_vecs": vectors, "lexical_weights": lexical}
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "workers": self.workers,
+            "torch_threads": self.torch_threads,
+            "started": self._executor is not None,
+        }
+
+
+# Global Singleton (only used when INGEST_WORKERS > 1)
+ingest_pool = EmbeddingProcessPool(INGEST_WORKERS, INGEST_TORCH_THREADS)
+register_metrics("ingest_pool", ingest_pool.stats)
@@ -0,0 +1,326 @@
+"""
+Lexical index for RAG system.
+In-process BM25 over chunk text with array-backed posting lists. Answers exact-phrasing
+queries ("Article VI", "$15.50 in cash", "DGCL") without a network round trip, honoring
+the same sensitivity and matter filters as retrieve_documents.
+"""
+import os
+import re
+import math
+import time
+import pickle
+import threading
+from array import array
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from rag.config import LEXICAL_INDEX_PATH, LEXICAL_INDEX_SAVE_INTERVAL_SECONDS, LEXICAL_INDEX_ENCRYPTED
+from rag.metrics import register_metrics
+
+_TOKEN_PATTERN = re.compile(r"\$?\d+(?:[.,]\d+)*%?|\w+", re.UNICODE)
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were which with".split()
+)
+# 2: chunk text and filenames left the index (resolved from the chunk store)
+_INDEX_FORMAT_VERSION = 2
+
+_cipher = None
+
+
+def _get_cipher():
+    global _cipher
+    if _cipher is None:
+        from core.encryption import AES256Service
+        _cipher = AES256Service()
+    return _cipher
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased words and numbers. Amounts keep their "$" and are also indexed without it,
+    so "$15.50" matches both "$15.50" and "15.50".
+    """
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        tokens.append(token)
+        if token.startswith("$") and len(token) > 1:
+            tokens.append(token[1:])
+    return tokens
+
+
+class BM25Index:
+    """
+    Inverted index with one (doc_ids, term_freqs) pair of typed arrays per term.
+    Chunks are appended incrementally; deleted documents are tombstoned and
+    physically dropped by compact() once they make up a quarter of the index.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._reset()
+        self._dirty = False
+        self._last_saved = 0.0
+        self._stats = {"searches": 0, "total_search_ms": 0.0}
+
+    def _reset(self) -> None:
+        self._vocab: Dict[str, int] = {}
+        self._postings_ids: List[array] = []
+        self._postings_tfs: List[array] = []
+        self._df = array("I")
+        # Per-chunk columns
+        self._doc_len = array("I")
+        self._doc_alive = bytearray()
+        self._doc_sensitivity = array("B")
+        self._doc_matter = array("I")
+        self._doc_terms: List[array] = []
+        self._doc_meta: List[Dict] = []
+        # Dictionary-encoded filter values
+        self._sensitivity_codes: Dict[str, int] = {}
+        self._matter_codes: Dict[str, int] = {}
+        self._document_chunks: Dict[str, List[int]] = {}
+        self._live_docs = 0
+        self._live_tokens = 0
+
+    @staticmethod
+    def _code(table: Dict[str, int], value: str) -> int:
+        if value not in table:
+            table[value] = len(table)
+        return table[value]
+
+    # --- WRITES ---
+    def add_chunks(self, metadata: Dict, chunks: List[str]) -> None:
+        """Indexes a document's chunks (chunk_index = position in `chunks`)."""
+        mongo_document_id = str(metadata.get("mongo_document_id", ""))
+        with self._lock:
+            # Re-indexing the same document replaces it
+            self.remove_document(mongo_document_id)
+
+            sensitivity = self._code(self._sensitivity_codes, str(metadata.get("sensitivity", "internal")))
+            matter = self._code(self._matter_codes, str(metadata.get("matter_id", "")))
+
+            for chunk_index, text in enumerate(chunks):
+                doc_id = len(self._doc_len)
+                counts: Dict[int, int] = {}
+                tokens = tokenize(text)
+                for token in tokens:
+                    term_id = self._vocab.get(token)
+                    if term_id is None:
+                        term_id = self._vocab[token] = len(self._vocab)
+                        self._postings_ids.append(array("I"))
+                        self._postings_tfs.append(array("H"))
+                        self._df.append(0)
+                    counts[term_id] = counts.get(term_id, 0) + 1
+
+                for term_id, tf in counts.items():
+                    self._postings_ids[term_id].append(doc_id)
+                    self._postings_tfs[term_id].append(min(tf, 65535))
+                    self._df[term_id] += 1
+
+                self._doc_len.append(len(tokens))
+                self._doc_alive.append(1)
+                self._doc_sensitivity.append(sensitivity)
+                self._doc_matter.append(matter)
+                self._doc_terms.append(array("I", counts.keys()))
+                self._doc_meta.append({
+                    "mongo_document_id": mongo_document_id,
+                    "matter_id": str(metadata.get("matter_id", "")),
+                    "chunk_index": chunk_index,
+                    "sensitivity": str(metadata.get("sensitivity", "internal")),
+                })
+                self._document_chunks.setdefault(mongo_document_id, []).append(doc_id)
+                self._live_docs += 1
+                self._live_tokens += len(tokens)
+            self._dirty = True
+
+    def remove_document(self, mongo_document_id: str) -> int:
+        """Tombstones every chunk of a document. Returns the number of chunks removed."""
+        with self._lock:
+            doc_ids = self._document_chunks.pop(str(mongo_document_id), [])
+            for doc_id in doc_ids:
+                if not self._doc_alive[doc_id]:
+                    continue
+                self._doc_alive[doc_id] = 0
+                for term_id in self._doc_terms[doc_id]:
+                    self._df[term_id] -= 1
+                self._live_docs -= 1
+                self._live_tokens -= self._doc_len[doc_id]
+                self._doc_meta[doc_id] = {}
+            if doc_ids:
+                self._dirty = True
+                if len(self._doc_len) - self._live_docs > len(self._doc_len) // 4:
+                    self.compact()
+            return len(doc_ids)
+
+    def compact(self) -> None:
+        """
+        Drops tombstoned chunks by renumbering the live ones in place (posting lists are
+        filtered and remapped; no chunk text is needed, the index never holds any).
+        """
+        with self._lock:
+            alive = np.frombuffer(bytes(self._doc_alive), dtype=np.uint8).astype(bool)
+            new_ids = (np.cumsum(alive) - 1).astype(np.uint32)
+
+            for term_id in range(len(self._vocab)):
+                ids = np.frombuffer(self._postings_ids[term_id], dtype=np.uint32)
+                tfs = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16)
+                keep = alive[ids]
+                self._postings_ids[term_id] = array("I", new_ids[ids[keep]].tobytes())
+                self._postings_tfs[term_id] = array("H", tfs[keep].tobytes())
+
+            live = np.flatnonzero(alive)
+            self._doc_len = array("I", np.frombuffer(self._doc_len, dtype=np.uint32)[live].tobytes())
+            self._doc_sensitivity = array("B", np.frombuffer(self._doc_sensitivity, dtype=np.uint8)[live].tobytes())
+            self._doc_matter = array("I", np.frombuffer(self._doc_matter, dtype=np.uint32)[live].tobytes())
+            self._doc_terms = [self._doc_terms[i] for i in live]
+            self._doc_meta = [self._doc_meta[i] for i in live]
+            self._doc_alive = bytearray(b"\x01" * len(live))
+            self._document_chunks = {
+                document_id: [int(new_ids[i]) for i in doc_ids if alive[i]]
+                for document_id, doc_ids in self._document_chunks.items()
+            }
+            self._dirty = True
+
+    # --- READS ---
+    def search(
+        self,
+        query: str,
+        allowed_sensitivities: Iterable[str],
+        matter_ids: Optional[Iterable[str]] = None,
+        top_k: int = 5,
+    ) -> List[Dict]:
+        """
+        BM25 top-k among the chunks the caller may see: ids, filter keys and score only.
+        Text and filename are resolved from the chunk store (see retrieval.hydrate_chunks).
+        """
+        start = time.perf_counter()
+        with self._lock:
+            n_docs = len(self._doc_len)
+            term_ids = {self._vocab[t] for t in tokenize(query) if t in self._vocab}
+            if not n_docs or not self._live_docs or not term_ids:
+                return []
+
+            allowed = [self._sensitivity_codes[s] for s in allowed_sensitivities if s in self._sensitivity_codes]
+            if not allowed:
+                return []
+
+            # Candidate mask: alive AND permitted sensitivity AND (optionally) in scope matters
+            mask = np.frombuffer(bytes(self._doc_alive), dtype=np.uint8).astype(bool)
+            mask &= np.isin(np.frombuffer(self._doc_sensitivity, dtype=np.uint8), allowed)
+            if matter_ids is not None:
+                matters = [self._matter_codes[m] for m in matter_ids if m in self._matter_codes]
+                mask &= np.isin(np.frombuffer(self._doc_matter, dtype=np.uint32), matters)
+
+            doc_len = np.frombuffer(self._doc_len, dtype=np.uint32).astype(np.float32)
+            avg_len = self._live_tokens / self._live_docs
+            length_norm = self.k1 * (1.0 - self.b + self.b * doc_len / max(avg_len, 1e-9))
+
+            scores = np.zeros(n_docs, dtype=np.float32)
+            for term_id in term_ids:
+                df = self._df[term_id]
+                if df <= 0:
+                    continue
+                idf = math.log(1.0 + (self._live_docs - df + 0.5) / (df + 0.5))
+                ids = np.frombuffer(self._postings_ids[term_id], dtype=np.uint32)
+                tf = np.frombuffer(self._postings_tfs[term_id], dtype=np.uint16).astype(np.float32)
+                scores[ids] += idf * tf * (self.k1 + 1.0) / (tf + length_norm[ids])
+
+            scores[~mask] = 0.0
+            candidates = np.flatnonzero(scores > 0)
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            ranked = candidates[np.argsort(-scores[candidates], kind="stable")]
+
+            results = [{**self._doc_meta[i], "score": float(scores[i])} for i in ranked]
+
+        self._stats["searches"] += 1
+        self._stats["total_search_ms"] += (time.perf_counter() - start) * 1000
+        return results
+
+    # --- PERSISTENCE ---
+    def save(self, path: str) -> None:
+        """Atomic write: a crash mid-save never leaves a truncated index behind."""
+        with self._lock:
+            state = {
+                "version": _INDEX_FORMAT_VERSION,
+                "k1": self.k1,
+                "b": self.b,
+                "state": {
+                    key: value for key, value in self.__dict__.items()
+                    if key.startswith("_") and key not in ("_lock", "_stats", "_dirty", "_last_saved")
+                },
+            }
+            blob = pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL)
+            if LEXICAL_INDEX_ENCRYPTED:
+                # Vocabulary + postings still describe the documents: same key as the vault
+                blob = _get_cipher().encrypt_bytes(blob)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as handle:
+                handle.write(blob)
+            os.replace(tmp_path, path)
+            self._dirty = False
+            self._last_saved = time.monotonic()
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path, "rb") as handle:
+            blob = handle.read()
+        try:
+            if LEXICAL_INDEX_ENCRYPTED:
+                blob = _get_cipher().decrypt_bytes(blob)
+            state = pickle.loads(blob)
+        except Exception as e:
+            print(f"⚠️ Ignoring lexical index at {path}: unreadable ({e}). "
+                  "Files written before encryption may hold chunk text in the clear; delete them.")
+            return False
+        if state.get("version") != _INDEX_FORMAT_VERSION:
+            print(f"⚠️ Ignoring lexical index at {path}: unsupported format version.")
+            return False
+        with self._lock:
+            self.k1, self.b = state["k1"], state["b"]
+            self.__dict__.update(state["state"])
+            self._dirty = False
+        return True
+
+    def adopt(self, other: "BM25Index") -> None:
+        """Takes over another index's contents in one step (blue/green re-indexing)."""
+        with self._lock, other._lock:
+            self.k1, self.b = other.k1, other.b
+            self.__dict__.update({
+                key: value for key, value in other.__dict__.items()
+                if key.startswith("_") and key not in ("_lock", "_stats", "_dirty", "_last_saved")
+            })
+            self._dirty = True
+
+    def persist(self, force: bool = False) -> None:
+        """Saves to LEXICAL_INDEX_PATH if configured and changed, at most once per save interval."""
+        if not LEXICAL_INDEX_PATH or not self._dirty:
+            return
+        if force or time.monotonic() - self._last_saved >= LEXICAL_INDEX_SAVE_INTERVAL_SECONDS:
+            self.save(LEXICAL_INDEX_PATH)
+
+    def stats(self) -> Dict:
+        searches = self._stats["searches"]
+        return {
+            "chunks": self._live_docs,
+            "tombstoned": len(self._doc_len) - self._live_docs,
+            "terms": len(self._vocab),
+            "searches": searches,
+            "avg_search_ms": round(self._stats["total_search_ms"] / searches, 3) if searches else 0.0,
+        }
+
+
+def load_lexical_index() -> None:
+    """Restores the persisted index (if configured). Called from the engine warmup."""
+    if LEXICAL_INDEX_PATH and lexical_index.load(LEXICAL_INDEX_PATH):
+        print(f"✅ Lexical index loaded from {LEXICAL_INDEX_PATH} ({lexical_index.stats()['chunks']} chunks)")
+
+
+# Global Singleton
+lexical_index = BM25Index()
+register_metrics("lexical_index", lexical_index.stats)
@@ -0,0 +1,268 @@
+"""
+LLM dispatcher for RAG system.
+Every upstream LLM call goes through one queue: a concurrency limit, request/token-per-minute
+buckets, priorities (the answer the user is waiting for before routing, routing before
+background work) and jittered retries that honour Retry-After, instead of 429s in the chat.
+"""
+import time
+import heapq
+import random
+import asyncio
+import itertools
+from collections import deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, List, Optional
+
+from rag.config import (
+    get_async_llm_client,
+    LLM_MAX_CONCURRENCY,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_TOKENS_PER_MINUTE,
+    LLM_MAX_RETRIES,
+    LLM_BACKOFF_BASE_SECONDS,
+    LLM_BACKOFF_MAX_SECONDS,
+)
+from rag.metrics import register_metrics
+
+# Completion budget assumed when a call sets no max_tokens
+DEFAULT_COMPLETION_TOKENS = 512
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class Priority(IntEnum):
+    GENERATION = 0  # The final answer a user is waiting on
+    ROUTING = 1     # Router / rewrite calls on the request path
+    BACKGROUND = 2  # Summaries and other work nobody is waiting on
+
+
+class TokenBucket:
+    """Continuous-refill bucket: `per_minute` units, capacity one minute's worth. 0 = unlimited."""
+
+    def __init__(self, per_minute: int):
+        self.per_minute = per_minute
+        self.level = float(per_minute)
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(float(self.per_minute), self.level + (now - self._last) * self.per_minute / 60.0)
+        self._last = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` is available (0 when it is available now)."""
+        if self.per_minute <= 0:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.per_minute)  # A single oversized call must still get through
+        return max(0.0, (amount - self.level) * 60.0 / self.per_minute)
+
+    def take(self, amount: float) -> None:
+        if self.per_minute > 0:
+            self.level -= min(amount, self.per_minute)
+
+    def give_back(self, amount: float) -> None:
+        """Corrects an estimate once the actual usage is known (negative = charge more)."""
+        if self.per_minute > 0:
+            self.level = min(float(self.per_minute), self.level + amount)
+
+
+def estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    """Rough prompt + completion token estimate (4 chars/token) used for TPM admission."""
+    prompt_chars = sum(len(str(m.get("content", ""))) for m in kwargs.get("messages", []))
+    return prompt_chars // 4 + int(kwargs.get("max_tokens") or DEFAULT_COMPLETION_TOKENS)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested delay from Retry-After / retry-after-ms headers, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000.0
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def is_retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Connection errors and timeouts carry no status code
+    return type(error).__name__ in {"APIConnectionError", "APITimeoutError"}
+
+
+class LLMDispatcher:
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_retries: int,
+        backoff_base: float,
+        backoff_max: float,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute)
+        self._queue: List = []  # heap of (priority, seq, tokens, future)
+        self._seq = itertools.count()
+        self._active = 0
+        self._pump_timer: Optional[asyncio.TimerHandle] = None
+        self._waits: Dict[Priority, deque] = {p: deque(maxlen=500) for p in Priority}
+        self._stats = {"calls": 0, "retries": 0, "rate_limited": 0, "failures": 0, "throttled": 0}
+
+    # --- admission ---
+
+    def _pump(self) -> None:
+        """Grants slots to queued calls in priority order while concurrency and buckets allow."""
+        self._pump_timer = None
+        while self._queue and self._active < self.max_concurrency:
+            _, _, tokens, future = self._queue[0]
+            if future.done():  # Waiter cancelled while queued
+                heapq.heappop(self._queue)
+                continue
+            wait = max(self._requests.wait_time(1), self._tokens.wait_time(tokens))
+            if wait > 0:
+                self._stats["throttled"] += 1
+                self._pump_timer = asyncio.get_running_loop().call_later(wait, self._pump)
+                return
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(tokens)
+            self._active += 1
+            future.set_result(None)
+
+    async def _acquire(self, priority: Priority, tokens: int) -> None:
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (int(priority), next(self._seq), tokens, future))
+        if self._pump_timer is None:
+            self._pump()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release()  # Granted and cancelled in the same tick: hand the slot on
+            raise
+        self._waits[priority].append((time.perf_counter() - start) * 1000)
+
+    def _release(self) -> None:
+        self._active -= 1
+        if self._pump_timer is None:
+            self._pump()
+
+    @asynccontextmanager
+    async def slot(self, priority: Priority, tokens: int = DEFAULT_COMPLETION_TOKENS):
+        await self._acquire(priority, tokens)
+        try:
+            yield
+        finally:
+            self._release()
+
+    # --- calls ---
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        server_delay = retry_after_seconds(error)
+        if server_delay is not None:
+            return min(server_delay, self.backoff_max) + random.uniform(0, self.backoff_base)
+        # Full jitter: uniform(0, base * 2^attempt), capped
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def create(self, priority: Priority, **kwargs) -> Any:
+        """
+        chat.completions.create through the queue, retried on 429/5xx/connection errors.
+        With stream=True the slot is released once the stream object exists; use `stream()`
+        to hold it for the whole generation.
+        """
+        tokens = estimate_tokens(kwargs)
+        self._stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            async with self.slot(priority, tokens):
+                try:
+                    response = await get_async_llm_client().chat.completions.create(**kwargs)
+                    usage = getattr(response, "usage", None)
+                    if usage is not None and getattr(usage, "total_tokens", None):
+                        self._tokens.give_back(tokens - usage.total_tokens)
+                    return response
+                except Exception as e:
+                    error = e
+            if getattr(error, "status_code", None) == 429:
+                self._stats["rate_limited"] += 1
+            if attempt >= self.max_retries or not is_retryable(error):
+                self._stats["failures"] += 1
+                raise error
+            self._stats["retries"] += 1
+            delay = self._backoff(attempt, error)
+            print(f"⏳ LLM call failed ({error.__class__.__name__}); retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)  # Outside the slot: others may proceed meanwhile
+
+    @asynccontextmanager
+    async def stream(self, priority: Priority, **kwargs):
+        """Streaming completion holding its concurrency slot until the caller is done reading."""
+        tokens = estimate_tokens(kwargs)
+        self._stats["calls"] += 1
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(priority, tokens)
+            try:
+                stream = await get_async_llm_client().chat.completions.create(stream=True, **kwargs)
+            except Exception as e:
+                self._release()
+                if getattr(e, "status_code", None) == 429:
+                    self._stats["rate_limited"] += 1
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._stats["failures"] += 1
+                    raise
+                self._stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+            try:
+                yield stream
+            finally:
+                self._release()
+            return
+
+    def stats(self) -> Dict:
+        queued = [entry for entry in self._queue if not entry[3].done()]
+        waits = {}
+        for priority, samples in self._waits.items():
+            ordered = sorted(samples)
+            waits[priority.name.lower()] = {
+                "queued": sum(1 for entry in queued if entry[0] == priority),
+                "avg_wait_ms": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+                "p95_wait_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 2) if ordered else 0.0,
+            }
+        return {
+            **self._stats,
+            "active": self._active,
+            "queue_depth": len(queued),
+            "max_concurrency": self.max_concurrency,
+            "by_priority": waits,
+        }
+
+
+# Global Singleton
+llm_dispatcher = LLMDispatcher(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+    max_retries=LLM_MAX_RETRIES,
+    backoff_base=LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=LLM_BACKOFF_MAX_SECONDS,
+)
+register_metrics("llm_dispatcher", llm_dispatcher.stats)
@@ -0,0 +1,23 @@
+"""
+Metrics registry for RAG system.
+Components register a zero-argument provider returning a dict of counters;
+/health/metrics returns a snapshot of all of them.
+"""
+from typing import Any, Callable, Dict
+
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]) -> None:
+    """Registers (or replaces) the stats provider for a component."""
+    _providers[name] = provider
+
+
+def metrics_snapshot() -> Dict[str, Dict[str, Any]]:
+    snapshot = {}
+    for name, provider in _providers.items():
+        try:
+            snapshot[name] = provider()
+        except Exception as e:
+            snapshot[name] = {"error": str(e)}
+    return snapshot
@@ -0,0 +1,203 @@
+"""
+Pre-router module for RAG system.
+Decides obvious turns locally (lexical rules, then a logistic classifier over the query
+embedding we already compute) and leaves only the uncertain band to the LLM router.
+"""
+import re
+import time
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.config import get_embedding_model, PREROUTER_ENABLED, PREROUTER_LOW, PREROUTER_HIGH
+from rag.metrics import register_metrics
+
+
+@dataclass
+class RouteDecision:
+    needs_search: bool
+    confidence: float  # probability of the chosen answer, as estimated by the deciding stage
+    stage: str         # "rules" | "classifier" | "llm"
+    latency_ms: float
+
+
+# --- STAGE 1: LEXICAL RULES ---
+_CHITCHAT = re.compile(
+    r"^(hi|hello|hey|good (morning|afternoon|evening)|thanks?( you)?( so much| a lot)?|thx|ty|"
+    r"ok(ay)?|cool|great|perfect|awesome|got it|understood|sounds good|bye|goodbye|see you|"
+    r"you'?re welcome|no problem|nice)( lexi)?[\s!.]*$",
+    re.IGNORECASE,
+)
+# Bare replies whose meaning is in the previous turn ("Shall I look up the clause?" -> "yes")
+_ACKNOWLEDGEMENT = re.compile(
+    r"^(yes|yeah|yep|no|nope|sure|ok(ay)?|please( do)?|go ahead|do it|of course|right|correct|exactly)"
+    r"( please| lexi)?[\s!.]*$",
+    re.IGNORECASE,
+)
+_LEGAL_SIGNAL = re.compile(
+    r"\$\s?\d|\b\d{2,}\b|\b(article|section|clause|schedule|exhibit|agreement|contract|lease|merger|"
+    r"patent|lawsuit|indemnif\w*|warrant\w*|covenant|term sheet|purchase price|rent|deadline|"
+    r"liabilit\w*|plaintiff|defendant|dgcl|nda|closing|employees?)\b",
+    re.IGNORECASE,
+)
+_QUESTION = re.compile(r"^(what|who|when|where|which|how (much|many|long)|list|find|show|summari[sz]e)\b", re.IGNORECASE)
+
+
+def is_acknowledgement(query: str) -> bool:
+    return bool(_ACKNOWLEDGEMENT.match(query.strip()))
+
+
+def rule_decision(query: str) -> Optional[Tuple[bool, float]]:
+    text = query.strip()
+    if _CHITCHAT.match(text):
+        return False, 0.99
+    if _QUESTION.match(text) and _LEGAL_SIGNAL.search(text):
+        return True, 0.95
+    return None
+
+
+# --- STAGE 2: EMBEDDING CLASSIFIER ---
+# Seed set: the classifier starts from these and keeps learning from LLM-routed turns.
+SEED_NO = [
+    "hello", "hi there", "thanks a lot", "thank you so much, that helps", "ok great",
+    "good morning Lexi", "how are you today?", "that's all for now, bye",
+    "can you say that more simply?", "please make it shorter", "rephrase your last answer",
+    "what did you just say?", "translate that into French", "can you explain that again?",
+    "who are you?", "what can you do?", "nice work", "sorry, I meant the other one",
+]
+SEED_YES = [
+    "what is the purchase price in the merger agreement?", "who are the key employees identified for retention?",
+    "what is the patent number in the TechCorp lawsuit?", "what is the monthly rent for the Millennium Tower lease?",
+    "when is the closing date?", "list the indemnification obligations", "what does Article VI say?",
+    "summarize the termination clause", "which documents mention the DGCL?",
+    "what are the payment terms for the lease?", "find the non-compete provisions",
+    "what damages are claimed in the complaint?", "who signed the NDA?", "what is the governing law of the contract?",
+    "how much is the retention bonus?", "are there any change of control provisions?",
+]
+FEEDBACK_BUFFER_SIZE = 2000
+RETRAIN_EVERY = 50
+
+
+class PreRouter:
+    """
+    Two local stages in front of the LLM router:
+    1. Lexical rules for chit-chat and obvious fact questions.
+    2. Logistic regression on the dense query vector; confident outside [low, high].
+    """
+
+    def __init__(self, enabled: bool, low: float, high: float):
+        self.enabled = enabled
+        self.low = low
+        self.high = high
+        self._weights: Optional[np.ndarray] = None
+        self._bias = 0.0
+        self._seed: Optional[Tuple[np.ndarray, np.ndarray]] = None
+        self._feedback: Deque[Tuple[np.ndarray, float]] = deque(maxlen=FEEDBACK_BUFFER_SIZE)
+        self._since_retrain = 0
+        self._lock = threading.Lock()
+        self._counts = {"rules": 0, "classifier": 0, "llm": 0}
+        self._latencies: Dict[str, Deque[float]] = {stage: deque(maxlen=1000) for stage in self._counts}
+
+    # --- TRAINING ---
+    def train(self) -> None:
+        """Fits the classifier on the seed set (run once, off the event loop, at warmup)."""
+        output = get_embedding_model().encode(SEED_NO + SEED_YES, batch_size=16, return_dense=True)
+        vectors = np.asarray(output["dense_vecs"], dtype=np.float32)
+        labels = np.array([0.0] * len(SEED_NO) + [1.0] * len(SEED_YES), dtype=np.float32)
+        self._seed = (vectors, labels)
+        self._fit(vectors, labels)
+        print("✅ Pre-router classifier trained.")
+
+    def _fit(self, x: np.ndarray, y: np.ndarray, epochs: int = 300, lr: float = 0.5, l2: float = 1e-3) -> None:
+        weights = np.zeros(x.shape[1], dtype=np.float32)
+        bias = 0.0
+        for _ in range(epochs):
+            p = 1.0 / (1.0 + np.exp(-(x @ weights + bias)))
+            error = p - y
+            weights -= lr * (x.T @ error / len(y) + l2 * weights)
+            bias -= lr * float(error.mean())
+        with self._lock:
+            self._weights, self._bias = weights, bias
+
+    def observe(self, query: str, query_vector: List[float], needs_search: bool) -> None:
+        """
+        Learns from the LLM router's verdicts; retrains every RETRAIN_EVERY labels.
+        Acknowledgements are skipped: their verdict came from the history, not the query.
+        """
+        if self._seed is None or is_acknowledgement(query):
+            return
+        self._feedback.append((np.asarray(query_vector, dtype=np.float32), float(needs_search)))
+        self._since_retrain += 1
+        if self._since_retrain >= RETRAIN_EVERY:
+            self._since_retrain = 0
+            seed_x, seed_y = self._seed
+            x = np.vstack([seed_x] + [vector[None, :] for vector, _ in self._feedback])
+            y = np.concatenate([seed_y, np.array([label for _, label in self._feedback], dtype=np.float32)])
+            threading.Thread(target=self._fit, args=(x, y), daemon=True).start()
+
+    def probability(self, query_vector: List[float]) -> Optional[float]:
+        with self._lock:
+            if self._weights is None:
+                return None
+            z = float(np.asarray(query_vector, dtype=np.float32) @ self._weights + self._bias)
+        return 1.0 / (1.0 + np.exp(-z))
+
+    # --- DECISION ---
+    def decide(
+        self, query: str, query_vector: Optional[List[float]] = None, history: str = ""
+    ) -> Optional[RouteDecision]:
+        """
+        A confident local decision, or None when the LLM router should decide.
+        Neither local stage sees the history, so a bare acknowledgement mid-conversation
+        always goes to the LLM.
+        """
+        start = time.perf_counter()
+        if not self.enabled:
+            return None
+        if history.strip() and is_acknowledgement(query):
+            return None
+
+        rule = rule_decision(query)
+        if rule is not None:
+            return self.record(RouteDecision(rule[0], rule[1], "rules", (time.perf_counter() - start) * 1000))
+
+        if query_vector is not None:
+            p = self.probability(query_vector)
+            if p is not None and (p >= self.high or p <= self.low):
+                needs_search = p >= self.high
+                return self.record(RouteDecision(
+                    needs_search, p if needs_search else 1.0 - p, "classifier",
+                    (time.perf_counter() - start) * 1000
+                ))
+        return None
+
+    def record(self, decision: RouteDecision) -> RouteDecision:
+        self._counts[decision.stage] += 1
+        self._latencies[decision.stage].append(decision.latency_ms)
+        return decision
+
+    def stats(self) -> Dict:
+        p50 = {
+            stage: round(float(np.median(latencies)), 3) if latencies else None
+            for stage, latencies in self._latencies.items()
+        }
+        local = self._counts["rules"] + self._counts["classifier"]
+        total = local + self._counts["llm"]
+        llm_p50 = p50["llm"] or 0.0
+        return {
+            "decisions": dict(self._counts),
+            "llm_calls_saved": local,
+            "local_rate": round(local / total, 4) if total else 0.0,
+            "p50_ms": p50,
+            # Each local decision avoided one LLM round trip
+            "estimated_saved_ms": round(local * llm_p50, 1),
+            "classifier_ready": self._weights is not None,
+        }
+
+
+# Global Singleton
+prerouter = PreRouter(enabled=PREROUTER_ENABLED, low=PREROUTER_LOW, high=PREROUTER_HIGH)
+register_metrics("prerouter", prerouter.stats)
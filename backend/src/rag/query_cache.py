@@ -0,0 +1,148 @@
+"""
+Query embedding cache for RAG system.
+Bounded LRU + TTL cache of query vectors, keyed on the normalized query and the model id,
+so repeated questions skip the BGE-M3 forward pass entirely.
+"""
+import re
+import time
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from rag.config import (
+    EMBEDDING_MODEL_ID,
+    QUERY_CACHE_MAX_ENTRIES,
+    QUERY_CACHE_MAX_MB,
+    QUERY_CACHE_TTL_SECONDS,
+)
+from rag.metrics import register_metrics
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?!.]+$")
+
+# Rough per-entry overhead (key, OrderedDict node, tuple) on top of the vectors
+_ENTRY_OVERHEAD_BYTES = 256
+
+
+def normalize_query(query: str) -> str:
+    """
+    "  What is the Purchase Price? " and "what is the purchase price"
+    map to the same key. Only cosmetic differences are removed; wording is kept.
+    """
+    text = unicodedata.normalize("NFKC", query).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCTUATION.sub("", text)
+
+
+def _pack(embedding: Dict[str, Any]) -> Tuple[Dict[str, Any], int]:
+    """Stores dense vectors as float32 arrays (4 bytes/dim instead of a list of floats)."""
+    packed: Dict[str, Any] = {}
+    size = _ENTRY_OVERHEAD_BYTES
+    for name, value in embedding.items():
+        if name == "dense":
+            packed[name] = array("f", value)
+            size += 4 * len(value)
+        elif isinstance(value, dict):
+            packed[name] = dict(value)
+            size += 16 * len(value)
+        else:
+            packed[name] = value
+            size += 64
+    return packed, size
+
+
+def _unpack(packed: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        name: value.tolist() if isinstance(value, array) else value
+        for name, value in packed.items()
+    }
+
+
+class QueryEmbeddingCache:
+    """
+    Thread-safe LRU cache with a TTL and a memory cap.
+    Evicts least-recently-used entries until both the entry and byte limits hold.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl_seconds: float, model_id: str):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.model_id = model_id
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def _key(self, query: str) -> Tuple[str, str]:
+        return (self.model_id, normalize_query(query))
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        key = self._key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+
+            stored_at, size, packed = entry
+            if time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self._bytes -= size
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        return _unpack(packed)
+
+    def put(self, query: str, embedding: Dict[str, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self._key(query)
+        packed, size = _pack(embedding)
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+
+            self._entries[key] = (time.monotonic(), size, packed)
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
+
+
+# Global Singleton
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=QUERY_CACHE_MAX_ENTRIES,
+    max_bytes=int(QUERY_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=QUERY_CACHE_TTL_SECONDS,
+    model_id=EMBEDDING_MODEL_ID,
+)
+register_metrics("query_embedding_cache", query_embedding_cache.stats)
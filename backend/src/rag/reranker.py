@@ -0,0 +1,188 @@
+"""
+Reranker module for RAG system.
+Late-interaction (ColBERT) rerank of over-fetched candidates using BGE-M3 multi-vectors,
+scored with vectorized NumPy MaxSim. Candidate token vectors are cached per chunk.
+"""
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag.config import (
+    get_embedding_model,
+    RERANK_ENABLED,
+    RERANK_BUDGET_MS,
+    RERANK_MAX_INFLIGHT,
+    RERANK_CACHE_MAX_MB,
+)
+from rag.fusion import chunk_key
+from rag.metrics import register_metrics
+
+RERANK_MAX_LENGTH = 512
+
+
+def maxsim_scores(query_vecs: np.ndarray, doc_vecs: List[np.ndarray]) -> np.ndarray:
+    """
+    ColBERT MaxSim for all candidates at once:
+    score(d) = mean over query tokens of max over doc tokens of <q_i, d_j>.
+    Candidates are padded into one (N, L, dim) tensor; padding is masked to -inf.
+    """
+    max_len = max(len(vecs) for vecs in doc_vecs)
+    dim = query_vecs.shape[1]
+    padded = np.zeros((len(doc_vecs), max_len, dim), dtype=np.float32)
+    mask = np.zeros((len(doc_vecs), max_len), dtype=bool)
+    for i, vecs in enumerate(doc_vecs):
+        padded[i, :len(vecs)] = vecs
+        mask[i, :len(vecs)] = True
+
+    similarity = np.einsum("qd,nld->nql", query_vecs.astype(np.float32), padded)  # (N, Q, L)
+    similarity = np.where(mask[:, None, :], similarity, -np.inf)
+    return similarity.max(axis=2).mean(axis=1)
+
+
+class TokenVectorCache:
+    """LRU of per-chunk ColBERT vectors (float16), capped by bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, int], np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, int]) -> Optional[np.ndarray]:
+        with self._lock:
+            vecs = self._entries.get(key)
+            if vecs is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vecs
+
+    def put(self, key: Tuple[str, int], vecs: np.ndarray) -> None:
+        vecs = np.asarray(vecs, dtype=np.float16)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes
+            self._entries[key] = vecs
+            self._bytes += vecs.nbytes
+            while self._entries and self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+class ColbertReranker:
+    """
+    Optional rerank stage with its own latency budget.
+    Falls back to the incoming order when disabled, overloaded, over budget or failing,
+    so reranking can only ever improve results, never block them.
+    """
+
+    def __init__(self, enabled: bool, budget_ms: float, max_inflight: int, cache_max_bytes: int):
+        self.enabled = enabled
+        self.budget = budget_ms / 1000.0
+        self.max_inflight = max_inflight
+        self.cache = TokenVectorCache(cache_max_bytes)
+        # Own thread: long candidate encodes must not delay query embeddings
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="rerank")
+        # Jobs submitted to the executor and not finished yet, including those a caller gave up on
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+        self._stats = {
+            "reranked": 0, "bypassed_disabled": 0, "bypassed_load": 0,
+            "budget_exceeded": 0, "errors": 0, "total_ms": 0.0,
+        }
+
+    async def rerank(self, query: str, candidates: List[Dict], top_k: int) -> List[Dict]:
+        if not candidates:
+            return []
+        if not self.enabled:
+            self._stats["bypassed_disabled"] += 1
+            return candidates[:top_k]
+        if self._inflight >= self.max_inflight:
+            self._stats["bypassed_load"] += 1
+            return candidates[:top_k]
+
+        with self._inflight_lock:
+            self._inflight += 1
+        job = self._executor.submit(self._score, query, candidates)
+        # Released when the encode really ends, not when the caller stops waiting for it
+        job.add_done_callback(self._job_done)
+        start = time.perf_counter()
+        try:
+            scores = await asyncio.wait_for(asyncio.wrap_future(job), timeout=self.budget)
+        except asyncio.TimeoutError:
+            # A queued encode is cancelled; a running one finishes and still warms the cache
+            self._stats["budget_exceeded"] += 1
+            return candidates[:top_k]
+        except Exception as e:
+            print(f"⚠️ Rerank Error: {e}")
+            self._stats["errors"] += 1
+            return candidates[:top_k]
+
+        self._stats["reranked"] += 1
+        self._stats["total_ms"] += (time.perf_counter() - start) * 1000
+
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [
+            {**candidates[i], "retrieval_score": candidates[i].get("score", 0.0), "score": float(scores[i])}
+            for i in order
+        ]
+
+    def _job_done(self, _job) -> None:
+        with self._inflight_lock:
+            self._inflight -= 1
+
+    def _score(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        keys = [chunk_key(candidate) for candidate in candidates]
+        doc_vecs: List[Optional[np.ndarray]] = [self.cache.get(key) for key in keys]
+        missing = [i for i, vecs in enumerate(doc_vecs) if vecs is None]
+
+        # One forward pass for the query and every uncached candidate
+        texts = [query] + [candidates[i].get("text_snippet", "") for i in missing]
+        output = get_embedding_model().encode(
+            texts, batch_size=len(texts), max_length=RERANK_MAX_LENGTH,
+            return_dense=False, return_sparse=False, return_colbert_vecs=True
+        )
+        colbert = output["colbert_vecs"]
+        for i, vecs in zip(missing, colbert[1:]):
+            self.cache.put(keys[i], vecs)
+            doc_vecs[i] = vecs
+
+        return maxsim_scores(np.asarray(colbert[0], dtype=np.float32), doc_vecs)
+
+    def stats(self) -> Dict:
+        reranked = self._stats["reranked"]
+        return {
+            **self._stats,
+            "enabled": self.enabled,
+            "inflight": self._inflight,
+            "avg_ms": round(self._stats["total_ms"] / reranked, 2) if reranked else 0.0,
+            "token_cache": self.cache.stats(),
+        }
+
+
+# Global Singleton
+reranker = ColbertReranker(
+    enabled=RERANK_ENABLED,
+    budget_ms=RERANK_BUDGET_MS,
+    max_inflight=RERANK_MAX_INFLIGHT,
+    cache_max_bytes=int(RERANK_CACHE_MAX_MB * 1024 * 1024),
+)
+register_metrics("reranker", reranker.stats)
@@ -2,13 +2,46 @@
 Retrieval module for RAG system.
 Handles document retrieval with security filtering based on user roles.
 """
-from typing import List, Dict
-from qdrant_client.models import Filter, FieldCondition, MatchAny
+import asyncio
+from typing import List, Dict, Optional, Sequence
+import numpy as np
+from qdrant_client.models import Filter, FieldCondition, MatchAny, Prefetch, FusionQuery, Fusion, QueryRequest
 
 # Import shared clients and config
-from rag.config import qdrant_client, embedding_model, COLLECTION_NAME
+from rag.config import (
+    get_qdrant_client,
+    COLLECTION_NAME,
+    HYBRID_SEARCH_ENABLED,
+    HYBRID_PREFETCH_LIMIT,
+    QDRANT_SEARCH_TIMEOUT,
+    LEXICAL_FUSION_ENABLED,
+    RERANK_CANDIDATES,
+    RERANK_TOP_K,
+    SELECTION_CANDIDATES,
+)
+from rag.vectorizer import to_sparse_vector
+from rag.lexical_index import lexical_index
+from rag.fusion import rrf_fuse, chunk_key
+from rag.collection import search_params
+from rag.singleflight import single_flight
+from rag.reranker import reranker
+from rag.chunk_store import chunk_store
+from rag.selection import result_selector, VECTOR_FIELD
+from rag.generation import sync_serving_generation
+from rag.embedding_service import embed_query
+from rag.query_cache import query_embedding_cache
 from models.auth import SystemRole
 
+# Oversampling + rescoring when dense vectors are quantized (None for the "memory" profile)
+DENSE_SEARCH_PARAMS = search_params()
+
+# The only payload fields a search pulls over the wire; text comes from the chunk store
+SEARCH_PAYLOAD_FIELDS = ["mongo_document_id", "matter_id", "sensitivity", "chunk_index"]
+# Dense vectors come back only when the selection stage (MMR) needs them
+SEARCH_VECTOR_FIELDS = ["dense_vector"] if result_selector.enabled else False
+# Pre-slim points kept their text in the payload (until the next re-index)
+LEGACY_PAYLOAD_FIELDS = ["filename", "text_snippet"]
+
 # --- PERMISSIONS LOGIC ---
 # Define who can see what. Centralized here for easy changes.
 PERMISSION_MATRIX = {
@@ -23,76 +56,244 @@ def get_allowed_sensitivities(role: SystemRole) -> List[str]:
     return PERMISSION_MATRIX.get(role, [])
 
 
-async def retrieve_documents(query: str, user_role: SystemRole, top_k: int = 5) -> List[Dict]:
+async def encode_query(query: str) -> Dict:
+    """Query vectors, served from the LRU cache when the same question was seen recently."""
+    cached = query_embedding_cache.get(query)
+    if cached is not None:
+        return cached
+
+    embedding = await embed_query(query)
+    query_embedding_cache.put(query, embedding)
+    return embedding
+
+
+async def query_similarity(query_vector: List[float], other_query: str) -> float:
+    """Cosine similarity between a query vector and another query (encoded through the cache)."""
+    other = await encode_query(other_query)
+    a = np.asarray(query_vector, dtype=np.float32)
+    b = np.asarray(other["dense"], dtype=np.float32)
+    return float(a @ b / max(float(np.linalg.norm(a) * np.linalg.norm(b)), 1e-12))
+
+
+def lexical_search(
+    query: str,
+    user_role: SystemRole,
+    top_k: int = 5,
+    matter_ids: Optional[Sequence[str]] = None,
+) -> List[Dict]:
     """
-    Searches Qdrant with a STRICT security filter based on User Role.
+    BM25 over the in-process lexical index, under the same security filter as retrieve_documents.
+    Sub-millisecond and network-free; best for identifier-style queries ("Article VI", "DGCL").
     """
-    
+    allowed_levels = get_allowed_sensitivities(user_role)
+    if not allowed_levels:
+        return []
+    hits = lexical_index.search(query, allowed_sensitivities=allowed_levels, matter_ids=matter_ids, top_k=top_k)
+    chunks = chunk_store.get_many(chunk_key(hit) for hit in hits)
+    return [{**hit, **chunks[chunk_key(hit)]} for hit in hits if chunk_key(hit) in chunks]
+
+
+def search_request(query_embedding: Dict, security_filter: Filter, limit: int) -> QueryRequest:
+    """One query's search: dense + sparse hybrid (RRF) when sparse weights exist, else dense only."""
+    lexical_weights = query_embedding.get("sparse")
+    if HYBRID_SEARCH_ENABLED and lexical_weights:
+        # Dense + sparse prefetch, fused by reciprocal rank in a single request.
+        # Sparse recovers exact terms (patent numbers, dollar amounts) dense misses.
+        prefetch_limit = max(HYBRID_PREFETCH_LIMIT, limit)
+        return QueryRequest(
+            prefetch=[
+                Prefetch(
+                    query=query_embedding["dense"],
+                    using="dense_vector",
+                    filter=security_filter,
+                    params=DENSE_SEARCH_PARAMS,
+                    limit=prefetch_limit
+                ),
+                Prefetch(
+                    query=to_sparse_vector(lexical_weights),
+                    using="sparse_vector",
+                    filter=security_filter,
+                    limit=prefetch_limit
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            filter=security_filter,
+            limit=limit,
+            with_payload=SEARCH_PAYLOAD_FIELDS,
+            with_vector=SEARCH_VECTOR_FIELDS,
+        )
+    return QueryRequest(
+        query=query_embedding["dense"],
+        using="dense_vector",
+        filter=security_filter,
+        params=DENSE_SEARCH_PARAMS,
+        limit=limit,
+        with_payload=SEARCH_PAYLOAD_FIELDS,
+        with_vector=SEARCH_VECTOR_FIELDS,
+    )
+
+
+async def hydrate_chunks(results: List[Dict]) -> List[Dict]:
+    """
+    Fills filename + text_snippet from the chunk store (and drops the internal "point_id").
+    Points indexed before payloads were slimmed are read back from Qdrant instead;
+    hits whose text can't be found anywhere are dropped.
+    """
+    if not results:
+        return results
+    chunks = await asyncio.to_thread(
+        chunk_store.get_many, [(r["mongo_document_id"], r["chunk_index"]) for r in results]
+    )
+
+    legacy = {}
+    point_ids = [r.pop("point_id", None) for r in results]
+    missing = [
+        point_id for r, point_id in zip(results, point_ids)
+        if point_id is not None and (str(r["mongo_document_id"]), int(r["chunk_index"])) not in chunks
+    ]
+    if missing:
+        try:
+            records = await get_qdrant_client().retrieve(
+                collection_name=COLLECTION_NAME, ids=missing,
+                with_payload=LEGACY_PAYLOAD_FIELDS, timeout=QDRANT_SEARCH_TIMEOUT
+            )
+            legacy = {record.id: record.payload or {} for record in records}
+        except Exception as e:
+            print(f"⚠️ Legacy payload lookup failed: {e}")
+
+    hydrated = []
+    for r, point_id in zip(results, point_ids):
+        chunk = chunks.get((str(r["mongo_document_id"]), int(r["chunk_index"]))) or legacy.get(point_id)
+        if not chunk or not chunk.get("text_snippet"):
+            continue
+        r["filename"] = chunk.get("filename") or "Unknown File"
+        r["text_snippet"] = chunk["text_snippet"]
+        hydrated.append(r)
+    if len(hydrated) < len(results):
+        print(f"⚠️ {len(results) - len(hydrated)} hits had no chunk text (re-index to repair)")
+    return hydrated
+
+
+@single_flight(
+    "retrieve_documents",
+    # The role only matters through what it may see: same scope, same results
+    key=lambda query, user_role, top_k=5, matter_ids=None, expansions=(): (
+        query,
+        frozenset(get_allowed_sensitivities(user_role)),
+        top_k,
+        None if matter_ids is None else frozenset(matter_ids),
+        tuple(expansions),
+    )
+)
+async def retrieve_documents(
+    query: str,
+    user_role: SystemRole,
+    top_k: int = 5,
+    matter_ids: Optional[Sequence[str]] = None,
+    expansions: Sequence[str] = (),
+) -> List[Dict]:
+    """
+    Searches Qdrant with a STRICT security filter based on User Role,
+    restricted to `matter_ids` (the user's matters) when given.
+    `expansions` (reformulations from expand_query) are searched in the same batch request
+    and rank-fused with the main query's hits.
+    """
+
 
     # A. Get Permissions
     allowed_levels = get_allowed_sensitivities(user_role)
     if not allowed_levels:
         print(f"⛔ Access Denied for role: {user_role}")
         return []
+    if matter_ids is not None and not matter_ids:
+        print("⛔ No accessible matters.")
+        return []
 
     # B. Build Security Filter
-    security_filter = Filter(
-        must=[
-            FieldCondition(
-                key="sensitivity", 
-                match=MatchAny(any=allowed_levels)
-            )
-        ]
-    )
+    conditions = [
+        FieldCondition(
+            key="sensitivity", 
+            match=MatchAny(any=allowed_levels)
+        )
+    ]
+    if matter_ids is not None:
+        # Tenant key: Qdrant only walks these matters' partitions
+        conditions.append(FieldCondition(key="matter_id", match=MatchAny(any=list(matter_ids))))
+    security_filter = Filter(must=conditions)
+
+    # Another worker may have swapped the collection: drop state tied to the old one
+    await sync_serving_generation()
+
+    # Over-fetch when the ColBERT rerank or the selection stage will pick the final chunks
+    fetch_k = top_k
+    if reranker.enabled:
+        fetch_k = max(fetch_k, RERANK_CANDIDATES)
+    if result_selector.enabled:
+        fetch_k = max(fetch_k, SELECTION_CANDIDATES)
 
     # C. Search with Qdrant
+    queries = [query, *expansions]
     try:
-        # Encode query
-        embeddings_result = embedding_model.encode(query, return_dense=True)
-        query_vector = embeddings_result['dense_vecs']
-        
-        # Convert to list
-        if hasattr(query_vector, 'tolist'):
-            query_vector_list = query_vector.tolist()
-        else:
-            query_vector_list = list(query_vector)
-        
-        response = qdrant_client.query_points(
+        # Encode every variant (cached; concurrent calls share one micro-batched forward pass)
+        query_embeddings = await asyncio.gather(*(encode_query(q) for q in queries))
+
+        # All variants go out in ONE batch request: one round trip however many there are
+        responses = await get_qdrant_client().query_batch_points(
             collection_name=COLLECTION_NAME,
-            query=query_vector_list,
-            using="dense_vector",
-            query_filter=security_filter,
-            limit=top_k
+            requests=[search_request(embedding, security_filter, fetch_k) for embedding in query_embeddings],
+            timeout=QDRANT_SEARCH_TIMEOUT
         )
-        
-        hits = response.points
 
     except Exception as e:
         print(f"❌ Qdrant search error: {e}")
         return []
 
     # D. Format Results (CRITICAL: Mapping to Citation Model)
-    results = []
-    for hit in hits:
-        try:
-            payload = hit.payload or {}
-            results.append({
-                # Metadata for the database link
-                "mongo_document_id": payload.get("mongo_document_id", "unknown"),
-                "matter_id": payload.get("matter_id", "unknown"),
-                "chunk_index": payload.get("chunk_index", 0),
-                "sensitivity": payload.get("sensitivity", "unknown"),
-                
-                # Content for the LLM & Display
-                "filename": payload.get("filename", "Unknown File"),
-                "text_snippet": payload.get("text_snippet", ""),
-                
-                # Search Metric
-                "score": hit.score if hasattr(hit, 'score') else 0.0
-            })
-        except Exception as e:
-            print(f"⚠️ Error parsing hit: {e}")
-            continue
+    ranked_lists = []
+    for response in responses:
+        results = []
+        for hit in response.points:
+            try:
+                payload = hit.payload or {}
+                results.append({
+                    # Metadata for the database link
+                    "mongo_document_id": payload.get("mongo_document_id", "unknown"),
+                    "matter_id": payload.get("matter_id", "unknown"),
+                    "chunk_index": payload.get("chunk_index", 0),
+                    "sensitivity": payload.get("sensitivity", "unknown"),
+                    "point_id": hit.id,
+                    VECTOR_FIELD: hit.vector.get("dense_vector") if isinstance(hit.vector, dict) else None,
+                    
+                    # Search Metric
+                    "score": hit.score if hasattr(hit, 'score') else 0.0
+                })
+            except Exception as e:
+                print(f"⚠️ Error parsing hit: {e}")
+                continue
+        ranked_lists.append(results)
+
+    # Query variants fused by rank before the cut
+    results = rrf_fuse(ranked_lists, top_k=fetch_k) if len(ranked_lists) > 1 else ranked_lists[0]
+
+    # E. Lexical fusion: exact-term BM25 hits merged by reciprocal rank
+    if LEXICAL_FUSION_ENABLED:
+        lexical_hits = lexical_index.search(
+            query, allowed_sensitivities=allowed_levels, matter_ids=matter_ids, top_k=fetch_k
+        )
+        if lexical_hits:
+            results = rrf_fuse([results, lexical_hits], top_k=fetch_k)
+
+    # Content for the LLM & Display: one batched chunk store lookup (vector and lexical hits alike)
+    results = await hydrate_chunks(results)
+
+    # F. Late-interaction rerank: fewer, better chunks for the LLM
+    final_k = min(top_k, RERANK_TOP_K) if reranker.enabled else top_k
+    if reranker.enabled:
+        # With selection on, the reranker only orders; the selector makes the cut
+        results = await reranker.rerank(query, results, top_k=len(results) if result_selector.enabled else final_k)
+
+    # G. Selection: drop the tail after a relevance cliff, then diversify (MMR)
+    results = result_selector.select(results, [e["dense"] for e in query_embeddings], top_k=final_k)
     
     print(f"   ✅ Returning {len(results)} formatted results")
     return results
@@ -2,8 +2,17 @@
 Router module for RAG system.
 Decides if retrieval is necessary and contextualizes queries.
 """
-from rag.config import groq_client
+import json
+import time
+import asyncio
+from typing import List, Optional, Tuple
 
+from rag.config import LLM_MODEL, ROUTER_MODE, QUERY_EXPANSION_VARIANTS
+from rag.llm_dispatcher import llm_dispatcher, Priority
+from rag.prerouter import prerouter, RouteDecision
+from rag.singleflight import single_flight
+
+@single_flight("check_if_search_needed", key=lambda history, query: (history, query))
 async def check_if_search_needed(history: str, query: str) -> bool:
     """
     Determines if the user's query requires external legal information 
@@ -20,12 +29,13 @@ async def check_if_search_needed(history: str, query: str) -> bool:
     )
     
     try:
-        response = groq_client.chat.completions.create(
+        response = await llm_dispatcher.create(
+            Priority.ROUTING,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Chat History:\n{history}\n\nCurrent Query: {query}"}
             ],
-            model="llama-3.1-8b-instant", # Fast & Cheap model for routing
+            model=LLM_MODEL, # Fast & Cheap model for routing
             temperature=0.0,
             max_tokens=5
         )
@@ -36,11 +46,16 @@ async def check_if_search_needed(history: str, query: str) -> bool:
         return True # Default to searching if router fails (Safe fallback)
 
 
+@single_flight("rewrite_query", key=lambda history, query: (history, query))
 async def rewrite_query(history: str, query: str) -> str:
     """
     Rewrites the user's query to be standalone by resolving coreferences 
     (e.g., 'What is *his* address?' -> 'What is *John Doe's* address?').
     """
+    # Nothing to resolve against: skip the round trip
+    if not history.strip():
+        return query
+
     system_prompt = (
         "You are a query rewriting expert. "
         "Rewrite the user's last question to be a standalone search query based on the history. "
@@ -49,12 +64,13 @@ async def rewrite_query(history: str, query: str) -> str:
     )
 
     try:
-        response = groq_client.chat.completions.create(
+        response = await llm_dispatcher.create(
+            Priority.ROUTING,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": f"Chat History:\n{history}\n\nLast Question: {query}"}
             ],
-            model="llama-3.1-8b-instant",
+            model=LLM_MODEL,
             temperature=0.1
         )
         rewritten = response.choices[0].message.content.strip()
@@ -63,3 +79,148 @@ async def rewrite_query(history: str, query: str) -> str:
     except Exception as e:
         print(f"⚠️ Rewrite Error: {e}")
         return query # Fallback to original query
+
+
+
+async def route_and_rewrite(history: str, query: str) -> Tuple[bool, str]:
+    """
+    Fused router + rewriter: ONE structured-output call instead of two round trips.
+    Falls back to (search, original query) on any error, like the separate calls do.
+    """
+    system_prompt = (
+        "You are the routing and query rewriting agent of a legal RAG system.\n"
+        "1. Decide if the user's last message requires searching the legal database.\n"
+        "   - false for hello, thank you, chit-chat, or follow-ups clearly answered in the chat history.\n"
+        "   - true for facts, definitions, or specific legal content.\n"
+        "2. If true, rewrite the last message as a standalone search query using the history "
+        "(resolve pronouns and references). Do not answer it. If it is already specific, keep it unchanged.\n"
+        'Respond with JSON only: {"search": true|false, "query": "<standalone query>"}'
+    )
+
+    try:
+        response = await llm_dispatcher.create(
+            Priority.ROUTING,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Chat History:\n{history}\n\nLast Question: {query}"}
+            ],
+            model=LLM_MODEL,
+            temperature=0.0,
+            response_format={"type": "json_object"}
+        )
+        parsed = json.loads(response.choices[0].message.content)
+        needs_search = bool(parsed.get("search", True))
+        rewritten = str(parsed.get("query") or "").strip() or query
+        if needs_search and rewritten != query:
+            print(f"🔄 Query Rewritten: '{query}' -> '{rewritten}'")
+        return needs_search, rewritten
+    except Exception as e:
+        print(f"⚠️ Route+Rewrite Error: {e}")
+        return True, query # Safe fallback: search with the original query
+
+
+@single_flight("expand_query", key=lambda history, query, variants=QUERY_EXPANSION_VARIANTS: (history, query, variants))
+async def expand_query(history: str, query: str, variants: int = QUERY_EXPANSION_VARIANTS) -> List[str]:
+    """
+    Alternative standalone phrasings of the user's last question (synonyms, legal terms of art,
+    the clause it likely lives in), searched alongside the rewritten query.
+    Resolves references from the history itself, so it can run concurrently with routing.
+    Returns [] on any error: retrieval then falls back to the single query.
+    """
+    if variants <= 0:
+        return []
+
+    system_prompt = (
+        "You are a query expansion agent for a legal RAG system. "
+        f"Write {variants} different standalone search queries for the user's last question, "
+        "using the chat history to resolve pronouns and references. "
+        "Vary the wording: synonyms, legal terms of art, and the kind of clause or document "
+        "that would contain the answer. Do not answer the question.\n"
+        'Respond with JSON only: {"queries": ["...", "..."]}'
+    )
+
+    try:
+        response = await llm_dispatcher.create(
+            Priority.ROUTING,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": f"Chat History:\n{history}\n\nLast Question: {query}"}
+            ],
+            model=LLM_MODEL,
+            temperature=0.4,
+            response_format={"type": "json_object"}
+        )
+        parsed = json.loads(response.choices[0].message.content)
+        expansions = []
+        for candidate in parsed.get("queries") or []:
+            candidate = str(candidate).strip()
+            if candidate and candidate.lower() != query.strip().lower() and candidate not in expansions:
+                expansions.append(candidate)
+        expansions = expansions[:variants]
+        print(f"🪄 Query expanded into {len(expansions)} variants")
+        return expansions
+    except Exception as e:
+        print(f"⚠️ Expansion Error: {e}")
+        return []
+
+
+def _log_decision(decision: RouteDecision) -> None:
+    print(f"🧭 Route: {'SEARCH' if decision.needs_search else 'MEMORY'} "
+          f"(stage={decision.stage}, confidence={decision.confidence:.2f}, {decision.latency_ms:.1f}ms)")
+
+
+async def route_query(history: str, query: str, query_vector: Optional[List[float]] = None) -> RouteDecision:
+    """
+    Two-stage routing: the local pre-router decides obvious turns instantly;
+    only the uncertain band pays for the LLM round trip in check_if_search_needed.
+    """
+    decision = prerouter.decide(query, query_vector, history)
+    if decision is None:
+        start = time.perf_counter()
+        needs_search = await check_if_search_needed(history=history, query=query)
+        decision = prerouter.record(RouteDecision(
+            needs_search, 1.0, "llm", (time.perf_counter() - start) * 1000
+        ))
+        if query_vector is not None:
+            prerouter.observe(query, query_vector, needs_search)
+
+    _log_decision(decision)
+    return decision
+
+
+async def plan_query(
+    history: str, query: str, query_vector: Optional[List[float]] = None
+) -> Tuple[RouteDecision, str]:
+    """
+    Everything that happens before retrieval: (route decision, standalone query).
+
+    The pre-router settles obvious turns locally. For the rest, ROUTER_MODE picks how the
+    LLM is asked: "sequential" (route, then rewrite), "concurrent" (both calls at once with
+    asyncio.gather; the rewrite is discarded on NO) or "fused" (one structured-output call).
+    """
+    decision = prerouter.decide(query, query_vector, history)
+    if decision is not None:
+        _log_decision(decision)
+        standalone_query = await rewrite_query(history=history, query=query) if decision.needs_search else query
+        return decision, standalone_query
+
+    start = time.perf_counter()
+    if ROUTER_MODE == "fused":
+        needs_search, standalone_query = await route_and_rewrite(history=history, query=query)
+    elif ROUTER_MODE == "concurrent":
+        needs_search, standalone_query = await asyncio.gather(
+            check_if_search_needed(history=history, query=query),
+            rewrite_query(history=history, query=query),
+        )
+    else:
+        needs_search = await check_if_search_needed(history=history, query=query)
+        standalone_query = await rewrite_query(history=history, query=query) if needs_search else query
+
+    decision = prerouter.record(RouteDecision(
+        needs_search, 1.0, "llm", (time.perf_counter() - start) * 1000
+    ))
+    if query_vector is not None:
+        prerouter.observe(query, query_vector, needs_search)
+    _log_decision(decision)
+
+    return decision, (standalone_query if needs_search else query)
@@ -0,0 +1,176 @@
+"""
+Selection module for RAG system.
+Post-retrieval stage that decides which candidates actually reach the generator:
+an adaptive cutoff drops the tail once relevance falls off a cliff, then maximal marginal
+relevance (MMR) picks diverse chunks instead of near-duplicates of the best hit
+(near-identical chunks, e.g. the same clause in two drafts, are dropped outright).
+
+Relevance is the cosine between the query vector(s) and each candidate's dense vector
+(requested from Qdrant with with_vectors), so it is calibrated even when the search score
+is a rank-fused RRF value. Reranked candidates keep their reranker score as relevance.
+Those vectors are the original float32 ones, read from disk under the scalar/binary storage
+profiles, which is why the stage is opt-in (SELECTION_ENABLED).
+"""
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from rag.config import (
+    QDRANT_STORAGE_PROFILE,
+    SELECTION_ENABLED,
+    MMR_LAMBDA,
+    SELECTION_SCORE_GAP,
+    SELECTION_MIN_RELEVANCE,
+    SELECTION_DUPLICATE_SIMILARITY,
+)
+from rag.metrics import register_metrics
+
+# Key the dense vector travels under between the search and this stage
+VECTOR_FIELD = "vector"
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+
+
+def adaptive_cutoff(relevance: np.ndarray, score_gap: float, min_relevance: float, min_keep: int = 1) -> int:
+    """
+    Number of candidates (in descending relevance order) worth keeping: stops at the first
+    drop larger than `score_gap` or below `min_relevance`, but keeps at least `min_keep`.
+    """
+    ordered = np.sort(relevance)[::-1]
+    keep = len(ordered)
+    if min_relevance > 0:
+        keep = min(keep, int(np.count_nonzero(ordered >= min_relevance)))
+    if score_gap > 0 and len(ordered) > 1:
+        cliffs = np.flatnonzero(ordered[:-1] - ordered[1:] > score_gap)
+        if len(cliffs):
+            keep = min(keep, int(cliffs[0]) + 1)
+    return max(min(min_keep, len(ordered)), keep)
+
+
+def mmr(
+    relevance: np.ndarray,
+    vectors: np.ndarray,
+    top_k: int,
+    lambda_: float,
+    duplicate_similarity: float = 1.0,
+) -> List[int]:
+    """
+    Greedy MMR: argmax of lambda * relevance - (1 - lambda) * max similarity to the chunks
+    already picked. Candidates at least `duplicate_similarity` close to a picked chunk are
+    dropped outright. `vectors` are unit rows; rows of zeros (no vector) count as dissimilar.
+    """
+    n = len(relevance)
+    top_k = min(top_k, n)
+    similarity = vectors @ vectors.T
+    redundancy = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(top_k):
+        if not available.any():
+            break
+        scores = np.where(available, lambda_ * relevance - (1.0 - lambda_) * redundancy, -np.inf)
+        best = int(np.argmax(scores))
+        picked.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+        available &= similarity[best] < duplicate_similarity
+    return picked
+
+
+class ResultSelector:
+
+    def __init__(
+        self,
+        enabled: bool,
+        lambda_: float,
+        score_gap: float,
+        min_relevance: float,
+        duplicate_similarity: float,
+    ):
+        self.enabled = enabled
+        self.lambda_ = lambda_
+        self.score_gap = score_gap
+        self.min_relevance = min_relevance
+        self.duplicate_similarity = duplicate_similarity
+        self._stats = {"selections": 0, "candidates": 0, "cut_off": 0, "duplicates": 0, "returned": 0, "reordered": 0}
+
+    def select(
+        self,
+        candidates: List[Dict],
+        query_vectors: Sequence[Sequence[float]],
+        top_k: int,
+    ) -> List[Dict]:
+        """
+        Up to top_k candidates: tail cut by the adaptive cutoff, the rest chosen by MMR.
+        Always strips the dense vectors from the returned dicts.
+        """
+        vectors = [candidate.pop(VECTOR_FIELD, None) for candidate in candidates]
+        if not self.enabled or len(candidates) <= 1:
+            return candidates[:top_k]
+
+        dim = next((len(v) for v in vectors if v is not None), 0)
+        matrix = np.zeros((len(candidates), dim), dtype=np.float32)
+        has_vector = np.zeros(len(candidates), dtype=bool)
+        for i, vector in enumerate(vectors):
+            if vector is not None and len(vector) == dim:
+                matrix[i] = vector
+                has_vector[i] = True
+        if has_vector.any():
+            matrix[has_vector] = _unit_rows(matrix[has_vector])
+
+        relevance = self._relevance(candidates, matrix, has_vector, query_vectors)
+        if relevance is None:
+            # Neither calibrated scores nor vectors (e.g. a lexical-only list): keep search order
+            return candidates[:top_k]
+
+        keep = adaptive_cutoff(relevance, self.score_gap, self.min_relevance)
+        pool = np.argsort(-relevance, kind="stable")[:keep]
+        picked = mmr(relevance[pool], matrix[pool], top_k, self.lambda_, self.duplicate_similarity)
+        order = [int(pool[i]) for i in picked]
+
+        self._stats["selections"] += 1
+        self._stats["candidates"] += len(candidates)
+        self._stats["cut_off"] += len(candidates) - keep
+        self._stats["duplicates"] += max(0, min(top_k, keep) - len(order))
+        self._stats["returned"] += len(order)
+        self._stats["reordered"] += int(order != sorted(order, key=lambda i: -relevance[i]))
+        return [candidates[i] for i in order]
+
+    @staticmethod
+    def _relevance(
+        candidates: List[Dict],
+        matrix: np.ndarray,
+        has_vector: np.ndarray,
+        query_vectors: Sequence[Sequence[float]],
+    ) -> Optional[np.ndarray]:
+        if all("retrieval_score" in candidate for candidate in candidates):
+            # Reranked: the late-interaction score is the better relevance signal
+            return np.asarray([candidate.get("score", 0.0) for candidate in candidates], dtype=np.float32)
+        if not has_vector.all() or not len(query_vectors):
+            return None
+        # Best match over the query and its expansions
+        queries = _unit_rows(np.asarray(query_vectors, dtype=np.float32))
+        return (matrix @ queries.T).max(axis=1)
+
+    def stats(self) -> Dict:
+        selections = self._stats["selections"]
+        return {
+            **self._stats,
+            "avg_returned": round(self._stats["returned"] / selections, 2) if selections else 0.0,
+            "enabled": self.enabled,
+        }
+
+
+# Global Singleton
+result_selector = ResultSelector(
+    enabled=SELECTION_ENABLED,
+    lambda_=MMR_LAMBDA,
+    score_gap=SELECTION_SCORE_GAP,
+    min_relevance=SELECTION_MIN_RELEVANCE,
+    duplicate_similarity=SELECTION_DUPLICATE_SIMILARITY,
+)
+register_metrics("result_selection", result_selector.stats)
+if SELECTION_ENABLED and QDRANT_STORAGE_PROFILE != "memory":
+    print(f"⚠️ SELECTION_ENABLED with the '{QDRANT_STORAGE_PROFILE}' storage profile: every search reads the candidates' original vectors from disk")
@@ -0,0 +1,87 @@
+"""
+Single-flight module for RAG system.
+Concurrent calls with identical inputs share one in-flight future instead of each issuing
+its own upstream request (several users asking the question a partner shared in a meeting).
+Results are shared between callers and must be treated as read-only.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+from rag.config import SINGLEFLIGHT_ENABLED
+from rag.metrics import register_metrics
+
+
+class SingleFlight:
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._waiters: Dict[asyncio.Future, int] = {}
+        self._stats = {"calls": 0, "leaders": 0, "coalesced": 0, "abandoned": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Runs fn() unless an identical call is already in flight, in which case its result is shared."""
+        self._stats["calls"] += 1
+        if not self.enabled:
+            self._stats["leaders"] += 1
+            return await fn()
+
+        task = self._inflight.get(key)
+        if task is None:
+            self._stats["leaders"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._forget, key))
+        else:
+            self._stats["coalesced"] += 1
+
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # Shielded: one caller giving up must not cancel the call for the others
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if self._waiters[task] == 0:
+                del self._waiters[task]
+                if not task.done():
+                    # Every caller gave up (e.g. cancelled speculative searches): stop the upstream call
+                    self._stats["abandoned"] += 1
+                    task.cancel()
+
+    def _forget(self, key: Hashable, task: asyncio.Future) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark retrieved; callers already got it through the shield
+
+    def stats(self) -> Dict:
+        return {**self._stats, "inflight": len(self._inflight)}
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def single_flight(name: str, key: Callable[..., Hashable]):
+    """
+    Decorator for async functions. `key` takes the same arguments as the function and returns
+    the hashable identity of the call (it must include anything that changes the result,
+    such as the caller's permission scope).
+    """
+    group = _groups.setdefault(name, SingleFlight(name, enabled=SINGLEFLIGHT_ENABLED))
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            return await group.do(key(*args, **kwargs), lambda: fn(*args, **kwargs))
+        wrapper.single_flight = group
+        return wrapper
+    return decorator
+
+
+def singleflight_stats() -> Dict:
+    return {name: group.stats() for name, group in _groups.items()}
+
+
+register_metrics("singleflight", singleflight_stats)
@@ -0,0 +1,131 @@
+"""
+Speculative retrieval for RAG system.
+Starts searching the raw user query the moment a turn arrives, in parallel with routing
+and rewriting. The speculative result is kept when the router says YES and the rewritten
+query is close enough to the original; otherwise it is cancelled or replaced.
+With query expansion on, the head start goes to the expansion call instead: its variants
+are searched together with the rewritten query, so a raw-query result would be discarded.
+"""
+import time
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from models.auth import SystemRole
+from rag.config import SPECULATIVE_RETRIEVAL_ENABLED, SPECULATION_SIMILARITY, QUERY_EXPANSION_ENABLED
+from rag.metrics import register_metrics
+from rag.prerouter import RouteDecision
+from rag.retrieval import retrieve_documents, query_similarity
+from rag.router import plan_query, expand_query
+
+
+class SpeculativeRetriever:
+
+    def __init__(self, enabled: bool, similarity_threshold: float, expand: bool = False):
+        self.enabled = enabled
+        self.similarity_threshold = similarity_threshold
+        self.expand = expand
+        self._stats = {"won": 0, "lost": 0, "cancelled": 0, "sequential": 0, "expanded": 0, "saved_ms": 0.0}
+
+    async def plan_and_retrieve(
+        self,
+        history: str,
+        query: str,
+        user_role: SystemRole,
+        query_vector: Optional[List[float]] = None,
+        top_k: int = 5,
+        matter_ids: Optional[Sequence[str]] = None,
+    ) -> Tuple[RouteDecision, str, List[Dict]]:
+        """Returns (route decision, standalone query, retrieved chunks)."""
+        if self.expand:
+            return await self._plan_and_expand(history, query, user_role, query_vector, top_k, matter_ids)
+
+        if not self.enabled:
+            self._stats["sequential"] += 1
+            decision, standalone_query = await plan_query(history=history, query=query, query_vector=query_vector)
+            docs = await retrieve_documents(standalone_query, user_role, top_k, matter_ids) if decision.needs_search else []
+            return decision, standalone_query, docs
+
+        start = time.perf_counter()
+        speculative = asyncio.create_task(self._timed_retrieve(query, user_role, top_k, matter_ids))
+
+        try:
+            decision, standalone_query = await plan_query(history=history, query=query, query_vector=query_vector)
+        except BaseException:
+            speculative.cancel()
+            raise
+        plan_ms = (time.perf_counter() - start) * 1000
+
+        if not decision.needs_search:
+            speculative.cancel()
+            self._stats["cancelled"] += 1
+            return decision, standalone_query, []
+
+        if standalone_query.strip() == query.strip() or (
+            query_vector is not None
+            and await query_similarity(query_vector, standalone_query) >= self.similarity_threshold
+        ):
+            docs, retrieve_ms = await speculative
+            # Sequentially this would have cost plan + retrieval; we paid max(plan, retrieval)
+            self._stats["won"] += 1
+            self._stats["saved_ms"] += max(0.0, plan_ms + retrieve_ms - (time.perf_counter() - start) * 1000)
+            print(f"🏎️ Speculative retrieval kept (saved ~{min(plan_ms, retrieve_ms):.0f}ms).")
+            return decision, standalone_query, docs
+
+        speculative.cancel()
+        self._stats["lost"] += 1
+        docs = await retrieve_documents(standalone_query, user_role, top_k, matter_ids)
+        return decision, standalone_query, docs
+
+    async def _plan_and_expand(
+        self,
+        history: str,
+        query: str,
+        user_role: SystemRole,
+        query_vector: Optional[List[float]],
+        top_k: int,
+        matter_ids: Optional[Sequence[str]],
+    ) -> Tuple[RouteDecision, str, List[Dict]]:
+        """Expansion runs concurrently with routing; every variant is searched in one batch."""
+        expansion = asyncio.create_task(expand_query(history=history, query=query))
+        try:
+            decision, standalone_query = await plan_query(history=history, query=query, query_vector=query_vector)
+        except BaseException:
+            expansion.cancel()
+            raise
+
+        if not decision.needs_search:
+            expansion.cancel()
+            self._stats["cancelled"] += 1
+            return decision, standalone_query, []
+
+        expansions = [q for q in await expansion if q.strip().lower() != standalone_query.strip().lower()]
+        self._stats["expanded"] += 1
+        docs = await retrieve_documents(standalone_query, user_role, top_k, matter_ids, expansions=expansions)
+        return decision, standalone_query, docs
+
+    @staticmethod
+    async def _timed_retrieve(
+        query: str, user_role: SystemRole, top_k: int, matter_ids: Optional[Sequence[str]]
+    ) -> Tuple[List[Dict], float]:
+        start = time.perf_counter()
+        docs = await retrieve_documents(query, user_role, top_k, matter_ids)
+        return docs, (time.perf_counter() - start) * 1000
+
+    def stats(self) -> Dict:
+        speculated = self._stats["won"] + self._stats["lost"] + self._stats["cancelled"]
+        return {
+            **self._stats,
+            "saved_ms": round(self._stats["saved_ms"], 1),
+            "win_rate": round(self._stats["won"] / speculated, 4) if speculated else 0.0,
+            "avg_saved_ms": round(self._stats["saved_ms"] / self._stats["won"], 1) if self._stats["won"] else 0.0,
+            "enabled": self.enabled,
+        }
+
+
+# Global Singleton
+speculative_retriever = SpeculativeRetriever(
+    enabled=SPECULATIVE_RETRIEVAL_ENABLED,
+    similarity_threshold=SPECULATION_SIMILARITY,
+    expand=QUERY_EXPANSION_ENABLED,
+)
+register_metrics("speculative_retrieval", speculative_retriever.stats)
@@ -3,55 +3,124 @@ Vectorizer module for RAG system.
 Handles text chunking, vectorization, and uploading to Qdrant.
 """
 import uuid
-from typing import Dict, Any, Optional, TypedDict
+import asyncio
+from typing import Dict, Any, List, Optional, TypedDict
 from pydantic import BaseModel
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import PointStruct, SparseVector
 
 # Import shared clients and config
-from rag.config import qdrant_client, embedding_model, text_splitter, COLLECTION_NAME
+from rag.config import (
+    get_qdrant_client,
+    get_embedding_model,
+    get_text_splitter,
+    COLLECTION_NAME,
+    QDRANT_TIMEOUT,
+    HYBRID_SEARCH_ENABLED,
+    INGEST_WORKERS,
+    INGEST_BATCH_SIZE,
+)
+from rag.ingest_pool import ingest_pool
+from rag.lexical_index import lexical_index, BM25Index
+from rag.chunk_store import chunk_store
+from rag.generation import publish_change
 
 
 class VectorPayload(TypedDict):
     """
     Payload structure for vectorized documents in Qdrant.
     
-    This is the exact structure stored with each vector in the vector database.
+    This is the exact structure stored with each vector in the vector database:
+    filter keys and ids only. The chunk text and filename live in the local chunk store
+    (rag/chunk_store.py), keyed by (mongo_document_id, chunk_index).
     Example:
     {
         "mongo_document_id": "697645446aa189363a751ffa",
-        "filename": "AI_Startup_Financials_FY2025.xlsx",
         "matter_id": "6976453b4d7b3821fdd38804",
         "sensitivity": "internal",
-        "chunk_index": 0,
-        "text_snippet": "CONFIDENTIAL FINANCIAL REPORTING - FY 2025 SHEET …"
+        "chunk_index": 0
     }
     """
     mongo_document_id: str
-    filename: str
     matter_id: str
     sensitivity: str
     chunk_index: int
-    text_snippet: str
 
 
 class VectorMetadata(BaseModel):
     """
     Input metadata for vectorization.
     This is what gets passed to vectorize() function.
-    The vectorizer will add chunk_index and text_snippet automatically.
+    The vectorizer adds chunk_index; filename and chunk text go to the chunk store.
     """
     mongo_document_id: str
     filename: str
     matter_id: str
     sensitivity: str
 
-def vectorize_and_upload(content_text: str, metadata: Dict[str, Any]):
+def point_id(mongo_document_id: str, chunk_index: int) -> str:
+    """Deterministic point id: indexing the same chunk twice overwrites instead of duplicating."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"lexi:{mongo_document_id}:{chunk_index}"))
+
+
+def to_sparse_vector(lexical_weights: Dict[str, float]) -> SparseVector:
+    """BGE-M3 lexical weights ({token_id: weight}) -> Qdrant sparse vector."""
+    return SparseVector(
+        indices=[int(token_id) for token_id in lexical_weights],
+        values=[float(weight) for weight in lexical_weights.values()]
+    )
+
+
+def embed_chunks(chunks: List[str]) -> Dict[str, List[Any]]:
+    """
+    Dense vectors (and sparse lexical weights for hybrid search) for a document's chunks,
+    in chunk_index order. Large documents are sharded across the ingestion process pool
+    when INGEST_WORKERS > 1.
     """
-    Chunks text -> Creates Vectors -> Uploads to Qdrant.
+    if INGEST_WORKERS > 1 and len(chunks) > INGEST_BATCH_SIZE:
+        return ingest_pool.encode(chunks, return_sparse=HYBRID_SEARCH_ENABLED)
+
+    output = get_embedding_model().encode(
+        chunks, batch_size=INGEST_BATCH_SIZE, max_length=512,
+        return_dense=True, return_sparse=HYBRID_SEARCH_ENABLED
+    )
+    return {
+        "dense_vecs": output['dense_vecs'],
+        "lexical_weights": output['lexical_weights'] if HYBRID_SEARCH_ENABLED else [None] * len(chunks)
+    }
+
+
+def _chunk_and_embed(content_text: str):
+    """CPU-bound half of ingestion: split + encode (run off the event loop)."""
+    chunks = get_text_splitter().split_text(content_text)
+    return chunks, embed_chunks(chunks)
+
+
+def _index_lexically(index: BM25Index, metadata: Dict[str, Any], chunks: List[str]) -> None:
+    if index is lexical_index:
+        # Live index: saved and announced so the other workers pick the document up
+        publish_change(lambda: index.add_chunks(metadata, chunks))
+    else:
+        index.add_chunks(metadata, chunks)
+
+
+async def vectorize_and_upload(
+    content_text: str,
+    metadata: Dict[str, Any],
+    qdrant_client: Optional[AsyncQdrantClient] = None,
+    collection_name: str = COLLECTION_NAME,
+    lexical: Optional[BM25Index] = None,
+) -> int:
+    """
+    Chunks text -> Creates Vectors -> Uploads to Qdrant. Returns the number of chunks indexed.
+    Chunking and encoding run in a worker thread; the upsert uses the shared async client.
     
     Args:
         content_text: The text content to vectorize
+        qdrant_client: Client to upload with (defaults to the shared application client)
+        collection_name: Target collection (re-indexing writes to a new versioned one);
+            also the chunk store namespace the chunk text is written under
+        lexical: BM25 index to keep in step (defaults to the live lexical_index)
         metadata: Dictionary containing:
             - mongo_document_id: MongoDB document ID (str)
             - filename: Document filename (str)
@@ -60,62 +129,68 @@ def vectorize_and_upload(content_text: str, metadata: Dict[str, Any]):
     
     The function automatically adds:
         - chunk_index: Index of the chunk (int)
-        - text_snippet: The actual text content of the chunk (str)
     
     Resulting payload structure (VectorPayload):
     {
         "mongo_document_id": str,
-        "filename": str,
         "matter_id": str,
         "sensitivity": str,
-        "chunk_index": int,
-        "text_snippet": str
+        "chunk_index": int
     }
+    The chunk text and filename are written to the chunk store, not to Qdrant.
     """
     if not content_text:
-        return
+        return 0
 
-    # A. Chunking
-    chunks = text_splitter.split_text(content_text)
-    
-    # B. Vectorization (Batch)
-    embeddings = embedding_model.encode(
-        chunks, batch_size=12, max_length=512, return_dense=True
-    )['dense_vecs']
+    # A. Chunking + B. Vectorization (Batch) - dense + sparse from the same forward pass
+    chunks, embeddings = await asyncio.to_thread(_chunk_and_embed, content_text)
 
     # C. Prepare Points
     points = []
-    for i, (text, vector) in enumerate(zip(chunks, embeddings)):
+    for i, (vector, lexical_weights) in enumerate(
+        zip(embeddings["dense_vecs"], embeddings["lexical_weights"])
+    ):
         
         # Combine global metadata with chunk metadata
         # This creates the VectorPayload structure
         payload: VectorPayload = {
             "mongo_document_id": metadata.get("mongo_document_id", ""),
-            "filename": metadata.get("filename", ""),
             "matter_id": metadata.get("matter_id", ""),
             "sensitivity": metadata.get("sensitivity", "internal"),
-            "chunk_index": i,
-            "text_snippet": text
+            "chunk_index": i
         }
 
+        # Named vectors to match collection schema
+        vectors = {"dense_vector": vector.tolist()}
+        if lexical_weights:
+            vectors["sparse_vector"] = to_sparse_vector(lexical_weights)
+
         points.append(PointStruct(
-            id=str(uuid.uuid4()),
-            vector={"dense_vector": vector.tolist()},  # Named vector to match collection schema
+            id=point_id(payload["mongo_document_id"], i),
+            vector=vectors,
             payload=payload
         ))
 
-    # D. Upload
+    # D. Chunk text first: a point must never be searchable before its text can be resolved
+    await asyncio.to_thread(chunk_store.put_document, metadata, chunks, collection_name)
+
+    # E. Upload
     if points:
-        qdrant_client.upsert(collection_name=COLLECTION_NAME, points=points)
+        client = qdrant_client or get_qdrant_client()
+        await client.upsert(collection_name=collection_name, points=points, wait=True, timeout=QDRANT_TIMEOUT)
         print(f"✅ Indexed {len(points)} chunks for {metadata.get('filename')}")
 
+    # F. Lexical index (in-process BM25), kept in step with Qdrant
+    await asyncio.to_thread(_index_lexically, lexical or lexical_index, metadata, chunks)
+    return len(points)
+
 
-def vectorize(
+async def vectorize(
     content_text: str,
     metadata: Dict[str, Any],
-    qdrant_client: Optional[QdrantClient] = None,
+    qdrant_client: Optional[AsyncQdrantClient] = None,
 ) -> None:
     """
-    Wrapper for vectorize_and_upload. Uses global qdrant_client if none passed.
+    Wrapper for vectorize_and_upload. Uses the shared qdrant_client if none passed.
     """
-    vectorize_and_upload(content_text, metadata)
\ No newline at end of file
+    await vectorize_and_upload(content_text, metadata, qdrant_client=qdrant_client)
\ No newline at end of file
@@ -1,17 +1,31 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, List, Optional, Set
 from beanie import PydanticObjectId
+import asyncio
+import json
 
 # RAG functions
 from rag import (
-    check_if_search_needed,
-    rewrite_query,
-    retrieve_documents,
-    generate_answer
+    speculative_retriever,
+    query_similarity,
+    generate_answer,
+    generate_answer_stream,
+    GENERATION_ERROR_PREFIX,
+    GenerationError,
+    encode_query,
+    get_allowed_sensitivities,
+    answer_cache,
+    permission_scope,
+    cited_document_ids,
 )
 from models.chat import ChatMessage, ChatSession, Citation
 from models.auth import User
+from rag.generation import sync_serving_generation
+from services.chat_memory import chat_memory
+from services.matter_access import matter_access
 from core.security import get_current_user
 
 router = APIRouter(prefix="/chat", tags=["chat"])
@@ -23,31 +37,20 @@ class ChatRequest(BaseModel):
 class CreateSessionRequest(BaseModel):
     name: Optional[str] = "New Chat"
 
-# Helper functions for chat history
-async def get_chat_history(session_id: str, limit: int = 6) -> str:
-    """
-    Retrieves chat history as a formatted string for the LLM.
-    """
-    try:
-        session_obj_id = PydanticObjectId(session_id)
-        messages = await ChatMessage.find(
-            ChatMessage.session_id == session_obj_id
-        ).sort("+created_at").limit(limit).to_list()
-        
-        # Format as conversation history
-        history_lines = []
-        for msg in messages:
-            role_label = "User" if msg.role == "user" else "Lexi"
-            history_lines.append(f"{role_label}: {msg.content}")
-        
-        return "\n".join(history_lines) if history_lines else ""
-    except Exception as e:
-        print(f"⚠️ Error retrieving chat history: {e}")
-        return ""
+# Background work outliving the request (kept referenced until done)
+_background_tasks: Set[asyncio.Task] = set()
+
+def run_in_background(coro):
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
 
-async def save_message(session_id: str, role: str, content: str, citations: List[Citation] = None):
+# Helper functions for chat history
+async def save_message(
+    session_id: str, role: str, content: str, citations: List[Citation] = None, partial: bool = False
+):
     """
-    Saves a chat message to the database.
+    Saves a chat message to the database. `partial` marks an answer whose generation was cut short.
     """
     try:
         session_obj_id = PydanticObjectId(session_id)
@@ -55,7 +58,8 @@ async def save_message(session_id: str, role: str, content: str, citations: List
             session_id=session_obj_id,
             role=role,
             content=content,
-            citations=citations or []
+            citations=citations or [],
+            partial=partial
         )
         await message.insert()
         
@@ -69,63 +73,226 @@ async def save_message(session_id: str, role: str, content: str, citations: List
         print(f"⚠️ Error saving message: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save message: {str(e)}")
 
-@router.post("")
-async def smart_chat(payload: ChatRequest, current_user: User = Depends(get_current_user)):
+def build_citations(context_docs: List[Dict]) -> List[Citation]:
+    """Convert retrieved chunks to Citation objects for storage."""
+    return [
+        Citation(
+            mongo_document_id=doc.get("mongo_document_id", "unknown"),
+            filename=doc.get("filename", "Unknown File"),
+            matter_id=doc.get("matter_id", "unknown"),
+            sensitivity=doc.get("sensitivity", "unknown"),
+            chunk_index=doc.get("chunk_index", 0),
+            text_snippet=doc.get("text_snippet", ""),
+            score=doc.get("score", 0.0)
+        )
+        for doc in context_docs
+    ]
+
+async def is_standalone(query: str, standalone_query: str, query_vector: List[float]) -> bool:
     """
-    Main chat endpoint that uses the RAG system with routing, retrieval, and generation.
+    True when the rewrite did not need the history (the rewritten query means the same thing).
+    Only such answers are safe to cache: follow-ups depend on the conversation.
     """
-    
-    # 1. GET CONTEXT (The Memory)
-    chat_history = await get_chat_history(payload.session_id, limit=6)
+    if standalone_query.strip() == query.strip():
+        return True
+    # Cache hit: retrieval just encoded the rewritten query
+    return await query_similarity(query_vector, standalone_query) >= answer_cache.threshold
 
-    # 2. THE ROUTER (The Decision)
-    needs_search = await check_if_search_needed(history=chat_history, query=payload.query)
+@dataclass
+class ChatTurn:
+    """Everything known about a chat turn before the answer is generated."""
+    query: str
+    session_id: str
+    scope: FrozenSet[str]
+    matter_ids: Optional[List[str]]
+    query_vector: List[float]
+    chat_history: str = ""
+    standalone_query: str = ""
+    context_docs: List[Dict] = field(default_factory=list)
+    cached_answer: Optional[str] = None
 
-    context_docs = []
+async def prepare_turn(payload: ChatRequest, current_user: User) -> ChatTurn:
+    """
+    Memory, cache lookup, routing, rewriting and retrieval: everything before generation.
+    Shared by the blocking and the streaming chat endpoints.
+    """
 
-    if needs_search:
+    # 1. GET CONTEXT (The Memory), alongside the scope and the query embedding
+    # Rolling summary of older turns + the newest messages, within the history token budget
+    matter_ids, query_embedding, chat_history, _ = await asyncio.gather(
+        matter_access.accessible_matter_ids(current_user),
+        encode_query(payload.query),
+        chat_memory.get_history(payload.session_id),
+        sync_serving_generation(),  # answers cached before another worker's re-index are dropped
+    )
+    scope = permission_scope(get_allowed_sensitivities(current_user.system_role), matter_ids)
+    turn = ChatTurn(
+        query=payload.query,
+        session_id=payload.session_id,
+        scope=scope,
+        matter_ids=matter_ids,
+        query_vector=query_embedding["dense"],
+        chat_history=chat_history,
+        standalone_query=payload.query
+    )
+
+    # 0. SEMANTIC ANSWER CACHE (first turn)
+    # Nothing to resolve against: same question + same permission scope (sensitivities AND
+    # matters) -> serve the previous answer before routing or retrieval
+    if not turn.chat_history.strip():
+        cached = answer_cache.lookup(turn.query_vector, scope)
+        if cached:
+            print("⚡ Answer cache HIT.")
+            turn.cached_answer = cached.answer
+            turn.context_docs = cached.sources
+            return turn
+
+    # 2. THE ROUTER (The Decision) + 3a. REWRITE QUERY + 3b. RETRIEVE
+    # Local rules/classifier first; the LLM only for uncertain turns (see ROUTER_MODE).
+    # "What about the second clause?" -> "What are the terms of the second clause in the Smith contract?"
+    # The raw query is searched speculatively while the router and rewriter run.
+    decision, turn.standalone_query, turn.context_docs = await speculative_retriever.plan_and_retrieve(
+        history=turn.chat_history,
+        query=payload.query,
+        user_role=current_user.system_role,
+        query_vector=turn.query_vector,
+        top_k=5,
+        matter_ids=turn.matter_ids
+    )
+
+    if decision.needs_search:
         print("🔍 Router decided: SEARCH needed.")
-        
-        # 3a. REWRITE QUERY
-        # "What about the second clause?" -> "What are the terms of the second clause in the Smith contract?"
-        standalone_query = await rewrite_query(history=chat_history, query=payload.query)
-        
-        # 3b. RETRIEVE
-        context_docs = await retrieve_documents(
-            query=standalone_query,
-            user_role=current_user.system_role,
-            top_k=5
-        )
     else:
         print("🧠 Router decided: MEMORY sufficient.")
         # We rely solely on chat_history, so context_docs remains empty
 
+    # 0b. SEMANTIC ANSWER CACHE (later turns)
+    # A follow-up only reuses an answer if it did not need the history and was answered
+    # from exactly the documents just retrieved for it
+    if (
+        turn.chat_history.strip()
+        and turn.context_docs
+        and await is_standalone(turn.query, turn.standalone_query, turn.query_vector)
+    ):
+        cached = answer_cache.lookup(turn.query_vector, scope, cited_document_ids(turn.context_docs))
+        if cached:
+            print("⚡ Answer cache HIT (validated against retrieval).")
+            turn.cached_answer = cached.answer
+
+    return turn
+
+async def is_cacheable(turn: ChatTurn, completed: bool) -> bool:
+    """
+    Only complete, freshly generated, history-independent answers grounded in documents
+    may be shared through the answer cache.
+    """
+    return (
+        completed
+        and turn.cached_answer is None
+        and bool(turn.context_docs)
+        and await is_standalone(turn.query, turn.standalone_query, turn.query_vector)
+    )
+
+async def finish_turn(turn: ChatTurn, answer: str, completed: bool):
+    """
+    5. SAVE STATE with citations, then 6. CACHE the answer for the next person asking the same thing.
+    `completed` is False when generation was interrupted (disconnect or LLM error): the answer
+    is still saved to the session, marked partial, but never cached.
+    """
+    await save_message(turn.session_id, "user", turn.query)
+    await save_message(turn.session_id, "ai", answer, build_citations(turn.context_docs), partial=not completed)
+    run_in_background(chat_memory.refresh_summary(turn.session_id))
+
+    if await is_cacheable(turn, completed):
+        answer_cache.store(turn.query, turn.query_vector, turn.scope, answer, turn.context_docs)
+
+@router.post("")
+async def smart_chat(payload: ChatRequest, current_user: User = Depends(get_current_user)):
+    """
+    Main chat endpoint that uses the RAG system with routing, retrieval, and generation.
+    """
+    turn = await prepare_turn(payload, current_user)
+
+    if turn.cached_answer is not None:
+        await finish_turn(turn, turn.cached_answer, completed=True)
+        return {"answer": turn.cached_answer, "sources": turn.context_docs, "cached": True}
+
     # 4. GENERATE ANSWER
     # The generator sees: History + (Optional) New Docs + User Question
-    answer = await generate_answer(
-        query=payload.query,
-        history=chat_history,
-        context_chunks=context_docs
-    )
+    try:
+        answer = await generate_answer(
+            query=turn.query,
+            history=turn.chat_history,
+            context_chunks=turn.context_docs
+        )
+    except GenerationError as e:
+        # Nothing was generated: the turn is saved with an empty partial answer, and the
+        # error goes back in its own field (never into the answer, which feeds later prompts)
+        print(f"⚠️ Generation error: {e}")
+        await finish_turn(turn, "", completed=False)
+        return {"answer": "", "sources": turn.context_docs, "error": f"{GENERATION_ERROR_PREFIX}: {e}"}
 
-    # 5. SAVE STATE with citations
-    # Convert context_docs to Citation objects
-    citations = []
-    for doc in context_docs:
-        citations.append(Citation(
-            mongo_document_id=doc.get("mongo_document_id", "unknown"),
-            filename=doc.get("filename", "Unknown File"),
-            matter_id=doc.get("matter_id", "unknown"),
-            sensitivity=doc.get("sensitivity", "unknown"),
-            chunk_index=doc.get("chunk_index", 0),
-            text_snippet=doc.get("text_snippet", ""),
-            score=doc.get("score", 0.0)
-        ))
-    
-    await save_message(payload.session_id, "user", payload.query)
-    await save_message(payload.session_id, "ai", answer, citations)
+    await finish_turn(turn, answer, completed=True)
 
-    return {"answer": answer, "sources": context_docs}
+    return {"answer": answer, "sources": turn.context_docs, "error": None}
+
+def sse_event(event: str, data) -> str:
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def smart_chat_stream(payload: ChatRequest, current_user: User = Depends(get_current_user)):
+    """
+    Streaming variant of the chat endpoint (Server-Sent Events):
+    1. `sources` as soon as retrieval finishes,
+    2. `token` events as the LLM produces the answer,
+    3. `done` with the full answer once it has been saved, or `error` if generation failed.
+    The message is persisted even if the client disconnects mid-stream (marked partial).
+    """
+    turn = await prepare_turn(payload, current_user)
+
+    async def event_stream():
+        parts: List[str] = []
+        saved = False
+        try:
+            yield sse_event("sources", turn.context_docs)
+
+            if turn.cached_answer is not None:
+                parts.append(turn.cached_answer)
+                yield sse_event("token", {"text": turn.cached_answer})
+            else:
+                try:
+                    async for token in generate_answer_stream(
+                        query=turn.query,
+                        history=turn.chat_history,
+                        context_chunks=turn.context_docs
+                    ):
+                        parts.append(token)
+                        yield sse_event("token", {"text": token})
+                except GenerationError as e:
+                    # The answer so far is kept (marked partial); the error travels in its own event
+                    print(f"⚠️ Generation error mid-stream: {e}")
+                    saved = True
+                    await finish_turn(turn, "".join(parts), completed=False)
+                    yield sse_event("error", {"detail": f"{GENERATION_ERROR_PREFIX}: {e}", "partial": True})
+                    return
+
+            saved = True
+            await finish_turn(turn, "".join(parts), completed=True)
+            yield sse_event("done", {"answer": "".join(parts), "cached": turn.cached_answer is not None})
+        except Exception as e:
+            print(f"⚠️ Stream error: {e}")
+            yield sse_event("error", {"detail": str(e)})
+        finally:
+            if not saved:
+                # Client went away: keep what was generated so far, outside the cancelled request
+                run_in_background(finish_turn(turn, "".join(parts), completed=False))
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 # Session Management Endpoints
 
@@ -216,6 +383,7 @@ async def get_session_messages(
                     }
                     for cit in msg.citations
                 ],
+                "partial": msg.partial,
                 "created_at": msg.created_at.isoformat()
             }
             for msg in messages
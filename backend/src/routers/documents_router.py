@@ -1,20 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Request
 from pydantic import BaseModel
 from bson import ObjectId
-from qdrant_client import QdrantClient, models  # <--- Added 'models' for filtering
+from qdrant_client import AsyncQdrantClient, models  # <--- Added 'models' for filtering
 from models.documents import DocumentFile, SensitivityLevel
 from models.matters import Matter
+from models.auth import User, SystemRole
+from core.security import get_current_user
+from services.reindex import reindexer
 from core.encryption import AES256Service
-from rag import vectorize 
-from core.config import QDRANT_URL, QDRANT_API_KEY 
-import asyncio  
-from fastapi.concurrency import run_in_threadpool
+from rag import vectorize, answer_cache
+from rag.config import COLLECTION_NAME, QDRANT_TIMEOUT
 
 
 router = APIRouter(prefix="/documents", tags=["Secure Documents"])
 
-# --- 0. Global Qdrant Connection ---
-qdrant_client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+# --- 0. Shared Qdrant Connection (created once in the lifespan) ---
+def get_qdrant(request: Request) -> AsyncQdrantClient:
+    return request.app.state.qdrant_client
 
 # --- 1. Request Schema ---
 class DocumentUploadRequest(BaseModel):
@@ -38,7 +40,8 @@ def get_encryption_service():
 @router.post("/upload", response_model=DocumentResponse)
 async def upload_document(
     payload: DocumentUploadRequest,
-    cipher: AES256Service = Depends(get_encryption_service)
+    cipher: AES256Service = Depends(get_encryption_service),
+    qdrant_client: AsyncQdrantClient = Depends(get_qdrant)
 ):
     """
     1. Encrypts content -> MongoDB (The Vault)
@@ -75,9 +78,8 @@ async def upload_document(
     verification_msg = "Pending"
     
     try:
-        # --- THE FIX: Run blocking code in a threadpool ---
-        await run_in_threadpool(
-            vectorize, 
+        # Encoding runs in a worker thread; the upsert is awaited on the shared async client
+        await vectorize(
             content_text=payload.content, 
             metadata={
                 "mongo_document_id": str(new_doc.id),
@@ -87,17 +89,10 @@ async def upload_document(
             },
             qdrant_client=qdrant_client
         )
-        # -------------------------------------------------
-        
-        # Give Qdrant a moment
-        await asyncio.sleep(1.0) 
-
-        # The check (Async is fine here because client.scroll is fast/network bound)
-        # Note: If qdrant_client is the synchronous client, wrap this too!
-        # Assuming qdrant_client is standard sync client:
-        scroll_result, _ = await run_in_threadpool(
-            qdrant_client.scroll,
-            collection_name="legal_documents",
+
+        # The check: the upsert used wait=True, so the points are already readable
+        scroll_result, _ = await qdrant_client.scroll(
+            collection_name=COLLECTION_NAME,
             scroll_filter=models.Filter(
                 must=[
                     models.FieldCondition(
@@ -106,7 +101,9 @@ async def upload_document(
                     )
                 ]
             ),
-            limit=1
+            limit=1,
+            with_payload=False,
+            timeout=QDRANT_TIMEOUT
         )
 
         if scroll_result:
@@ -123,9 +120,51 @@ async def upload_document(
         # Check your SERVER TERMINAL for the full error if this happens!
         verification_msg = f"Failed: {str(e)}"
 
+    # D. Cached answers drawn from this matter may now be stale. Other workers drop their
+    # caches (and reload the lexical index) on the generation bump vectorize published
+    answer_cache.invalidate_matter(payload.matter_id)
+
     return DocumentResponse(
         document_id=str(new_doc.id),
         filename=new_doc.filename,
         message=f"Status: {verification_msg}",
         is_vectorized=new_doc.is_vectorized
-    )
\ No newline at end of file
+    )
+
+# --- 5. Blue/Green Re-indexing (Partners only) ---
+def require_partner(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.system_role != SystemRole.PARTNER:
+        raise HTTPException(status_code=403, detail="Partners only")
+    return current_user
+
+@router.post("/reindex", status_code=202)
+async def start_reindex(migrate_legacy: bool = False, _: User = Depends(require_partner)):
+    """
+    Rebuilds the vector store into a new versioned collection in the background,
+    then swaps the live alias onto it. Poll GET /documents/reindex for progress.
+
+    migrate_legacy=true is for pre-alias deployments only: the old concrete collection is
+    DELETED at cut-over, searches fail briefly between the delete and the alias creation,
+    and there is no rollback to it. Refused if any document failed to re-index.
+    """
+    try:
+        reindexer.start(migrate_legacy=migrate_legacy)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return reindexer.stats()
+
+@router.get("/reindex")
+async def reindex_status(_: User = Depends(require_partner)):
+    """Progress, throughput and ETA of the current (or last) re-index."""
+    return reindexer.stats()
+
+@router.post("/reindex/rollback")
+async def rollback_reindex(_: User = Depends(require_partner)):
+    """Points the live alias back at the previous collection version."""
+    if reindexer.running:
+        raise HTTPException(status_code=409, detail="A re-index is running")
+    try:
+        target = await reindexer.rollback()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"message": f"Rolled back to {target}", **reindexer.stats()}
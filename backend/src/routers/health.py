@@ -0,0 +1,74 @@
+import asyncio
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+from rag.config import get_model_status, get_qdrant_client, COLLECTION_NAME
+from rag.metrics import metrics_snapshot
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+# Dependency checks must never hang a probe
+CHECK_TIMEOUT_SECONDS = 2.0
+
+
+async def _check_mongo(request: Request) -> dict:
+    mongo_client = getattr(request.app.state, "mongo_client", None)
+    if mongo_client is None:
+        return {"ok": False, "detail": "not initialized"}
+    try:
+        await asyncio.wait_for(mongo_client.admin.command("ping"), CHECK_TIMEOUT_SECONDS)
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "detail": str(e) or type(e).__name__}
+
+
+async def _check_qdrant() -> dict:
+    try:
+        exists = await asyncio.wait_for(
+            get_qdrant_client().collection_exists(COLLECTION_NAME),
+            CHECK_TIMEOUT_SECONDS
+        )
+        if not exists:
+            return {"ok": False, "detail": f"collection '{COLLECTION_NAME}' missing"}
+        return {"ok": True}
+    except Exception as e:
+        return {"ok": False, "detail": str(e) or type(e).__name__}
+
+
+@router.get("/live")
+async def live():
+    """
+    Liveness: the process is up and the event loop is responsive.
+    Never touches dependencies, so a slow model load does not get the pod killed.
+    """
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def ready(request: Request):
+    """
+    Readiness: only 200 once the embedding model is hot and Qdrant/Mongo answer.
+    Returns 503 (with per-dependency detail) otherwise.
+    """
+    model = get_model_status()
+    mongo, qdrant = await asyncio.gather(_check_mongo(request), _check_qdrant())
+
+    checks = {
+        "model": {"ok": model["status"] == "ready", **model},
+        "qdrant": qdrant,
+        "mongo": mongo,
+    }
+    is_ready = all(check["ok"] for check in checks.values())
+
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"status": "ready" if is_ready else "not_ready", "checks": checks}
+    )
+
+
+@router.get("/metrics")
+async def metrics():
+    """
+    Counters from the RAG components (caches, batchers, ...), for sizing and dashboards.
+    """
+    return metrics_snapshot()
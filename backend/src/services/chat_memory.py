@@ -0,0 +1,176 @@
+"""
+Conversation memory for the chat endpoints.
+The prompt carries a rolling LLM summary of older turns plus the newest messages verbatim,
+within a token budget, so prompt size stays bounded however long the session grows.
+"""
+import asyncio
+from typing import List, Optional, Set
+
+from beanie import PydanticObjectId
+
+from models.chat import ChatMessage, ChatSession
+from rag.config import (
+    LLM_MODEL,
+    HISTORY_RECENT_MESSAGES,
+    HISTORY_TOKEN_BUDGET,
+    HISTORY_SUMMARY_EVERY,
+    HISTORY_SUMMARY_MAX_TOKENS,
+)
+from rag.context_packer import count_tokens, truncate_to_tokens
+from rag.llm_dispatcher import llm_dispatcher, Priority
+from rag.metrics import register_metrics
+
+
+def format_message(message: ChatMessage) -> str:
+    role_label = "User" if message.role == "user" else "Lexi"
+    suffix = " [answer interrupted]" if getattr(message, "partial", False) else ""
+    return f"{role_label}: {message.content}{suffix}"
+
+
+async def summarize_conversation(previous_summary: Optional[str], lines: List[str]) -> Optional[str]:
+    """Folds new conversation lines into the running summary. None if the LLM call fails."""
+    system_prompt = (
+        "You maintain the memory of a conversation between a lawyer and Lexi, a legal AI assistant. "
+        "Update the summary with the new messages. Keep names, matters, documents, dates, amounts "
+        "and open questions; drop greetings and filler. Answer with the updated summary only."
+    )
+    user_message = (
+        f"CURRENT SUMMARY:\n{previous_summary or '(empty)'}\n\n"
+        f"NEW MESSAGES:\n" + "\n".join(lines)
+    )
+    try:
+        response = await llm_dispatcher.create(
+            Priority.BACKGROUND,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ],
+            model=LLM_MODEL,
+            temperature=0.0,
+            max_tokens=HISTORY_SUMMARY_MAX_TOKENS
+        )
+        return response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"⚠️ Summary Error: {e}")
+        return None
+
+
+class ChatMemory:
+
+    def __init__(self, recent_messages: int, token_budget: int, summary_every: int):
+        self.recent_messages = recent_messages
+        self.token_budget = token_budget
+        self.summary_every = summary_every
+        self._refreshing: Set[str] = set()  # sessions with a summary refresh in flight
+        self._stats = {"histories": 0, "refreshes": 0, "refresh_failures": 0, "messages_summarized": 0}
+
+    async def recent_messages_for(self, session_id: PydanticObjectId, limit: int) -> List[ChatMessage]:
+        """Newest `limit` messages in chronological order ((session_id, created_at) index, walked backwards)."""
+        messages = await ChatMessage.find(
+            ChatMessage.session_id == session_id
+        ).sort("-created_at").limit(limit).to_list()
+        messages.reverse()
+        return messages
+
+    async def get_history(self, session_id: str) -> str:
+        """
+        Formatted history for the LLM: the session summary, then as many of the newest
+        messages as fit in the token budget (the newest message is truncated rather than dropped).
+
+        Every message after `summarized_until` is a candidate, not just the recent window:
+        the summary only catches up once `summary_every` messages have left the window, and
+        those messages must not fall out of the prompt in the meantime.
+        """
+        try:
+            session_obj_id = PydanticObjectId(session_id)
+            session, messages = await asyncio.gather(
+                ChatSession.get(session_obj_id),
+                self.recent_messages_for(session_obj_id, self.recent_messages + self.summary_every - 1),
+            )
+        except Exception as e:
+            print(f"⚠️ Error retrieving chat history: {e}")
+            return ""
+
+        if session and session.summarized_until is not None:
+            messages = [message for message in messages if message.created_at > session.summarized_until]
+
+        self._stats["histories"] += 1
+        budget = self.token_budget
+        summary_block = ""
+        if session and session.summary:
+            summary_block = f"Summary of earlier conversation: {session.summary}"
+            budget -= count_tokens(summary_block)
+
+        # Newest first until the budget runs out
+        recent_lines: List[str] = []
+        for message in reversed(messages):
+            line = format_message(message)
+            cost = count_tokens(line)
+            if cost > budget:
+                if not recent_lines and budget > 0:
+                    recent_lines.append(truncate_to_tokens(line, budget))
+                break
+            recent_lines.append(line)
+            budget -= cost
+        recent_lines.reverse()
+
+        return "\n".join([summary_block] + recent_lines if summary_block else recent_lines)
+
+    async def refresh_summary(self, session_id: str) -> None:
+        """
+        Folds messages that have left the recent window into the session summary,
+        once at least `summary_every` of them have accumulated. Meant to run in the background.
+        """
+        if session_id in self._refreshing:
+            return
+        self._refreshing.add(session_id)
+        try:
+            session_obj_id = PydanticObjectId(session_id)
+            session = await ChatSession.get(session_obj_id)
+            if not session:
+                return
+
+            query = ChatMessage.find(ChatMessage.session_id == session_obj_id)
+            if session.summarized_until is not None:
+                query = query.find(ChatMessage.created_at > session.summarized_until)
+            pending = await query.count() - self.recent_messages
+            if pending < self.summary_every:
+                return
+
+            older = await query.sort("+created_at").limit(pending).to_list()
+            summary = await summarize_conversation(session.summary, [format_message(m) for m in older])
+            if summary is None:
+                self._stats["refresh_failures"] += 1
+                return
+
+            # Targeted update: don't clobber a concurrent rename / updated_at bump
+            await ChatSession.find_one(ChatSession.id == session_obj_id).update({"$set": {
+                "summary": summary,
+                "summarized_until": older[-1].created_at,
+                "summarized_messages": session.summarized_messages + len(older),
+            }})
+            self._stats["refreshes"] += 1
+            self._stats["messages_summarized"] += len(older)
+            print(f"📝 Session {session_id}: summarized {len(older)} older messages.")
+        except Exception as e:
+            self._stats["refresh_failures"] += 1
+            print(f"⚠️ Error refreshing session summary: {e}")
+        finally:
+            self._refreshing.discard(session_id)
+
+    def stats(self) -> dict:
+        return {
+            **self._stats,
+            "recent_messages": self.recent_messages,
+            "token_budget": self.token_budget,
+            "summary_every": self.summary_every,
+        }
+
+
+# Global Singleton
+chat_memory = ChatMemory(
+    recent_messages=HISTORY_RECENT_MESSAGES,
+    token_budget=HISTORY_TOKEN_BUDGET,
+    summary_every=HISTORY_SUMMARY_EVERY,
+)
+register_metrics("chat_memory", chat_memory.stats)
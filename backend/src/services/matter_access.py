@@ -0,0 +1,56 @@
+"""
+Matter access for the chat endpoints.
+A user may only retrieve from the matters they are the client of or are assigned to
+(Matter.client / Matter.assigned_team). Lookups are cached briefly per user.
+
+The API never edits matters (they are managed in the database, e.g. by seeds/documents.py,
+outside this process), so there is nothing in-process to invalidate: a changed assignment
+applies once the user's entry expires, within MATTER_ACCESS_TTL_SECONDS.
+"""
+import time
+from typing import Dict, List, Optional, Tuple
+
+from models.auth import User
+from models.matters import Matter
+from rag.config import MATTER_SCOPING_ENABLED, MATTER_ACCESS_TTL_SECONDS
+from rag.metrics import register_metrics
+
+
+class MatterAccess:
+
+    def __init__(self, enabled: bool, ttl_seconds: float):
+        self.enabled = enabled
+        self.ttl_seconds = ttl_seconds
+        self._cache: Dict[str, Tuple[float, List[str]]] = {}
+        self._stats = {"lookups": 0, "hits": 0}
+
+    async def accessible_matter_ids(self, user: User) -> Optional[List[str]]:
+        """
+        Ids of the matters `user` may search, or None when matter scoping is disabled
+        (sensitivity filtering only).
+        """
+        if not self.enabled:
+            return None
+
+        key = str(user.id)
+        cached = self._cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            self._stats["hits"] += 1
+            return cached[1]
+
+        self._stats["lookups"] += 1
+        # Links are stored as DBRefs: match on their $id without fetching the linked users
+        matters = await Matter.find(
+            {"$or": [{"client.$id": user.id}, {"assigned_team.$id": user.id}]}
+        ).to_list()
+        matter_ids = sorted(str(matter.id) for matter in matters)
+        self._cache[key] = (time.monotonic(), matter_ids)
+        return matter_ids
+
+    def stats(self) -> Dict:
+        return {**self._stats, "users_cached": len(self._cache), "enabled": self.enabled}
+
+
+# Global Singleton
+matter_access = MatterAccess(enabled=MATTER_SCOPING_ENABLED, ttl_seconds=MATTER_ACCESS_TTL_SECONDS)
+register_metrics("matter_access", matter_access.stats)
@@ -0,0 +1,274 @@
+"""
+Blue/green re-indexing of the vector store.
+Builds a new versioned collection from the decrypted vault (MongoDB) with the CURRENT settings
+(chunk size, embedding backend, HNSW / storage profile, schema), throttled so live traffic keeps
+its CPU, then atomically swaps the COLLECTION_NAME alias onto it. The previous collection is
+kept for rollback.
+
+From the API: POST /documents/reindex (status: GET /documents/reindex).
+From a shell, e.g. after changing EMBEDDING_BACKEND (run with the new settings, then roll the app):
+    python -m services.reindex [--migrate-legacy] [--rollback]
+
+--migrate-legacy (pre-alias deployments only) DELETES the old concrete collection at cut-over:
+searches fail for the moment between the delete and the alias creation, and there is no
+rollback to the deleted collection. It is refused if any document failed to re-index.
+"""
+import time
+import asyncio
+import argparse
+from typing import Dict, Optional
+
+from beanie import PydanticObjectId
+
+from core.encryption import AES256Service
+from models.documents import DocumentFile
+from rag.answer_cache import answer_cache
+from rag.chunk_store import chunk_store
+from rag.collection import (
+    ensure_collection,
+    list_versions,
+    replace_collection_with_alias,
+    resolve_alias,
+    swap_alias,
+    versioned_collection_name,
+)
+from rag.config import (
+    get_qdrant_client,
+    COLLECTION_NAME,
+    LEXICAL_INDEX_PATH,
+    REINDEX_MAX_CHUNKS_PER_SECOND,
+    REINDEX_KEEP_VERSIONS,
+)
+from rag.lexical_index import BM25Index, lexical_index
+from rag.metrics import register_metrics
+from rag.reranker import reranker
+from rag.vectorizer import vectorize_and_upload
+
+# Documents read from Mongo per round trip
+PAGE_SIZE = 50
+
+
+class Reindexer:
+
+    def __init__(self, max_chunks_per_second: float, keep_versions: int):
+        self.max_chunks_per_second = max_chunks_per_second
+        self.keep_versions = keep_versions
+        self._task: Optional[asyncio.Task] = None
+        self._state: Dict = {"status": "idle"}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, migrate_legacy: bool = False) -> asyncio.Task:
+        """Starts a re-index in the background of the running app."""
+        if self.running:
+            raise RuntimeError("A re-index is already running")
+        self._task = asyncio.create_task(self.run(migrate_legacy=migrate_legacy))
+        # The outcome is recorded in the state; don't let asyncio warn about the exception
+        self._task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._task
+
+    async def run(self, migrate_legacy: bool = False) -> str:
+        """Builds the next version, swaps the alias onto it and returns its name."""
+        client = get_qdrant_client()
+        serving = await resolve_alias(client)
+        if serving is None and await client.collection_exists(COLLECTION_NAME) and not migrate_legacy:
+            raise RuntimeError(
+                f"'{COLLECTION_NAME}' is a plain collection, not an alias. Re-run with migrate_legacy "
+                "to replace it by an alias (it is deleted at swap time, so there is no rollback to it)."
+            )
+
+        target = versioned_collection_name()
+        self._state = {
+            "status": "running", "target": target, "previous": serving,
+            "docs_total": await DocumentFile.count(), "docs_done": 0, "chunks": 0, "failed": [],
+            "started_at": time.time(), "error": None,
+        }
+        print(f"🏗️ Re-indexing into '{target}' ({self._state['docs_total']} documents)...")
+
+        try:
+            await ensure_collection(client, target)
+            lexical = BM25Index()
+            cipher = AES256Service()
+            start = time.monotonic()
+
+            # Pages by _id: documents uploaded while we run are picked up by later pages,
+            # so the loop ends only once the vault has been fully caught up
+            last_id: Optional[PydanticObjectId] = None
+            async for page in self._pages(after=None):
+                for document in page:
+                    await self._index_document(document, cipher, target, lexical)
+                    await self._throttle(start)
+                last_id = page[-1].id
+                self._state["docs_total"] = max(self._state["docs_total"], self._state["docs_done"])
+                self._report()
+
+            # Cut over: vectors and lexical index together, caches keyed on old chunks dropped
+            if serving is None and await client.collection_exists(COLLECTION_NAME):
+                # Legacy migration destroys the only other copy: only over a complete rebuild
+                if self._state["failed"]:
+                    raise RuntimeError(
+                        f"{len(self._state['failed'])} documents failed to re-index; refusing to drop "
+                        f"the legacy collection '{COLLECTION_NAME}'"
+                    )
+                await replace_collection_with_alias(client, target)
+                previous = None
+            else:
+                previous = await swap_alias(client, target)
+            if LEXICAL_INDEX_PATH and previous:
+                lexical_index.save(f"{LEXICAL_INDEX_PATH}.{previous}")  # for rollback
+            lexical_index.adopt(lexical)
+            lexical_index.persist(force=True)
+            chunk_store.promote(target, retire_as=previous)
+            answer_cache.clear()
+            reranker.cache.clear()
+
+            # Catch-up: documents stored after the last page was read went only to the retired
+            # collection. Index them into the live one (point ids are deterministic, so an
+            # upload that already reached the new collection is overwritten, not duplicated).
+            async for page in self._pages(after=last_id):
+                for document in page:
+                    await self._index_document(document, cipher, COLLECTION_NAME, lexical_index)
+            lexical_index.persist(force=True)
+            chunk_store.bump_generation()  # other workers pick up the caught-up lexical index
+
+            await self._prune(client, keep={target, previous})
+            self._state.update(status="swapped", previous=previous, finished_at=time.time())
+            print(f"✅ Re-index complete: '{COLLECTION_NAME}' -> '{target}' (rollback target: {previous})")
+            return target
+        except Exception as e:
+            self._state.update(status="failed", error=str(e))
+            print(f"❌ Re-index failed ({e}); '{COLLECTION_NAME}' still serves '{serving}'.")
+            raise
+
+    @staticmethod
+    async def _pages(after: Optional[PydanticObjectId]):
+        """DocumentFile pages in _id order, starting after `after` (None = from the beginning)."""
+        last_id = after
+        while True:
+            query = DocumentFile.find() if last_id is None else DocumentFile.find(DocumentFile.id > last_id)
+            page = await query.sort("+_id").limit(PAGE_SIZE).to_list()
+            if not page:
+                return
+            yield page
+            last_id = page[-1].id
+
+    async def _index_document(self, document: DocumentFile, cipher: AES256Service, target: str, lexical: BM25Index):
+        try:
+            content = await asyncio.to_thread(cipher.decrypt_text, document.encrypted_blob)
+            self._state["chunks"] += await vectorize_and_upload(
+                content,
+                {
+                    "mongo_document_id": str(document.id),
+                    "filename": document.filename,
+                    "matter_id": str(document.matter_id),
+                    "sensitivity": getattr(document.sensitivity, "value", document.sensitivity),
+                },
+                collection_name=target,
+                lexical=lexical,
+            )
+        except Exception as e:
+            # One unreadable document must not abort the whole rebuild
+            self._state["failed"].append(str(document.id))
+            print(f"⚠️ Re-index skipped {document.id} ({document.filename}): {e}")
+        self._state["docs_done"] += 1
+
+    async def _throttle(self, start: float) -> None:
+        """Keeps the average below max_chunks_per_second; always yields to the event loop."""
+        if self.max_chunks_per_second <= 0:
+            await asyncio.sleep(0)
+            return
+        ahead = self._state["chunks"] / self.max_chunks_per_second - (time.monotonic() - start)
+        await asyncio.sleep(max(0.0, ahead))
+
+    async def _prune(self, client, keep) -> None:
+        """Deletes old versions beyond the newest `keep_versions` (never the live one or its rollback)."""
+        versions = await list_versions(client)
+        for name in versions[:-self.keep_versions] if self.keep_versions > 0 else versions:
+            if name not in keep:
+                await client.delete_collection(name)
+                chunk_store.drop_namespace(name)
+                print(f"🗑️ Dropped old collection '{name}'")
+
+    async def rollback(self) -> str:
+        """Points the alias back at the previous version. Returns the collection now serving."""
+        client = get_qdrant_client()
+        serving = await resolve_alias(client)
+        older = [name for name in await list_versions(client) if serving is None or name < serving]
+        if not older:
+            raise RuntimeError("No previous collection version to roll back to")
+        target = older[-1]
+        await swap_alias(client, target)
+
+        rollback_index = BM25Index()
+        if LEXICAL_INDEX_PATH and rollback_index.load(f"{LEXICAL_INDEX_PATH}.{target}"):
+            lexical_index.adopt(rollback_index)
+            lexical_index.persist(force=True)
+        else:
+            print("⚠️ No saved lexical index for the rollback target; lexical results may be stale.")
+        # Last: bumps the generation, other workers reload the lexical file saved above
+        chunk_store.promote(target, retire_as=serving)
+        answer_cache.clear()
+        reranker.cache.clear()
+        self._state = {"status": "rolled_back", "target": target, "previous": serving}
+        return target
+
+    def _progress(self) -> Dict:
+        state = dict(self._state)
+        if state.get("status") == "running":
+            elapsed = time.time() - state["started_at"]
+            docs_per_second = state["docs_done"] / elapsed if elapsed > 0 else 0.0
+            remaining = max(0, state["docs_total"] - state["docs_done"])
+            state.update(
+                elapsed_seconds=round(elapsed, 1),
+                docs_per_second=round(docs_per_second, 2),
+                chunks_per_second=round(state["chunks"] / elapsed, 1) if elapsed > 0 else 0.0,
+                percent=round(100.0 * state["docs_done"] / state["docs_total"], 1) if state["docs_total"] else 100.0,
+                eta_seconds=round(remaining / docs_per_second, 1) if docs_per_second else None,
+            )
+        state["failed"] = len(state.get("failed", []))
+        return state
+
+    def _report(self) -> None:
+        p = self._progress()
+        eta = f"{p['eta_seconds']:.0f}s" if p.get("eta_seconds") is not None else "?"
+        print(f"   ⏳ {p['docs_done']}/{p['docs_total']} docs ({p['percent']}%), "
+              f"{p['chunks_per_second']} chunks/s, ETA {eta}")
+
+    def stats(self) -> Dict:
+        return {**self._progress(), "max_chunks_per_second": self.max_chunks_per_second}
+
+
+# Global Singleton
+reindexer = Reindexer(max_chunks_per_second=REINDEX_MAX_CHUNKS_PER_SECOND, keep_versions=REINDEX_KEEP_VERSIONS)
+register_metrics("reindex", reindexer.stats)
+
+
+async def _main(args) -> None:
+    from core.database import init_db
+    from rag.config import create_qdrant_client, set_qdrant_client, close_qdrant_client
+
+    client = create_qdrant_client()
+    set_qdrant_client(client)
+    mongo_client = await init_db(client)
+    try:
+        if args.rollback:
+            await reindexer.rollback()
+        else:
+            if args.max_chunks_per_second is not None:
+                reindexer.max_chunks_per_second = args.max_chunks_per_second
+            await reindexer.run(migrate_legacy=args.migrate_legacy)
+    finally:
+        await close_qdrant_client()
+        mongo_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blue/green re-index of the vector store")
+    parser.add_argument("--migrate-legacy", action="store_true",
+                        help="Replace a pre-alias concrete collection named COLLECTION_NAME. "
+                             "DELETES it at cut-over (brief search outage, no rollback to it)")
+    parser.add_argument("--rollback", action="store_true", help="Point the alias back at the previous version")
+    parser.add_argument("--max-chunks-per-second", type=float, default=None)
+    asyncio.run(_main(parser.parse_args()))
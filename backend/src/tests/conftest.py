@@ -0,0 +1,19 @@
+"""
+Test configuration.
+Runs from backend/src (python -m pytest tests) with no Mongo, Qdrant or Groq behind it:
+embedded Qdrant, the hashing embedding backend and an in-memory chunk store.
+Variables already set in the environment win.
+"""
+import os
+import sys
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SRC not in sys.path:
+    sys.path.insert(0, SRC)
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017")
+os.environ.setdefault("QDRANT_MODE", "memory")
+os.environ.setdefault("EMBEDDING_BACKEND", "hashing")
+os.environ.setdefault("CHUNK_STORE_PATH", ":memory:")
+os.environ.setdefault("LEXICAL_INDEX_PATH", "")
+os.environ.setdefault("Encryption_Key", "ab" * 32)
@@ -0,0 +1,52 @@
+from rag.answer_cache import SemanticAnswerCache, cited_document_ids, permission_scope
+
+SCOPE = permission_scope(["public", "internal"], ["m1"])
+
+
+def make_cache(**overrides) -> SemanticAnswerCache:
+    settings = dict(enabled=True, threshold=0.95, max_entries=10, ttl_seconds=60)
+    settings.update(overrides)
+    return SemanticAnswerCache(**settings)
+
+
+def source(doc: str, matter: str = "m1") -> dict:
+    return {"mongo_document_id": doc, "matter_id": matter, "sensitivity": "internal", "chunk_index": 0}
+
+
+def test_similar_question_in_the_same_scope_hits():
+    cache = make_cache()
+    cache.store("rent?", [1.0, 0.0], SCOPE, "1000 a month", [source("lease-a")])
+    assert cache.lookup([0.99, 0.01], SCOPE).answer == "1000 a month"
+    assert cache.lookup([0.0, 1.0], SCOPE) is None
+
+
+def test_answers_never_cross_scopes():
+    cache = make_cache()
+    cache.store("rent?", [1.0, 0.0], SCOPE, "1000 a month", [source("lease-a")])
+    assert cache.lookup([1.0, 0.0], permission_scope(["public", "internal"], ["m2"])) is None
+
+
+def test_lookup_with_documents_requires_the_same_cited_set():
+    cache = make_cache()
+    cache.store("rent?", [1.0, 0.0], SCOPE, "lease A rent", [source("lease-a")])
+    cache.store("rent?", [1.0, 0.0], SCOPE, "lease B rent", [source("lease-b")])
+    assert cache.lookup([1.0, 0.0], SCOPE, cited_document_ids([source("lease-b")])).answer == "lease B rent"
+    assert cache.lookup([1.0, 0.0], SCOPE, cited_document_ids([source("lease-c")])) is None
+    assert cache.lookup([1.0, 0.0], SCOPE, cited_document_ids([source("lease-a"), source("lease-b")])) is None
+
+
+def test_validated_hits_only_count_the_generation_as_saved():
+    cache = make_cache()
+    cache.store("rent?", [1.0, 0.0], SCOPE, "lease A rent", [source("lease-a")])
+    cache.lookup([1.0, 0.0], SCOPE)
+    cache.lookup([1.0, 0.0], SCOPE, cited_document_ids([source("lease-a")]))
+    assert cache.stats()["saved_llm_calls"] == 4
+
+
+def test_invalidation_by_document_and_matter():
+    cache = make_cache()
+    cache.store("rent?", [1.0, 0.0], SCOPE, "lease A rent", [source("lease-a")])
+    cache.store("term?", [0.0, 1.0], SCOPE, "two years", [source("lease-b", matter="m2")])
+    assert cache.invalidate_document("lease-a") == 1
+    assert cache.invalidate_matter("m2") == 1
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import routers.chat as chat
+from models.auth import SystemRole
+from routers.chat import ChatTurn, is_cacheable
+
+
+def make_turn(**overrides) -> ChatTurn:
+    settings = dict(
+        query="What is the notice period?",
+        session_id="s1",
+        scope=frozenset({"public"}),
+        matter_ids=None,
+        query_vector=[1.0, 0.0],
+        standalone_query="What is the notice period?",
+        context_docs=[{"mongo_document_id": "d1", "chunk_index": 0}],
+    )
+    settings.update(overrides)
+    return ChatTurn(**settings)
+
+
+@pytest.fixture
+def similarity(monkeypatch):
+    """Stubs the embedding comparison used for rewritten queries."""
+    value = {"score": 1.0}
+
+    async def query_similarity(query_vector, text):
+        return value["score"]
+
+    monkeypatch.setattr(chat, "query_similarity", query_similarity)
+    return value
+
+
+def test_complete_grounded_standalone_answer_is_cacheable(similarity):
+    assert asyncio.run(is_cacheable(make_turn(), completed=True))
+
+
+def test_interrupted_answer_is_not_cacheable(similarity):
+    assert not asyncio.run(is_cacheable(make_turn(), completed=False))
+
+
+def test_answer_served_from_cache_is_not_cached_again(similarity):
+    assert not asyncio.run(is_cacheable(make_turn(cached_answer="cached"), completed=True))
+
+
+def test_answer_without_documents_is_not_cacheable(similarity):
+    assert not asyncio.run(is_cacheable(make_turn(context_docs=[]), completed=True))
+
+
+def test_follow_up_that_needed_the_history_is_not_cacheable(similarity):
+    turn = make_turn(query="And his address?", standalone_query="What is John Doe's address?")
+    similarity["score"] = 0.2
+    assert not asyncio.run(is_cacheable(turn, completed=True))
+    similarity["score"] = 0.99
+    assert asyncio.run(is_cacheable(turn, completed=True))
+
+
+@pytest.fixture
+def pipeline(monkeypatch, similarity):
+    """Replaces everything prepare_turn talks to; returns its knobs and a scratch cache."""
+    from rag.answer_cache import SemanticAnswerCache
+    state = {"history": "", "docs": [], "rewrite": None, "plans": 0}
+    cache = SemanticAnswerCache(enabled=True, threshold=0.95, max_entries=10, ttl_seconds=60)
+
+    async def accessible_matter_ids(user):
+        return None
+
+    async def encode_query(query):
+        return {"dense": [1.0, 0.0]}
+
+    async def get_history(session_id):
+        return state["history"]
+
+    async def sync_serving_generation():
+        return None
+
+    async def plan_and_retrieve(history, query, user_role, query_vector, top_k, matter_ids):
+        state["plans"] += 1
+        return SimpleNamespace(needs_search=True), state["rewrite"] or query, list(state["docs"])
+
+    monkeypatch.setattr(chat.matter_access, "accessible_matter_ids", accessible_matter_ids)
+    monkeypatch.setattr(chat, "encode_query", encode_query)
+    monkeypatch.setattr(chat.chat_memory, "get_history", get_history)
+    monkeypatch.setattr(chat, "sync_serving_generation", sync_serving_generation)
+    monkeypatch.setattr(chat.speculative_retriever, "plan_and_retrieve", plan_and_retrieve)
+    monkeypatch.setattr(chat, "answer_cache", cache)
+    return state, cache
+
+
+def ask(query: str):
+    user = SimpleNamespace(system_role=SystemRole.PARTNER)
+    return asyncio.run(chat.prepare_turn(chat.ChatRequest(query=query, session_id="s1"), user))
+
+
+def lease(doc: str) -> dict:
+    return {"mongo_document_id": doc, "matter_id": "m1", "sensitivity": "public", "chunk_index": 0}
+
+
+def test_first_turn_is_served_from_the_cache_before_routing(pipeline):
+    state, cache = pipeline
+    scope = ask("What is the monthly rent?").scope
+    cache.store("What is the monthly rent?", [1.0, 0.0], scope, "Lease A: 1000", [lease("lease-a")])
+
+    turn = ask("What is the monthly rent?")
+    assert turn.cached_answer == "Lease A: 1000"
+    assert state["plans"] == 1  # only the first (uncached) ask was routed
+
+
+def test_follow_up_is_not_served_another_documents_answer(pipeline):
+    state, cache = pipeline
+    scope = ask("What is the monthly rent?").scope
+    cache.store("What is the monthly rent?", [1.0, 0.0], scope, "Lease A: 1000", [lease("lease-a")])
+
+    # Mid-conversation about lease B: routed and retrieved first, and lease A's answer does not fit
+    state["history"] = "user: Tell me about lease B"
+    state["docs"] = [lease("lease-b")]
+    turn = ask("What is the monthly rent?")
+    assert turn.cached_answer is None
+    assert turn.context_docs == [lease("lease-b")]
+
+
+def test_follow_up_reuses_an_answer_from_the_same_documents(pipeline):
+    state, cache = pipeline
+    scope = ask("What is the monthly rent?").scope
+    cache.store("What is the monthly rent?", [1.0, 0.0], scope, "Lease B: 2000", [lease("lease-b")])
+
+    state["history"] = "user: Tell me about lease B"
+    state["docs"] = [lease("lease-b")]
+    assert ask("What is the monthly rent?").cached_answer == "Lease B: 2000"
+
+
+def test_follow_up_that_needed_the_history_never_hits(pipeline, similarity):
+    state, cache = pipeline
+    scope = ask("What is the monthly rent?").scope
+    cache.store("What is the monthly rent?", [1.0, 0.0], scope, "Lease B: 2000", [lease("lease-b")])
+
+    state["history"] = "user: Tell me about lease B"
+    state["docs"] = [lease("lease-b")]
+    state["rewrite"] = "What is the monthly rent under lease B?"
+    similarity["score"] = 0.2  # the rewrite changed the meaning
+    assert ask("What is the monthly rent?").cached_answer is None
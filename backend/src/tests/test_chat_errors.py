@@ -0,0 +1,32 @@
+import asyncio
+
+import routers.chat as chat
+from rag import GENERATION_ERROR_PREFIX, GenerationError
+from routers.chat import ChatRequest, ChatTurn
+
+
+def test_generation_error_is_reported_separately_from_the_answer(monkeypatch):
+    saved = []
+    turn = ChatTurn(
+        query="What is the rent?", session_id="s1", scope=frozenset({"public"}), matter_ids=None,
+        query_vector=[1.0, 0.0], context_docs=[{"mongo_document_id": "d1", "chunk_index": 0}],
+    )
+
+    async def prepare_turn(payload, user):
+        return turn
+
+    async def generate_answer(**kwargs):
+        raise GenerationError("rate limited")
+
+    async def finish_turn(turn, answer, completed):
+        saved.append((answer, completed))
+
+    monkeypatch.setattr(chat, "prepare_turn", prepare_turn)
+    monkeypatch.setattr(chat, "generate_answer", generate_answer)
+    monkeypatch.setattr(chat, "finish_turn", finish_turn)
+
+    response = asyncio.run(chat.smart_chat(ChatRequest(query=turn.query, session_id="s1"), current_user=None))
+    assert response["answer"] == ""
+    assert response["error"] == f"{GENERATION_ERROR_PREFIX}: rate limited"
+    # Saved empty and partial: the error text never reaches the history
+    assert saved == [("", False)]
@@ -0,0 +1,61 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import services.chat_memory as memory
+from services.chat_memory import ChatMemory
+
+SESSION_ID = "65f000000000000000000001"
+START = datetime(2026, 1, 1, 9, 0)
+
+
+def message(i: int) -> SimpleNamespace:
+    role = "user" if i % 2 == 0 else "ai"
+    return SimpleNamespace(role=role, content=f"message {i}", created_at=START + timedelta(minutes=i), partial=False)
+
+
+@pytest.fixture
+def session_with(monkeypatch):
+    """Installs a fake session with `count` messages, the first `summarized` of them summarized."""
+    def install(count: int, summarized: int) -> ChatMemory:
+        messages = [message(i) for i in range(count)]
+        session = SimpleNamespace(
+            summary="earlier talk" if summarized else None,
+            summarized_until=messages[summarized - 1].created_at if summarized else None,
+        )
+
+        async def get(session_id):
+            return session
+
+        async def recent_messages_for(self, session_id, limit):
+            return messages[-limit:]
+
+        monkeypatch.setattr(memory, "ChatSession", SimpleNamespace(get=get))
+        monkeypatch.setattr(ChatMemory, "recent_messages_for", recent_messages_for)
+        return ChatMemory(recent_messages=2, token_budget=10_000, summary_every=3)
+    return install
+
+
+def lines(history: str) -> list:
+    return history.splitlines()
+
+
+def test_messages_awaiting_a_summary_stay_in_the_prompt(session_with):
+    # m0-m1 summarized; m2-m3 left the recent window but are not summarized yet
+    history = asyncio.run(session_with(count=6, summarized=2).get_history(SESSION_ID))
+    assert lines(history) == [
+        "Summary of earlier conversation: earlier talk",
+        "User: message 2", "Lexi: message 3", "User: message 4", "Lexi: message 5",
+    ]
+
+
+def test_summarized_messages_are_not_repeated(session_with):
+    history = asyncio.run(session_with(count=5, summarized=3).get_history(SESSION_ID))
+    assert lines(history)[1:] == ["Lexi: message 3", "User: message 4"]
+
+
+def test_new_session_uses_every_message(session_with):
+    history = asyncio.run(session_with(count=3, summarized=0).get_history(SESSION_ID))
+    assert lines(history) == ["User: message 0", "Lexi: message 1", "User: message 2"]
@@ -0,0 +1,107 @@
+import pytest
+
+from rag.chunk_store import ChunkStore
+from rag.config import COLLECTION_NAME
+
+
+@pytest.fixture(params=[False, True], ids=["plain", "encrypted"])
+def store(request, tmp_path):
+    chunk_store = ChunkStore(str(tmp_path / "chunks.db"), encrypted=request.param, cache_entries=100)
+    yield chunk_store
+    chunk_store.close()
+
+
+def meta(doc: str) -> dict:
+    return {"mongo_document_id": doc, "filename": f"{doc}.pdf"}
+
+
+def test_get_many_returns_stored_chunks_and_skips_missing(store):
+    store.put_document(meta("d1"), ["first chunk", "second chunk"])
+    found = store.get_many([("d1", 1), ("d1", 0), ("d1", 7), ("other", 0)])
+    assert found == {
+        ("d1", 0): {"filename": "d1.pdf", "text_snippet": "first chunk"},
+        ("d1", 1): {"filename": "d1.pdf", "text_snippet": "second chunk"},
+    }
+    assert store.stats()["missing"] == 2
+
+
+def test_get_many_serves_repeats_from_the_hot_cache(store):
+    store.put_document(meta("d1"), ["text"])
+    store.get_many([("d1", 0)])
+    store.get_many([("d1", 0)])
+    assert store.stats()["cache_hits"] == 1
+
+
+def test_get_many_handles_more_keys_than_one_batch(store):
+    store.put_document(meta("big"), [f"chunk {i}" for i in range(1000)])
+    found = store.get_many(("big", i) for i in range(1000))
+    assert len(found) == 1000
+    assert found[("big", 999)]["text_snippet"] == "chunk 999"
+
+
+def test_put_document_replaces_the_previous_version(store):
+    store.put_document(meta("d1"), ["old 0", "old 1"])
+    store.get_many([("d1", 0)])
+    store.put_document(meta("d1"), ["new 0"])
+    assert store.get_many([("d1", 0), ("d1", 1)]) == {("d1", 0): {"filename": "d1.pdf", "text_snippet": "new 0"}}
+
+
+def test_text_is_encrypted_at_rest(tmp_path):
+    path = str(tmp_path / "sealed.db")
+    store = ChunkStore(path, encrypted=True, cache_entries=10)
+    store.put_document(meta("d1"), ["privileged advice"])
+    store.close()
+    with open(path, "rb") as handle:
+        assert b"privileged advice" not in handle.read()
+
+
+def test_promote_swaps_namespaces_and_keeps_a_rollback_copy(store):
+    store.put_document(meta("d1"), ["live text"])
+    store.put_document(meta("d1"), ["next text"], namespace="next")
+    assert store.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "live text"
+
+    store.promote("next", retire_as="previous")
+    assert store.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "next text"
+
+    # Rolling back is a promote in the other direction
+    store.promote("previous", retire_as="next")
+    assert store.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "live text"
+
+
+def test_promote_without_retire_drops_the_live_rows(store):
+    store.put_document(meta("old"), ["old text"])
+    store.put_document(meta("new"), ["new text"], namespace="next")
+    store.promote("next", retire_as=None)
+    assert set(store.get_many([("old", 0), ("new", 0)])) == {("new", 0)}
+
+
+def test_generation_change_is_seen_once_by_other_processes(tmp_path):
+    path = str(tmp_path / "shared.db")
+    writer = ChunkStore(path, encrypted=False, cache_entries=10)
+    reader = ChunkStore(path, encrypted=False, cache_entries=10)
+    try:
+        writer.put_document(meta("d1"), ["before"])
+        assert reader.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "before"
+        assert not reader.generation_changed()
+
+        writer.put_document(meta("d1"), ["after"], namespace="next")
+        writer.promote("next", retire_as=None)
+        assert not writer.generation_changed()
+
+        assert reader.generation_changed()
+        assert not reader.generation_changed()
+        # The stale hot cache went with it
+        assert reader.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "after"
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_drop_namespace_only_touches_that_namespace(store):
+    store.put_document(meta("d1"), ["live"])
+    store.put_document(meta("d1"), ["staged"], namespace="next")
+    store.drop_namespace("next")
+    store.promote("next", retire_as=None)
+    assert store.get_many([("d1", 0)]) == {}
+    store.put_document(meta("d1"), ["again"], namespace=COLLECTION_NAME)
+    assert store.get_many([("d1", 0)])[("d1", 0)]["text_snippet"] == "again"
@@ -0,0 +1,43 @@
+import pytest
+
+from rag.fusion import RRF_K, chunk_key, rrf_fuse
+
+
+def hit(doc: str, index: int, **extra) -> dict:
+    return {"mongo_document_id": doc, "chunk_index": index, **extra}
+
+
+def test_chunk_key_identifies_document_and_position():
+    assert chunk_key(hit("d1", 3, score=0.9)) == ("d1", 3)
+    assert chunk_key({}) == ("unknown", 0)
+
+
+def test_chunks_found_by_several_lists_rank_first():
+    dense = [hit("a", 0), hit("b", 0), hit("c", 0)]
+    lexical = [hit("b", 0), hit("c", 0)]
+    fused = rrf_fuse([dense, lexical], top_k=3)
+    assert [chunk_key(result) for result in fused] == [("b", 0), ("c", 0), ("a", 0)]
+
+
+def test_fused_score_is_the_sum_of_reciprocal_ranks():
+    fused = rrf_fuse([[hit("a", 0)], [hit("b", 0), hit("a", 0)]], top_k=2)
+    scores = {chunk_key(result): result["score"] for result in fused}
+    assert scores[("a", 0)] == pytest.approx(1 / (RRF_K + 1) + 1 / (RRF_K + 2))
+    assert scores[("b", 0)] == pytest.approx(1 / (RRF_K + 1))
+
+
+def test_first_occurrence_provides_the_payload():
+    fused = rrf_fuse([[hit("a", 0, source="dense", score=0.8)], [hit("a", 0, source="lexical", score=12.0)]], top_k=1)
+    assert fused[0]["source"] == "dense"
+    assert fused[0]["score"] == pytest.approx(2 / (RRF_K + 1))
+
+
+def test_chunks_of_one_document_stay_distinct():
+    fused = rrf_fuse([[hit("a", 0), hit("a", 1)]], top_k=5)
+    assert [chunk_key(result) for result in fused] == [("a", 0), ("a", 1)]
+
+
+def test_top_k_and_empty_input():
+    assert len(rrf_fuse([[hit("a", i) for i in range(10)]], top_k=4)) == 4
+    assert rrf_fuse([], top_k=5) == []
+    assert rrf_fuse([[], []], top_k=5) == []
@@ -0,0 +1,69 @@
+import pytest
+
+import rag.generation as generation
+from rag.answer_cache import SemanticAnswerCache, permission_scope
+from rag.chunk_store import ChunkStore
+from rag.lexical_index import BM25Index
+
+ALL = ["public", "internal", "confidential"]
+SCOPE = permission_scope(ALL)
+
+
+def meta(doc: str) -> dict:
+    return {"mongo_document_id": doc, "matter_id": "m1", "sensitivity": "internal"}
+
+
+@pytest.fixture
+def workers(monkeypatch, tmp_path):
+    """This worker's generation module state, plus a second store standing in for another worker."""
+    store_path = str(tmp_path / "chunks.db")
+    index_path = str(tmp_path / "lexical.idx")
+    local = ChunkStore(store_path, encrypted=False, cache_entries=10)
+    other = ChunkStore(store_path, encrypted=False, cache_entries=10)
+    cache = SemanticAnswerCache(enabled=True, threshold=0.95, max_entries=10, ttl_seconds=60)
+    index = BM25Index()
+
+    monkeypatch.setattr(generation, "chunk_store", local)
+    monkeypatch.setattr(generation, "lexical_index", index)
+    monkeypatch.setattr(generation, "answer_cache", cache)
+    monkeypatch.setattr(generation, "CHUNK_STORE_PATH", store_path)
+    monkeypatch.setattr(generation, "LEXICAL_INDEX_PATH", index_path)
+    local.generation_changed()  # this worker has seen the starting generation
+    yield local, other, index, cache, index_path
+    local.close()
+    other.close()
+
+
+def other_worker_uploads(other: ChunkStore, index_path: str, doc: str, text: str) -> None:
+    index = BM25Index()
+    index.load(index_path)
+    index.add_chunks(meta(doc), [text])
+    index.save(index_path)
+    other.bump_generation()
+
+
+def test_an_upload_elsewhere_reloads_the_index_and_drops_cached_answers(workers):
+    local, other, index, cache, index_path = workers
+    cache.store("rent?", [1.0, 0.0], SCOPE, "old answer", [{"mongo_document_id": "a", "sensitivity": "internal"}])
+    BM25Index().save(index_path)
+
+    other_worker_uploads(other, index_path, "lease", "tenant pays rent")
+    assert generation._catch_up()
+    assert [r["mongo_document_id"] for r in index.search("rent", ALL)] == ["lease"]
+    assert cache.stats()["entries"] == 0
+    assert not generation._catch_up()
+
+
+def test_publish_builds_on_changes_published_elsewhere(workers):
+    local, other, index, cache, index_path = workers
+    BM25Index().save(index_path)
+    other_worker_uploads(other, index_path, "lease", "tenant pays rent")
+
+    # This worker has not caught up yet: its upload must not overwrite the other one
+    generation.publish_change(lambda: index.add_chunks(meta("memo"), ["rent review memo"]))
+
+    saved = BM25Index()
+    saved.load(index_path)
+    assert {r["mongo_document_id"] for r in saved.search("rent", ALL)} == {"lease", "memo"}
+    assert other.generation_changed()
+    assert not local.generation_changed()  # a worker does not reload its own change
@@ -0,0 +1,91 @@
+from rag.lexical_index import BM25Index
+
+ALL = ["public", "internal", "confidential"]
+
+
+def meta(doc: str, matter: str = "m1", sensitivity: str = "internal") -> dict:
+    return {"mongo_document_id": doc, "matter_id": matter, "sensitivity": sensitivity, "filename": f"{doc}.pdf"}
+
+
+def docs(results) -> list:
+    return [(r["mongo_document_id"], r["chunk_index"]) for r in results]
+
+
+def build() -> BM25Index:
+    index = BM25Index()
+    index.add_chunks(meta("lease"), ["The tenant pays rent monthly.", "Termination requires notice."])
+    index.add_chunks(meta("nda", sensitivity="confidential"), ["Confidential information stays secret."])
+    index.add_chunks(meta("memo", matter="m2"), ["Rent review clause for the tenant."])
+    return index
+
+
+def test_search_ranks_matching_chunks():
+    results = build().search("tenant rent", ALL, top_k=5)
+    assert set(docs(results)) == {("lease", 0), ("memo", 0)}
+    assert results[0]["score"] >= results[1]["score"] > 0
+
+
+def test_results_carry_only_ids_and_filter_keys():
+    result = build().search("termination notice", ALL)[0]
+    assert set(result) == {"mongo_document_id", "matter_id", "chunk_index", "sensitivity", "score"}
+
+
+def test_search_applies_sensitivity_and_matter_filters():
+    index = build()
+    assert index.search("confidential secret", ["public", "internal"]) == []
+    assert docs(index.search("tenant rent", ALL, matter_ids=["m2"])) == [("memo", 0)]
+    assert index.search("tenant rent", ALL, matter_ids=[]) == []
+
+
+def test_remove_document_tombstones_its_chunks():
+    index = build()
+    assert index.remove_document("lease") == 2
+    assert docs(index.search("tenant rent", ALL)) == [("memo", 0)]
+    assert index.search("termination", ALL) == []
+    assert index.remove_document("lease") == 0
+
+
+def test_re_adding_a_document_replaces_it():
+    index = build()
+    index.add_chunks(meta("lease"), ["Only the deposit is mentioned now."])
+    assert index.search("termination", ALL) == []
+    assert docs(index.search("deposit", ALL)) == [("lease", 0)]
+    assert index.stats()["chunks"] == 3
+
+
+def test_compact_drops_tombstones_and_keeps_search_results():
+    index = build()
+    index.add_chunks(meta("extra"), ["Tenant rent arrears schedule."])
+    index.remove_document("nda")
+    expected = docs(index.search("tenant rent", ALL))
+    assert index.stats()["tombstoned"] == 1
+
+    index.compact()
+    assert index.stats()["tombstoned"] == 0
+    assert docs(index.search("tenant rent", ALL)) == expected
+    # Renumbered chunks can still be removed
+    assert index.remove_document("extra") == 1
+    assert ("extra", 0) not in docs(index.search("tenant rent", ALL))
+
+
+def test_removing_a_quarter_of_the_index_compacts_automatically():
+    index = BM25Index()
+    for i in range(4):
+        index.add_chunks(meta(f"d{i}"), [f"clause number {i} about rent"])
+    index.remove_document("d0")
+    assert index.stats()["tombstoned"] == 1
+    index.remove_document("d1")
+    assert index.stats()["tombstoned"] == 0
+    assert set(docs(index.search("rent", ALL))) == {("d2", 0), ("d3", 0)}
+
+
+def test_save_and_load_round_trip_without_plaintext(tmp_path):
+    index = build()
+    path = str(tmp_path / "lexical.idx")
+    index.save(path)
+    with open(path, "rb") as handle:
+        assert b"tenant" not in handle.read()
+
+    restored = BM25Index()
+    assert restored.load(path)
+    assert docs(restored.search("tenant rent", ALL)) == docs(index.search("tenant rent", ALL))
@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from rag.llm_dispatcher import LLMDispatcher, Priority, TokenBucket
+
+
+def make_dispatcher(**overrides) -> LLMDispatcher:
+    settings = dict(
+        max_concurrency=1,
+        requests_per_minute=0,
+        tokens_per_minute=0,
+        max_retries=0,
+        backoff_base=0.01,
+        backoff_max=0.01,
+    )
+    settings.update(overrides)
+    return LLMDispatcher(**settings)
+
+
+def test_unlimited_bucket_never_waits():
+    bucket = TokenBucket(0)
+    bucket.take(10_000)
+    assert bucket.wait_time(10_000) == 0.0
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one unit per second
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0, abs=0.05)
+    assert bucket.wait_time(30) == pytest.approx(30.0, abs=0.05)
+
+
+def test_oversized_request_is_capped_at_capacity():
+    bucket = TokenBucket(100)
+    assert bucket.wait_time(1_000) == 0.0
+    bucket.take(1_000)
+    assert bucket.level == pytest.approx(0.0, abs=0.01)
+
+
+def test_give_back_refunds_but_never_overfills():
+    bucket = TokenBucket(100)
+    bucket.take(80)
+    bucket.give_back(30)
+    assert bucket.level == pytest.approx(50.0, abs=0.01)
+    bucket.give_back(500)
+    assert bucket.level == 100.0
+
+
+def test_priority_order_ranks_generation_first():
+    assert Priority.GENERATION < Priority.ROUTING < Priority.BACKGROUND
+
+
+def test_queued_calls_are_granted_by_priority_then_arrival():
+    async def scenario():
+        dispatcher = make_dispatcher()
+        order = []
+
+        async def call(name, priority):
+            async with dispatcher.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0)
+
+        # Hold the only slot so everything else queues up
+        async with dispatcher.slot(Priority.GENERATION):
+            tasks = [
+                asyncio.create_task(call("background", Priority.BACKGROUND)),
+                asyncio.create_task(call("routing-1", Priority.ROUTING)),
+                asyncio.create_task(call("generation", Priority.GENERATION)),
+                asyncio.create_task(call("routing-2", Priority.ROUTING)),
+            ]
+            await asyncio.sleep(0.01)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["generation", "routing-1", "routing-2", "background"]
+
+
+def test_cancelled_waiter_does_not_leak_its_slot():
+    async def scenario():
+        dispatcher = make_dispatcher()
+        async with dispatcher.slot(Priority.GENERATION):
+            waiter = asyncio.create_task(dispatcher._acquire(Priority.ROUTING, 1))
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+        async with dispatcher.slot(Priority.BACKGROUND):
+            return dispatcher._active
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_throttled_calls_wait_for_the_request_bucket():
+    async def scenario():
+        dispatcher = make_dispatcher(max_concurrency=4, requests_per_minute=60)
+        dispatcher._requests.level = 1.0
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        granted = []
+
+        async def call():
+            async with dispatcher.slot(Priority.ROUTING, tokens=1):
+                granted.append(loop.time() - start)
+
+        await asyncio.gather(call(), call())
+        return granted, dispatcher.stats()
+
+    granted, stats = asyncio.run(scenario())
+    assert granted[0] < 0.5
+    assert granted[1] >= 0.9
+    assert stats["throttled"] >= 1
@@ -0,0 +1,53 @@
+from rag.prerouter import PreRouter, is_acknowledgement, rule_decision
+
+
+def make_prerouter() -> PreRouter:
+    return PreRouter(enabled=True, low=0.2, high=0.8)
+
+
+def test_greetings_and_thanks_skip_search():
+    for query in ["hello", "Thanks a lot!", "good morning lexi", "ok"]:
+        assert rule_decision(query) == (False, 0.99)
+
+
+def test_obvious_fact_questions_search():
+    assert rule_decision("What is the monthly rent for the lease?") == (True, 0.95)
+
+
+def test_bare_yes_and_no_are_not_chitchat():
+    assert rule_decision("yes") is None
+    assert rule_decision("No.") is None
+
+
+def test_acknowledgements():
+    assert is_acknowledgement("Yes please")
+    assert is_acknowledgement("go ahead!")
+    assert not is_acknowledgement("yes, what is the rent?")
+
+
+def test_acknowledgement_mid_conversation_goes_to_the_llm():
+    prerouter = make_prerouter()
+    history = "ai: Shall I look up the indemnity clause?"
+    assert prerouter.decide("yes", history=history) is None
+    assert prerouter.decide("ok", history=history) is None
+
+
+def test_acknowledgement_without_history_is_decided_locally():
+    decision = make_prerouter().decide("ok")
+    assert decision is not None
+    assert not decision.needs_search
+    assert decision.stage == "rules"
+
+
+def test_history_does_not_change_other_rule_decisions():
+    prerouter = make_prerouter()
+    decision = prerouter.decide("thanks!", history="ai: The rent is 1000.")
+    assert decision is not None and not decision.needs_search
+
+
+def test_acknowledgement_verdicts_do_not_train_the_classifier():
+    prerouter = make_prerouter()
+    prerouter._seed = (None, None)
+    prerouter.observe("yes", [0.0, 1.0], needs_search=True)
+    prerouter.observe("what is the notice period?", [1.0, 0.0], needs_search=True)
+    assert len(prerouter._feedback) == 1
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import numpy as np
+
+from rag.reranker import ColbertReranker
+
+
+def make_reranker(monkeypatch, encode_seconds: float, **overrides) -> ColbertReranker:
+    settings = dict(enabled=True, budget_ms=20, max_inflight=2, cache_max_bytes=1 << 20)
+    settings.update(overrides)
+    reranker = ColbertReranker(**settings)
+    calls = []
+
+    def score(query, candidates):
+        calls.append(query)
+        time.sleep(encode_seconds)
+        return np.arange(len(candidates), dtype=np.float32)
+
+    monkeypatch.setattr(reranker, "_score", score)
+    reranker.calls = calls
+    return reranker
+
+
+def candidates(n: int = 3) -> list:
+    return [{"mongo_document_id": f"d{i}", "chunk_index": 0, "score": 1.0 - i / 10} for i in range(n)]
+
+
+def test_fast_rerank_reorders_by_score(monkeypatch):
+    reranker = make_reranker(monkeypatch, encode_seconds=0.0, budget_ms=1000)
+    ranked = asyncio.run(reranker.rerank("q", candidates(), top_k=2))
+    assert [c["mongo_document_id"] for c in ranked] == ["d2", "d1"]
+    assert ranked[0]["retrieval_score"] == 0.8
+    assert reranker.stats()["inflight"] == 0
+
+
+def test_abandoned_encode_still_counts_as_inflight(monkeypatch):
+    reranker = make_reranker(monkeypatch, encode_seconds=0.3, max_inflight=1)
+
+    async def scenario():
+        first = await reranker.rerank("slow", candidates(), top_k=3)
+        # The first encode is still running: the next caller is bypassed, not queued behind it
+        second = await reranker.rerank("next", candidates(), top_k=3)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == candidates()
+    assert second == candidates()
+    stats = reranker.stats()
+    assert stats["budget_exceeded"] == 1
+    assert stats["bypassed_load"] == 1
+    time.sleep(0.4)
+    assert reranker.stats()["inflight"] == 0
+
+
+def test_timed_out_queued_encodes_are_dropped(monkeypatch):
+    reranker = make_reranker(monkeypatch, encode_seconds=0.2, max_inflight=10)
+
+    async def scenario():
+        for i in range(5):
+            await reranker.rerank(f"q{i}", candidates(), top_k=3)
+
+    asyncio.run(scenario())
+    # Only the encode already running keeps the slot; the queued ones were cancelled
+    assert reranker.stats()["inflight"] <= 1
+    time.sleep(0.3)
+    assert reranker.stats()["inflight"] == 0
+    assert len(reranker.calls) < 5
@@ -0,0 +1,85 @@
+import numpy as np
+
+from rag.selection import VECTOR_FIELD, ResultSelector, adaptive_cutoff, mmr
+
+
+def make_selector(**overrides) -> ResultSelector:
+    settings = dict(enabled=True, lambda_=0.7, score_gap=0.15, min_relevance=0.0, duplicate_similarity=0.95)
+    settings.update(overrides)
+    return ResultSelector(**settings)
+
+
+def test_cutoff_stops_at_the_first_cliff():
+    relevance = np.array([0.9, 0.85, 0.8, 0.4, 0.38])
+    assert adaptive_cutoff(relevance, score_gap=0.15, min_relevance=0.0) == 3
+
+
+def test_cutoff_ignores_input_order():
+    relevance = np.array([0.4, 0.9, 0.38, 0.85, 0.8])
+    assert adaptive_cutoff(relevance, score_gap=0.15, min_relevance=0.0) == 3
+
+
+def test_cutoff_applies_the_absolute_floor():
+    relevance = np.array([0.9, 0.8, 0.7, 0.6])
+    assert adaptive_cutoff(relevance, score_gap=0.0, min_relevance=0.75) == 2
+
+
+def test_cutoff_keeps_a_minimum():
+    relevance = np.array([0.2, 0.1])
+    assert adaptive_cutoff(relevance, score_gap=0.0, min_relevance=0.5) == 1
+    assert adaptive_cutoff(relevance, score_gap=0.0, min_relevance=0.5, min_keep=2) == 2
+    assert adaptive_cutoff(np.array([]), score_gap=0.1, min_relevance=0.0) == 0
+
+
+def test_mmr_prefers_a_diverse_second_pick():
+    relevance = np.array([0.9, 0.88, 0.7], dtype=np.float32)
+    vectors = np.array([[1, 0], [0.995, 0.0998], [0, 1]], dtype=np.float32)
+    assert mmr(relevance, vectors, top_k=2, lambda_=0.5) == [0, 2]
+
+
+def test_mmr_with_lambda_one_is_relevance_order():
+    relevance = np.array([0.5, 0.9, 0.7], dtype=np.float32)
+    vectors = np.eye(3, dtype=np.float32)
+    assert mmr(relevance, vectors, top_k=3, lambda_=1.0) == [1, 2, 0]
+
+
+def test_mmr_drops_near_duplicates():
+    relevance = np.array([0.9, 0.89, 0.5], dtype=np.float32)
+    vectors = np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32)
+    assert mmr(relevance, vectors, top_k=3, lambda_=0.7, duplicate_similarity=0.95) == [0, 2]
+
+
+def test_mmr_treats_missing_vectors_as_dissimilar():
+    relevance = np.array([0.9, 0.8], dtype=np.float32)
+    vectors = np.zeros((2, 3), dtype=np.float32)
+    assert mmr(relevance, vectors, top_k=2, lambda_=0.7, duplicate_similarity=0.95) == [0, 1]
+
+
+def test_select_uses_query_cosine_and_strips_vectors():
+    candidates = [
+        {"mongo_document_id": "a", VECTOR_FIELD: [1.0, 0.0]},
+        {"mongo_document_id": "a-copy", VECTOR_FIELD: [1.0, 0.0]},
+        {"mongo_document_id": "b", VECTOR_FIELD: [0.9, 0.436]},
+    ]
+    selected = make_selector().select(candidates, [[1.0, 0.0]], top_k=3)
+    assert [c["mongo_document_id"] for c in selected] == ["a", "b"]
+    assert all(VECTOR_FIELD not in c for c in candidates)
+
+
+def test_select_uses_reranker_scores_when_present():
+    candidates = [
+        {"mongo_document_id": "a", "score": 0.2, "retrieval_score": 0.9, VECTOR_FIELD: [1.0, 0.0]},
+        {"mongo_document_id": "b", "score": 0.9, "retrieval_score": 0.1, VECTOR_FIELD: [0.0, 1.0]},
+    ]
+    selected = make_selector(score_gap=0.0).select(candidates, [[1.0, 0.0]], top_k=2)
+    assert [c["mongo_document_id"] for c in selected] == ["b", "a"]
+
+
+def test_select_keeps_search_order_without_vectors_or_when_disabled():
+    candidates = [{"mongo_document_id": doc} for doc in "abc"]
+    assert make_selector().select(list(candidates), [[1.0, 0.0]], top_k=2) == candidates[:2]
+
+    with_vectors = [{"mongo_document_id": doc, VECTOR_FIELD: [1.0, 0.0]} for doc in "ab"]
+    selected = make_selector(enabled=False).select(with_vectors, [[1.0, 0.0]], top_k=5)
+    assert [c["mongo_document_id"] for c in selected] == ["a", "b"]
+    assert all(VECTOR_FIELD not in c for c in selected)
@@ -0,0 +1,181 @@
+import asyncio
+from types import SimpleNamespace
+
+from rag.singleflight import SingleFlight
+
+
+def test_identical_calls_share_one_upstream_call():
+    async def scenario():
+        group = SingleFlight("test")
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        results = await asyncio.gather(*[group.do("key", fetch) for _ in range(5)])
+        return group, calls, results
+
+    group, calls, results = asyncio.run(scenario())
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert group.stats() == {"calls": 5, "leaders": 1, "coalesced": 4, "abandoned": 0, "inflight": 0}
+
+
+def test_different_keys_do_not_coalesce():
+    async def scenario():
+        group = SingleFlight("test")
+        return await asyncio.gather(group.do("a", _value("a")), group.do("b", _value("b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+
+
+def test_one_cancelled_caller_does_not_cancel_the_others():
+    async def scenario():
+        group = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.02)
+            return "done"
+
+        leaver = asyncio.create_task(group.do("key", fetch))
+        stayer = asyncio.create_task(group.do("key", fetch))
+        await started.wait()
+        leaver.cancel()
+        return group, await stayer, leaver
+
+    group, result, leaver = asyncio.run(scenario())
+    assert result == "done"
+    assert leaver.cancelled()
+    assert group.stats()["abandoned"] == 0
+
+
+def test_upstream_call_is_cancelled_when_every_caller_gives_up():
+    async def scenario():
+        group = SingleFlight("test")
+        started = asyncio.Event()
+        upstream_cancelled = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                upstream_cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(group.do("key", fetch)) for _ in range(2)]
+        await started.wait()
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.wait_for(upstream_cancelled.wait(), 1)
+        return group
+
+    group = asyncio.run(scenario())
+    assert group.stats()["abandoned"] == 1
+    assert group.stats()["inflight"] == 0
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    async def scenario():
+        group = SingleFlight("test")
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError("upstream down")
+
+        outcomes = await asyncio.gather(group.do("key", fail), group.do("key", fail), return_exceptions=True)
+        retry = await group.do("key", _value("ok"))
+        return outcomes, retry
+
+    outcomes, retry = asyncio.run(scenario())
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert retry == "ok"
+
+
+def test_disabled_group_calls_through():
+    async def scenario():
+        group = SingleFlight("test", enabled=False)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+
+        await asyncio.gather(group.do("key", fetch), group.do("key", fetch))
+        return calls
+
+    assert asyncio.run(scenario()) == 2
+
+
+def _value(value):
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return value
+    return fetch
+
+
+def _fake_llm(monkeypatch, content: str) -> list:
+    """Replaces the router's LLM calls with a slow canned response; returns the call log."""
+    import rag.router as router
+    calls = []
+
+    async def create(priority, **kwargs):
+        calls.append(kwargs["messages"][-1]["content"])
+        await asyncio.sleep(0.01)
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    monkeypatch.setattr(router.llm_dispatcher, "create", create)
+    return calls
+
+
+def test_first_turn_routing_calls_coalesce_across_users(monkeypatch):
+    from rag.router import check_if_search_needed
+    calls = _fake_llm(monkeypatch, "YES")
+    before = check_if_search_needed.single_flight.stats()["coalesced"]
+
+    async def scenario():
+        # Three users opening a session with the same question: no history, same key
+        return await asyncio.gather(*[check_if_search_needed("", "What is the notice period?") for _ in range(3)])
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert len(calls) == 1
+    assert check_if_search_needed.single_flight.stats()["coalesced"] - before == 2
+
+
+def test_rewrites_coalesce_only_for_the_same_history(monkeypatch):
+    from rag.router import rewrite_query
+    calls = _fake_llm(monkeypatch, "What is the notice period in lease B?")
+    before = rewrite_query.single_flight.stats()["coalesced"]
+
+    async def scenario():
+        return await asyncio.gather(
+            rewrite_query("user: lease B", "And the notice period?"),
+            rewrite_query("user: lease B", "And the notice period?"),
+            rewrite_query("user: lease A", "And the notice period?"),
+        )
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert rewrite_query.single_flight.stats()["coalesced"] - before == 1
+
+
+def test_first_turn_expansions_coalesce(monkeypatch):
+    from rag.router import expand_query
+    calls = _fake_llm(monkeypatch, '{"queries": ["notice period clause", "termination notice"]}')
+    before = expand_query.single_flight.stats()["coalesced"]
+
+    async def scenario():
+        return await asyncio.gather(*[expand_query("", "What is the notice period?", 2) for _ in range(2)])
+
+    first, second = asyncio.run(scenario())
+    assert first == second == ["notice period clause", "termination notice"]
+    assert len(calls) == 1
+    assert expand_query.single_flight.stats()["coalesced"] - before == 1
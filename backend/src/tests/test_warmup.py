@@ -0,0 +1,35 @@
+import asyncio
+
+import rag.config as config
+import rag.lexical_index as lexical
+
+
+def test_failing_optional_step_does_not_keep_the_engine_cold(monkeypatch):
+    monkeypatch.setitem(config._model_state, "warmup_errors", {})
+
+    def broken_load():
+        raise OSError("lexical index unreadable")
+
+    monkeypatch.setattr(lexical, "load_lexical_index", broken_load)
+    asyncio.run(config.warmup_engine())
+
+    status = config.get_model_status()
+    assert status["status"] == "ready"
+    assert config.is_model_ready()
+    assert status["warmup_errors"] == {"lexical_index": "lexical index unreadable"}
+
+
+def test_model_failure_is_recorded(monkeypatch):
+    monkeypatch.setattr(config, "_embedding_model", None)
+    monkeypatch.setitem(config._model_state, "status", "cold")
+    monkeypatch.setitem(config._model_state, "error", None)
+
+    def broken_model():
+        raise RuntimeError("weights missing")
+
+    monkeypatch.setattr(config, "load_embedding_model", broken_model)
+    asyncio.run(config.warmup_engine())
+
+    status = config.get_model_status()
+    assert status["status"] == "failed"
+    assert status["error"] == "weights missing"
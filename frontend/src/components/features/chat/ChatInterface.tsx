@@ -118,8 +118,8 @@ export default function ChatInterface({ user }: ChatInterfaceProps) {
         throw new Error("No authentication token");
       }
 
-      // 3. Call the Backend (POST /chat)
-      const response = await fetch("http://localhost:8000/chat", {
+      // 3. Call the Backend (POST /chat/stream, Server-Sent Events)
+      const response = await fetch("http://localhost:8000/chat/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -131,22 +131,49 @@ export default function ChatInterface({ user }: ChatInterfaceProps) {
         }),
       });
 
-      if (!response.ok) {
+      if (!response.ok || !response.body) {
         const errorData = await response.json().catch(() => ({ detail: "Failed to fetch answer" }));
         throw new Error(errorData.detail || "Failed to fetch answer");
       }
 
-      const data = await response.json();
+      // 4. Add an empty AI message and fill it in as events arrive
+      const aiIndex = newMessages.length;
+      setMessages([...newMessages, { role: "ai", content: "", citations: [] }]);
+      const updateAiMessage = (update: (msg: Message) => Message) =>
+        setMessages((prev) => prev.map((msg, idx) => (idx === aiIndex ? update(msg) : msg)));
 
-      // 4. Add AI Response + Citations to UI
-      setMessages((prev) => [
-        ...prev,
-        {
-          role: "ai",
-          content: data.answer,
-          citations: data.sources || [], // Backend returns "sources" not "citations"
-        },
-      ]);
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // Events are separated by a blank line: "event: <name>\ndata: <json>\n\n"
+        const events = buffer.split("\n\n");
+        buffer = events.pop() ?? "";
+
+        for (const rawEvent of events) {
+          const eventName = rawEvent.match(/^event: (.*)$/m)?.[1];
+          const rawData = rawEvent.match(/^data: (.*)$/m)?.[1];
+          if (!eventName || rawData === undefined) continue;
+          const data = JSON.parse(rawData);
+
+          if (eventName === "sources") {
+            // Backend returns "sources" not "citations"
+            updateAiMessage((msg) => ({ ...msg, citations: (data as Citation[]) || [] }));
+            setIsLoading(false);
+          } else if (eventName === "token") {
+            updateAiMessage((msg) => ({ ...msg, content: msg.content + data.text }));
+          } else if (eventName === "done") {
+            updateAiMessage((msg) => ({ ...msg, content: data.answer }));
+          } else if (eventName === "error") {
+            throw new Error(data.detail || "Stream failed");
+          }
+        }
+      }
     } catch (error) {
       console.error("Chat error:", error);
       setMessages((prev) => [